@@ -0,0 +1 @@
+""" Shared code for the BDArmory log parsing scripts. """
@@ -0,0 +1,175 @@
+""" Persistent per-heat parse cache for a tournament.
+
+Finished heat logs never change, so the parsed heat records are stored in a cache file in the tournament folder and only new or changed heats are parsed on later runs.
+Each entry is keyed by the path of the log (relative to the tournament folder), its size, modification time and a hash of its contents:
+    - if the size and modification time match, the cached record is used without reading the log,
+    - otherwise the log is read and hashed, and it is only parsed if the hash differs (so touched or copied logs aren't parsed again).
+The heat records are stored as their pretty-printed JSON from results.json, so that results.json can be assembled from them without re-encoding every heat.
+(This is also quicker to write and read than storing the records as JSON objects.)
+The decoded heat records are also kept in memory, so that re-loading an unchanged heat (e.g., in --follow mode) returns the same record without decoding it again.
+"""
+
+# Standard library imports
+import hashlib
+import json
+from concurrent.futures import Executor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Local imports
+from .files import write_atomically
+from .heats import parse_heat_log_file
+
+CACHE_FILENAME = 'heat_cache.json'
+CACHE_VERSION = 1  # Bump this when the heat record format changes to invalidate old caches.
+PARSE_CHUNKSIZE = 8  # Heat logs per task when parsing in a process pool (heats are small, so this amortises the inter-process overhead).
+
+
+def content_hash(log_file: Path) -> str:
+    """ The hash of the contents of a file (read in blocks). """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(log_file, 'rb') as f:
+        while block := f.read(1 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def heat_json(heat_data: dict) -> str:
+    """ The JSON of a heat record as it appears in results.json (indented to the heat level). """
+    return json.dumps(heat_data, indent=2, ensure_ascii=False).replace('\n', '\n    ')  # Newlines in strings are escaped, so these are all line breaks.
+
+
+def _parse_heat_log_file(log_file: Path) -> Tuple[dict, List[Tuple[float, datetime]], str]:
+    """ Parse a heat log into its heat record, durations and the JSON of the record (module level so that it can run in a process pool). """
+    heat_data, durations = parse_heat_log_file(log_file)
+    return heat_data, durations, heat_json(heat_data)
+
+
+class HeatCache:
+    """ Cache of the parsed heat logs in a tournament folder. """
+
+    def __init__(self, tournament_dir: Path):
+        self.path = tournament_dir / CACHE_FILENAME
+        self.tournament_dir = tournament_dir
+        self.entries = {}
+        self.modified = False
+        self.hits = 0
+        self.misses = 0
+        self._records = {}  # Key -> (entry, heat record, durations) of the heats loaded so far (the entry holds the JSON of the record).
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('version') == CACHE_VERSION:
+                self.entries = cache['heats']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass  # No cache or an invalid cache: start afresh.
+
+    def is_current(self, log_file: Path) -> bool:
+        """ Whether the cache entry of the log matches its size and modification time. """
+        entry = self.entries.get(log_file.relative_to(self.tournament_dir).as_posix())
+        if entry is None:
+            return False
+        stat = log_file.stat()
+        return entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns
+
+    def load(self, log_file: Path) -> Tuple[dict, List[Tuple[float, datetime]]]:
+        """ Get the parsed heat log, from the cache if the log hasn't changed, otherwise by parsing it.
+
+        Args:
+            log_file (Path): The heat log.
+
+        Returns:
+            Tuple[dict, List[Tuple[float, datetime]]]: The heat record and the (duration, timestamp) of each 'Dumping Results' line, as from parse_heat_log.
+        """
+        return next(self.load_all([log_file]))
+
+    def load_all(self, log_files: Sequence[Path], executor: Optional[Executor] = None) -> Iterator[Tuple[dict, List[Tuple[float, datetime]]]]:
+        """ Get the parsed heat logs, as from load, parsing the new or changed logs with the executor (e.g., a process pool).
+
+        The logs are checked (and the ones to parse are submitted to the executor) before this returns, so that several calls can be made before consuming
+        the results to keep the executor busy.
+
+        Args:
+            log_files (Sequence[Path]): The heat logs.
+            executor (Optional[Executor], optional): The executor to parse the logs with. Defaults to parsing them in this process as they're consumed.
+
+        Returns:
+            Iterator[Tuple[dict, List[Tuple[float, datetime]]]]: The heat records and durations, in the order of log_files.
+        """
+        keys, pending = [], []  # (index, stat, hash, log file) of the logs to parse.
+        for index, log_file in enumerate(log_files):
+            key = log_file.relative_to(self.tournament_dir).as_posix()
+            keys.append(key)
+            stat = log_file.stat()
+            entry = self.entries.get(key)
+            if entry is None or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+                digest = content_hash(log_file)
+                if entry is not None and entry['hash'] == digest:  # Same contents, just update the stats.
+                    entry.update({'size': stat.st_size, 'mtime': stat.st_mtime_ns})
+                    self.modified = True
+                else:
+                    pending.append((index, stat, digest, log_file))
+        if executor is not None and len(pending) > 0:
+            parsed = executor.map(_parse_heat_log_file, [log_file for *_, log_file in pending], chunksize=PARSE_CHUNKSIZE)
+        else:
+            parsed = map(_parse_heat_log_file, (log_file for *_, log_file in pending))
+        return self._collect(keys, pending, parsed)
+
+    def _collect(self, keys: List[str], pending: list, parsed: Iterator[Tuple[dict, list, str]]) -> Iterator[Tuple[dict, List[Tuple[float, datetime]]]]:
+        pending = iter(zip(pending, parsed))
+        next_parsed = next(pending, None)
+        for index, key in enumerate(keys):
+            if next_parsed is not None and next_parsed[0][0] == index:
+                (_, stat, digest, _), (heat_data, durations, json_str) = next_parsed
+                next_parsed = next(pending, None)
+                self.misses += 1
+                entry = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': digest, 'durations': [(duration, timestamp.isoformat()) for duration, timestamp in durations], 'json': json_str}
+                self.entries[key] = entry
+                self._records[key] = (entry, heat_data, durations)
+                self.modified = True
+                yield heat_data, durations
+                continue
+            self.hits += 1
+            entry = self.entries[key]
+            if key in self._records and self._records[key][0] is entry:
+                yield self._records[key][1:]
+                continue
+            heat_data = json.loads(entry['json'])
+            durations = [(duration, datetime.fromisoformat(timestamp)) for duration, timestamp in entry['durations']]
+            self._records[key] = (entry, heat_data, durations)
+            yield heat_data, durations
+
+    def _heat_json(self, round_name: str, heat_name: str, heat_data: dict) -> str:
+        """ The JSON of a heat record, from its cache entry if the record was loaded from this cache. """
+        for key in (f"{round_name}/{heat_name}", heat_name):  # The log is in its round folder, or in the tournament folder itself (current_dir).
+            record = self._records.get(key)
+            if record is not None and record[1] is heat_data:
+                return record[0]['json']
+        return heat_json(heat_data)
+
+    def results_json(self, tournament_data: Dict[str, Dict[str, dict]]) -> str:
+        """ The JSON of the tournament data, as json.dumps(tournament_data, indent=2, ensure_ascii=False) would give, using the cached JSON of the heats.
+
+        Args:
+            tournament_data (Dict[str, Dict[str, dict]]): The heat records for each round.
+
+        Returns:
+            str: The contents of results.json.
+        """
+        rounds = []
+        for round_name, heats in tournament_data.items():
+            heat_strings = [f"{json.dumps(heat_name, ensure_ascii=False)}: {self._heat_json(round_name, heat_name, heat_data)}" for heat_name, heat_data in heats.items()]
+            rounds.append(f"{json.dumps(round_name, ensure_ascii=False)}: " + ("{\n    " + ",\n    ".join(heat_strings) + "\n  }" if len(heat_strings) > 0 else "{}"))
+        return "{\n  " + ",\n  ".join(rounds) + "\n}" if len(rounds) > 0 else "{}"
+
+    def save(self):
+        """ Write the cache to the tournament folder if it changed, dropping entries for logs that no longer exist. """
+        stale = [key for key in self.entries if not (self.tournament_dir / key).exists()]
+        for key in stale:
+            del self.entries[key]
+            self._records.pop(key, None)
+        if not self.modified and len(stale) == 0:
+            return
+        write_atomically(self.path, json.dumps({'version': CACHE_VERSION, 'heats': self.entries}, ensure_ascii=False, separators=(',', ':')))  # json.dumps uses the C encoder, json.dump doesn't.
+        self.modified = False
@@ -0,0 +1,441 @@
+""" Parsing of continuous spawning (CTS) logs.
+
+The CTS log is rewritten with the scores of every craft each time the results are dumped:
+    [BDArmory.VesselSpawner:<ID>]: Name:<craft>
+    [BDArmory.VesselSpawner:<ID>]:  <TAG>:<payload>
+    ...
+A single compiled pattern finds the tag of each line once, then a dispatch table sends the payload to a handler for that tag, which updates the record
+of the current craft. Most payloads have the same '<life>:<value>:<by>;<value>:<by>, <life>:...' format, which split_lives splits for all of them.
+
+The stats that a craft deals to others (hits, damage, kills, etc.) are in the '... by' maps of its victims. These are gathered into an attacker -> total
+reverse index in one pass over the victims' lives (index_attackers), so each craft's outgoing stats are lookups instead of scans of every other craft.
+
+Each log is reduced to a compact stat vector per craft (parse_cts_log), in the order of STAT_FIELDS. The vectors of several logs are combined by adding them
+element-wise (merge_stats), which is associative, so logs parsed in a process pool and per-log vectors cached by earlier runs (CtsCache) can be merged in
+any grouping. Ratio stats (accuracy) aren't in the vectors: they're recomputed from the merged numerators and denominators (craft_stats).
+
+CtsTail follows a log as it's written: it keeps the offset of the bytes parsed so far and only parses what's added since. Each finished craft record
+is folded into the reverse index and the craft's own stats straight away and then dropped, so memory use doesn't grow with the length of the session.
+The game rewrites the whole log (File.WriteAllLines) each time it dumps the results, so a log that's shrunk, been replaced, or whose first line
+('Dumping Results at <time>s') has changed is parsed again from the start, replacing the stats of the previous dump.
+
+Note: this module only uses the standard library, as does parse_CS_log_files.py.
+"""
+
+# Standard library imports
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+# Local imports
+from . import profiling
+from .files import write_atomically
+
+CTS_TAG = re.compile(r'BDArmory\.VesselSpawner[^ ]* +(Name|[A-Z]+):')  # The tag is the first word after the log prefix.
+ACCURACY_SEPARATORS = re.compile('[:/]')
+GM_KILLS_IGNORED = ("LandedTooLong", "Asteroids")  # GM kills that don't count as kills.
+DEALT_FIELDS = {  # Stat dealt to others: the '... by' map of the victims that it's the total of.
+    "hits": "shot by",
+    "rocket strikes": "rocket strike by",
+    "missile strikes": "missile strike by",
+    "rocket parts hit": "rocket parts hit by",
+    "missile parts hit": "missile parts hit by",
+    "bullet damage": "bullet damage by",
+    "rocket damage": "rocket damage by",
+    "missile damage": "missile damage by",
+    "rammed parts": "rammed by",
+}
+TAKEN_FIELDS = {"bullet damage taken": "bullet damage by", "rocket damage taken": "rocket damage by", "missile damage taken": "missile damage by"}
+DAMAGED_BY_FIELDS = ("bullet damage by", "rocket damage by", "missile damage by", "rammed by")  # The attackers that count towards assists.
+
+STAT_FIELDS = (  # The fields of the per-craft stat vectors, all of which add up over logs.
+    "kills", "assists", "deaths", "hits", "bullet damage", "bullet damage taken", "rocket strikes", "rocket parts hit", "rocket damage", "rocket damage taken",
+    "missile strikes", "missile parts hit", "missile damage", "missile damage taken", "rammed parts", "parts lost to asteroids",
+    "acc hits", "shots", "acc rocket strikes", "rockets fired", "score"
+)
+RATIO_FIELDS = {"accuracy": ("acc hits", "shots"), "rocket accuracy": ("acc rocket strikes", "rockets fired")}  # Percentage stats: (numerator, denominator).
+OWN_FIELDS = ("deaths", "bullet damage taken", "rocket damage taken", "missile damage taken", "parts lost to asteroids", "acc hits", "shots", "acc rocket strikes", "rockets fired")  # The stats from a craft's own record.
+DUMP_HEADER = re.compile(r'BDArmory\.VesselSpawner[^ ]* +Dumping Results')
+TAIL_BLOCK_SIZE = 1 << 20  # Bytes read at a time in tail mode.
+CACHE_FILENAME = 'cts_cache.json'
+CACHE_VERSION = 1  # Bump this when STAT_FIELDS or the parsing changes to invalidate old caches.
+
+Handler = Callable[[dict, str], None]
+StatVectors = Dict[str, List[Any]]  # Craft -> values of STAT_FIELDS.
+
+
+def new_craft_record() -> dict:
+    """ The record of a craft before any of its lines have been parsed. """
+    return {
+        "kills": 0, "assists": 0, "deaths": 0, "hits": 0, "bullet damage": 0, "acc hits": 0, "shots": 0, "accuracy": 0, "rocket strikes": 0, "rocket parts hit": 0,
+        "rocket damage": 0, "acc rocket strikes": 0, "rockets fired": 0, "rocket accuracy": 0, "missile strikes": 0, "missile parts hit": 0, "missile damage": 0, "score": 0, "damage/spawn": 0
+    }
+
+
+def split_life_values(payload: str) -> Iterator[Tuple[int, str]]:
+    """ Split a '<life>:<value>, <life>:<value>...' payload into (life, value) pairs. """
+    for entry in payload.split(", "):
+        life, value = entry.split(":", 1)
+        yield int(life), value
+
+
+def split_lives(payload: str, value_type: Callable[[str], Any]) -> Dict[int, Dict[str, Any]]:
+    """ Split a '<life>:<value>:<by>;<value>:<by>, <life>:...' payload into {life: {by: value}}. """
+    return {life: {by: value_type(value) for value, by in (entry.split(":", 1) for entry in values.split(";"))} for life, values in split_life_values(payload)}
+
+
+def _lives(key: str, value_type: Callable[[str], Any]) -> Handler:
+    """ Handler for the WHO* tags. """
+    def handler(record: dict, payload: str):
+        record[key] = split_lives(payload, value_type)
+    return handler
+
+
+def _deaths(record: dict, payload: str):
+    record["deaths"] = int(payload)
+
+
+def _clean_kills(record: dict, payload: str):
+    """ Handler for the CLEAN* tags: <life>:<killer>, ... (the killers of the kill types are combined). """
+    record.setdefault("killed by", {}).update(split_life_values(payload))  # {death_nr: killer}
+
+
+def _gm_kills(record: dict, payload: str):
+    record["GM kills"] = {life: reason for life, reason in split_life_values(payload) if reason not in GM_KILLS_IGNORED}
+
+
+def _parts_lost_to_asteroids(record: dict, payload: str):
+    record["parts lost to asteroids"] = {life: int(parts) for life, parts in split_life_values(payload)}
+
+
+def _accuracy(record: dict, payload: str):
+    """ Handler for the ACCURACY tag: <life>:<hits>/<shots>:<rocket strikes>/<rockets fired>, ... """
+    for entry in payload.split(","):
+        _, hits, shots, rocket_strikes, rockets_fired = ACCURACY_SEPARATORS.split(entry)
+        record["acc hits"] += int(hits)
+        record["shots"] += int(shots)
+        record["acc rocket strikes"] += int(rocket_strikes)
+        record["rockets fired"] += int(rockets_fired)
+    record["accuracy"] = 100 * record["acc hits"] / record["shots"] if record["shots"] > 0 else 0
+    record["rocket accuracy"] = 100 * record["acc rocket strikes"] / record["rockets fired"] if record["rockets fired"] > 0 else 0
+
+
+HANDLERS: Dict[str, Handler] = {
+    'DEATHCOUNT': _deaths,
+    'CLEANKILL': _clean_kills,
+    'CLEANFRAG': _clean_kills,
+    'CLEANRAM': _clean_kills,
+    'CLEANMISSILEKILL': _clean_kills,
+    'GMKILL': _gm_kills,
+    'WHOSHOTME': _lives("shot by", int),
+    'WHOSTRUCKMEWITHROCKETS': _lives("rocket strike by", int),
+    'WHOSTRUCKMEWITHMISSILES': _lives("missile strike by", int),
+    'WHOPARTSHITMEWITHROCKETS': _lives("rocket parts hit by", int),
+    'WHOPARTSHITMEWITHMISSILES': _lives("missile parts hit by", int),
+    'WHODAMAGEDMEWITHBULLETS': _lives("bullet damage by", float),
+    'WHODAMAGEDMEWITHROCKETS': _lives("rocket damage by", float),
+    'WHODAMAGEDMEWITHMISSILES': _lives("missile damage by", float),
+    'WHORAMMEDME': _lives("rammed by", int),
+    'PARTSLOSTTOASTEROIDS': _parts_lost_to_asteroids,
+    'ACCURACY': _accuracy,
+    # DEATHTIMES and the tag mode tags aren't used.
+}
+
+
+def parse_cts_lines(lines: Iterable[str]) -> Dict[str, dict]:
+    """ Parse the lines of a CTS log into the record of each craft.
+
+    Args:
+        lines (Iterable[str]): The log lines. Lines that aren't CTS results are ignored.
+
+    Returns:
+        Dict[str, dict]: The record of each craft (see new_craft_record), with the '... by' maps of its lives.
+    """
+    data = {}
+    record = None
+    search = CTS_TAG.search
+    handlers = HANDLERS
+    for line in lines:
+        m = search(line)
+        if m is None:
+            continue
+        tag = m.group(1)
+        if tag == 'Name':  # Next craft
+            record = data[line[m.end():].rstrip('\n')] = new_craft_record()
+            continue
+        handler = handlers.get(tag)
+        if handler is not None and record is not None:
+            handler(record, line[m.end():].rstrip('\n'))
+    return data
+
+
+def _index_victim(index: Dict[str, Dict[str, Any]], victim: str, record: dict):
+    """ Add the '... by' maps and the killers of a victim's record to the attacker -> total reverse index, skipping self-inflicted entries. """
+    for field, by_field in DEALT_FIELDS.items():
+        if by_field not in record:
+            continue
+        totals = index[field]
+        for by in record[by_field].values():
+            for attacker, value in by.items():
+                if attacker != victim:
+                    totals[attacker] = totals.get(attacker, 0) + value
+    kills = index["kills"]
+    for killer in record.get("killed by", {}).values():
+        if killer != victim:
+            kills[killer] = kills.get(killer, 0) + 1
+
+
+def index_attackers(data: Dict[str, dict]) -> Dict[str, Dict[str, Any]]:
+    """ Build the attacker -> total reverse index of the '... by' maps and the kills, skipping self-inflicted entries.
+
+    The totals are added up in the order of the victims and their lives, as the sums over each craft's victims were.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The total of each of the DEALT_FIELDS and the number of 'kills' for each attacker.
+    """
+    index = {field: {} for field in (*DEALT_FIELDS, "kills")}
+    for victim, record in data.items():
+        _index_victim(index, victim, record)
+    return index
+
+
+def _own_stats(record: dict):
+    """ Compute the stats of a craft that only depend on its own record: the taken stats, parts lost to asteroids and 'damaged by'. """
+    for field, by_field in TAKEN_FIELDS.items():
+        record[field] = sum(damage for by in record[by_field].values() for damage in by.values()) if by_field in record else 0
+    record["parts lost to asteroids"] = sum(record["parts lost to asteroids"].values()) if "parts lost to asteroids" in record else 0
+    damaged_by = record["damaged by"] = {}
+    for by_field in DAMAGED_BY_FIELDS:
+        for life, by in record.get(by_field, {}).items():
+            if life < record["deaths"]:
+                damaged_by[life] = damaged_by[life].union(by) if life in damaged_by else set(by)
+
+
+def _assisters(record: dict) -> Iterator[set]:
+    """ The attackers that damaged each of the lives of a craft that ended in a death that wasn't a clean kill or GM kill. """
+    damaged_by = record["damaged by"]
+    for life in damaged_by.keys() - record.get("killed by", {}).keys() - record.get("GM kills", {}).keys():
+        yield damaged_by[life]
+
+
+def aggregate(data: Dict[str, dict]):
+    """ Compute the dealt and taken stats of each craft, and the attackers that damaged each of its lives that ended in a death ('damaged by'). """
+    index = index_attackers(data)
+    for craft, record in data.items():
+        for field in index:
+            record[field] = index[field].get(craft, 0)
+        _own_stats(record)
+        record["damage/spawn"] = (record["bullet damage"] + record["rocket damage"] + record["missile damage"]) / (1 + record["deaths"])
+
+
+def count_assists(data: Dict[str, dict]):
+    """ Count the assists of each craft: the deaths of craft it damaged that weren't clean kills or GM kills. """
+    assists = Counter()
+    for record in data.values():
+        for attackers in _assisters(record):
+            assists.update(attackers)
+    for craft, record in data.items():
+        record["assists"] = assists[craft]
+
+
+def stat_vectors(data: Dict[str, dict]) -> StatVectors:
+    """ The stat vector of each craft from its aggregated record (the score is left at 0 for score_stats). """
+    return {craft: [record[field] for field in STAT_FIELDS[:-1]] + [0] for craft, record in data.items()}
+
+
+def parse_cts_log(log_file: Path) -> StatVectors:
+    """ Parse a CTS log into the stat vector of each craft (module level so that it can run in a process pool).
+
+    Args:
+        log_file (Path): The CTS log.
+
+    Returns:
+        StatVectors: The stat vector of each craft, in the order of the log.
+    """
+    profiler = profiling.current()
+    profiler.section("read and dispatch lines")
+    with open(log_file, "r") as file_data:
+        data = parse_cts_lines(profiler.counted(file_data, 'lines'))
+    profiler.count('craft', len(data))
+    profiler.section("aggregate")
+    aggregate(data)
+    profiler.section("assists")
+    count_assists(data)
+    return stat_vectors(data)
+
+
+def craft_stats(vector: List[Any]) -> Dict[str, Any]:
+    """ The stats of a craft from its stat vector, with the RATIO_FIELDS computed from their numerators and denominators. """
+    stats = dict(zip(STAT_FIELDS, vector))
+    for field, (numerator, denominator) in RATIO_FIELDS.items():
+        stats[field] = 100 * stats[numerator] / stats[denominator] if stats[denominator] > 0 else 0
+    return stats
+
+
+def score_stats(vectors: StatVectors, weights: Mapping[str, float]) -> StatVectors:
+    """ Set the score of each craft in the stat vectors of a log to the weighted sum of its stats (including the ratio stats of that log). """
+    for vector in vectors.values():
+        stats = craft_stats(vector)
+        vector[-1] = sum(weight * stats[field] for field, weight in weights.items())
+    return vectors
+
+
+def merge_stats(*logs: StatVectors) -> StatVectors:
+    """ Merge the stat vectors of several logs by adding them element-wise.
+
+    The merge is associative (merge_stats(a, b, c) == merge_stats(merge_stats(a, b), c)), with the craft in order of first appearance, so per-log results
+    can be merged as they arrive or combined with merged results from elsewhere.
+    """
+    merged = {}
+    for vectors in logs:
+        for craft, vector in vectors.items():
+            total = merged.get(craft)
+            merged[craft] = list(vector) if total is None else [a + b for a, b in zip(total, vector)]
+    return merged
+
+
+class CtsCache:
+    """ Cache of the stat vectors of the CTS logs in a folder, keyed by the name, size and modification time of each log.
+
+    The vectors are stored without their scores, which are recomputed with the current weights.
+    """
+
+    def __init__(self, log_dir: Path):
+        self.path = log_dir / CACHE_FILENAME
+        self.log_dir = log_dir
+        self.entries = {}
+        self.modified = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('version') == CACHE_VERSION:
+                self.entries = cache['logs']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass  # No cache or an invalid cache: start afresh.
+
+    def get(self, log_file: Path) -> Optional[StatVectors]:
+        """ The cached stat vectors of the log, or None if it isn't cached or has changed since. """
+        entry = self.entries.get(log_file.name)
+        if entry is None:
+            return None
+        stat = log_file.stat()
+        if entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+            return None
+        return {craft: list(vector) for craft, vector in entry['craft'].items()}
+
+    def put(self, log_file: Path, vectors: StatVectors):
+        """ Cache the stat vectors of the log. """
+        stat = log_file.stat()
+        self.entries[log_file.name] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'craft': {craft: vector[:-1] + [0] for craft, vector in vectors.items()}}
+        self.modified = True
+
+    def save(self):
+        """ Write the cache to the folder if it changed, dropping entries for logs that no longer exist. """
+        stale = [name for name in self.entries if not (self.log_dir / name).exists()]
+        for name in stale:
+            del self.entries[name]
+        if not self.modified and len(stale) == 0:
+            return
+        write_atomically(self.path, json.dumps({'version': CACHE_VERSION, 'logs': self.entries}, ensure_ascii=False, separators=(',', ':')))
+        self.modified = False
+
+
+class CtsTail:
+    """ Follow a CTS log as it's written, parsing only the lines added since the last poll. """
+
+    def __init__(self, log_file: Path):
+        self.log_file = log_file
+        self.dumps = 0  # The number of times the log has been (re)started.
+        self._identity = None  # (device, inode) of the log.
+        self._header = b''  # The first line of the log.
+        self.offset = 0  # The bytes of the log that have been parsed.
+        self._partial = b''  # The start of a line that hasn't been finished yet.
+        self._new_dump()
+
+    def _new_dump(self):
+        """ Forget the stats of the previous dump. """
+        self.records: Dict[str, Dict[str, Any]] = {}  # Craft -> OWN_FIELDS of the finished craft records.
+        self.index = {field: {} for field in (*DEALT_FIELDS, "kills")}  # Attacker -> totals, as from index_attackers.
+        self.assists = Counter()
+        self._craft, self._record = None, None  # The craft record that's being parsed.
+
+    def _rewritten(self, identity: Tuple[int, int], size: int, header: bytes) -> bool:
+        """ Whether the log has been replaced, truncated or rewritten since the last poll. """
+        if identity != self._identity or size < self.offset:
+            return True
+        if self._header.endswith(b'\n'):
+            return header != self._header
+        return not header.startswith(self._header)  # The first line was still being written.
+
+    def _restart(self, identity: Tuple[int, int]):
+        self._identity = identity
+        self.offset, self._partial = 0, b''
+        self.dumps += 1
+        self._new_dump()
+
+    def poll(self) -> bool:
+        """ Parse the lines that have been added to the log since the last poll (starting again if it's been rewritten).
+
+        Returns:
+            bool: Whether the log changed.
+        """
+        try:
+            with open(self.log_file, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                header = f.readline(TAIL_BLOCK_SIZE)
+                identity = (stat.st_dev, stat.st_ino)
+                if self._rewritten(identity, stat.st_size, header):
+                    self._restart(identity)
+                elif stat.st_size == self.offset:
+                    return False
+                self._header = header
+                f.seek(self.offset)
+                while block := f.read(TAIL_BLOCK_SIZE):
+                    self.offset += len(block)
+                    lines = (self._partial + block).split(b'\n')
+                    self._partial = lines.pop()
+                    for line in lines:
+                        self._parse_line(line.rstrip(b'\r').decode('utf-8', errors='replace'))
+        except OSError:  # Not written yet or in the middle of being replaced: try again on the next poll.
+            return False
+        return True
+
+    def _parse_line(self, line: str):
+        m = CTS_TAG.search(line)
+        if m is None:
+            if DUMP_HEADER.search(line) is not None:  # Another dump in the same log.
+                self._new_dump()
+            return
+        tag = m.group(1)
+        if tag == 'Name':  # Next craft
+            self._finish_record()
+            self._craft, self._record = line[m.end():], new_craft_record()
+            return
+        handler = HANDLERS.get(tag)
+        if handler is not None and self._record is not None:
+            handler(self._record, line[m.end():])
+
+    def _finish_record(self):
+        if self._record is not None:
+            _fold_record(self.records, self.index, self.assists, self._craft, self._record)
+            self._craft, self._record = None, None
+
+    def vectors(self) -> StatVectors:
+        """ The stat vector of each craft in the log so far (as from parse_cts_log). The last craft record is included, but kept open as it may not be finished yet. """
+        records, index, assists = self.records, self.index, self.assists
+        if self._record is not None:
+            records, index, assists = dict(records), {field: dict(totals) for field, totals in index.items()}, Counter(assists)
+            _fold_record(records, index, assists, self._craft, dict(self._record))
+        return {craft: [index[field].get(craft, 0) if field in index else assists[craft] if field == "assists" else own[field] for field in STAT_FIELDS[:-1]] + [0] for craft, own in records.items()}
+
+
+def _fold_record(records: Dict[str, Dict[str, Any]], index: Dict[str, Dict[str, Any]], assists: Counter, craft: str, record: dict):
+    """ Add a finished craft record to the reverse index, the assists and the own stats of the craft (for CtsTail). """
+    _index_victim(index, craft, record)
+    _own_stats(record)
+    for attackers in _assisters(record):
+        assists.update(attackers)
+    records[craft] = {field: record[field] for field in OWN_FIELDS}
@@ -0,0 +1,257 @@
+""" SQLite database of tournament results.
+
+The heat records of each tournament (results.json from parse_tournament_log_files.py) are loaded into normalised tables:
+    tournaments:         one row per tournament folder.
+    rounds, heats:       the rounds of each tournament and the heats of each round, with the heat duration and result.
+    teams:               the teams (and dead teams) of each heat.
+    craft:               one row per craft name, shared between tournaments.
+    craft_states:        one row per craft in each heat: state, death order/time, HP, accuracy counts and clean killers.
+    interaction_fields:  the '...By' fields (hitsBy, missileDamageBy, ...).
+    interactions:        one row per (heat, victim, attacker, field) with the value from the victim's '...By' map.
+with indices on the craft columns and the tournament/round/heat keys, so cross-tournament questions are answered by the database without re-parsing any logs.
+Re-ingesting a tournament replaces its rows.
+"""
+
+# Standard library imports
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Local imports
+from .facts import BY_FIELDS, KILL_FIELDS
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tournaments (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    ingested TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    tournament_id INTEGER NOT NULL REFERENCES tournaments(id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS heats (
+    id INTEGER PRIMARY KEY,
+    round_id INTEGER NOT NULL REFERENCES rounds(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    duration REAL NOT NULL,
+    result TEXT
+);
+CREATE TABLE IF NOT EXISTS teams (
+    heat_id INTEGER NOT NULL REFERENCES heats(id) ON DELETE CASCADE,
+    team TEXT NOT NULL,
+    members TEXT NOT NULL,
+    dead INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS craft (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS craft_states (
+    heat_id INTEGER NOT NULL REFERENCES heats(id) ON DELETE CASCADE,
+    craft_id INTEGER NOT NULL REFERENCES craft(id),
+    state TEXT NOT NULL,
+    death_order INTEGER,
+    death_time REAL,
+    hp_remaining REAL,
+    hits INTEGER,
+    shots INTEGER,
+    rocket_strikes INTEGER,
+    rockets_fired INTEGER,
+    parts_lost_to_asteroids INTEGER,
+    gm_kill_reason TEXT,
+    clean_kill_by INTEGER REFERENCES craft(id),
+    clean_rocket_kill_by INTEGER REFERENCES craft(id),
+    clean_missile_kill_by INTEGER REFERENCES craft(id),
+    clean_ram_kill_by INTEGER REFERENCES craft(id),
+    PRIMARY KEY (heat_id, craft_id)
+);
+CREATE TABLE IF NOT EXISTS interaction_fields (
+    id INTEGER PRIMARY KEY,
+    field TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS interactions (
+    heat_id INTEGER NOT NULL REFERENCES heats(id) ON DELETE CASCADE,
+    victim_id INTEGER NOT NULL REFERENCES craft(id),
+    attacker_id INTEGER NOT NULL REFERENCES craft(id),
+    field_id INTEGER NOT NULL REFERENCES interaction_fields(id),
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rounds_tournament ON rounds(tournament_id);
+CREATE INDEX IF NOT EXISTS heats_round ON heats(round_id);
+CREATE INDEX IF NOT EXISTS teams_heat ON teams(heat_id);
+CREATE INDEX IF NOT EXISTS craft_states_craft ON craft_states(craft_id);
+CREATE INDEX IF NOT EXISTS interactions_heat ON interactions(heat_id);
+CREATE INDEX IF NOT EXISTS interactions_victim ON interactions(victim_id, field_id);
+CREATE INDEX IF NOT EXISTS interactions_attacker ON interactions(attacker_id, field_id);
+"""
+KILL_COLUMNS = dict(zip(KILL_FIELDS, ('clean_kill_by', 'clean_rocket_kill_by', 'clean_missile_kill_by', 'clean_ram_kill_by')))
+WEAPONS = {  # Weapon: (clean kill column, damage fields)
+    'guns': ('clean_kill_by', ('hitsBy', 'bulletDamageBy')),
+    'rockets': ('clean_rocket_kill_by', ('rocketHitsBy', 'rocketPartsHitBy', 'rocketDamageBy')),
+    'missiles': ('clean_missile_kill_by', ('missileHitsBy', 'missilePartsHitBy', 'missileDamageBy')),
+    'ramming': ('clean_ram_kill_by', ('rammedPartsLostBy',)),
+}
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """ Open (or create) a tournament database. """
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA foreign_keys = ON")
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    if version not in (0, SCHEMA_VERSION):
+        db.close()
+        raise ValueError(f"{path} has schema version {version}, expected {SCHEMA_VERSION}.")
+    db.executescript(SCHEMA)
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    db.executemany("INSERT OR IGNORE INTO interaction_fields(field) VALUES (?)", ((field,) for field in BY_FIELDS))
+    db.commit()
+    return db
+
+
+def _craft_ids(db: sqlite3.Connection, names: Iterable[str]) -> Dict[str, int]:
+    names = sorted(set(names))
+    db.executemany("INSERT OR IGNORE INTO craft(name) VALUES (?)", ((name,) for name in names))
+    ids = {}
+    for i in range(0, len(names), 500):  # Keep below the SQLite variable limit.
+        chunk = names[i:i + 500]
+        ids.update(db.execute(f"SELECT name, id FROM craft WHERE name IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+    return ids
+
+
+def ingest_tournament(db: sqlite3.Connection, tournament_dir: Path, tournament_data: Dict[str, Dict[str, dict]]) -> int:
+    """ Load the heat records of a tournament into the database, replacing any previous version of the tournament.
+
+    Args:
+        db (sqlite3.Connection): The database.
+        tournament_dir (Path): The tournament folder (identifies the tournament).
+        tournament_data (Dict[str, Dict[str, dict]]): The heat records for each round (results.json).
+
+    Returns:
+        int: The number of heats loaded.
+    """
+    path = str(tournament_dir.resolve())
+    field_ids = dict(db.execute("SELECT field, id FROM interaction_fields").fetchall())
+    names = set()
+    for round in tournament_data.values():
+        for heat in round.values():
+            for craft, data in heat['craft'].items():
+                names.add(craft)
+                names.update(data[field] for field in KILL_FIELDS if field in data)
+                names.update(attacker for field in BY_FIELDS if field in data for attacker in data[field])
+    heat_count = 0
+    with db:  # One transaction per tournament.
+        db.execute("DELETE FROM tournaments WHERE path = ?", (path,))
+        craft_ids = _craft_ids(db, names)
+        tournament_id = db.execute("INSERT INTO tournaments(path, name, ingested) VALUES (?, ?, ?)", (path, tournament_dir.resolve().name, datetime.now().isoformat())).lastrowid
+        states, interactions, teams = [], [], []
+        for round_number, (round_name, round) in enumerate(tournament_data.items()):
+            round_id = db.execute("INSERT INTO rounds(tournament_id, number, name) VALUES (?, ?, ?)", (tournament_id, round_number, round_name)).lastrowid
+            for heat_name, heat in round.items():
+                result = heat['result'] or {}
+                heat_id = db.execute("INSERT INTO heats(round_id, name, duration, result) VALUES (?, ?, ?, ?)", (round_id, heat_name, heat['duration'], result.get('result'))).lastrowid
+                heat_count += 1
+                teams.extend((heat_id, team, members, dead) for dead, key in ((0, 'teams'), (1, 'dead teams')) for team, members in result.get(key, {}).items())
+                for craft, data in heat['craft'].items():
+                    craft_id = craft_ids[craft]
+                    states.append((
+                        heat_id, craft_id, data['state'], data.get('deathOrder'), data.get('deathTime'), data.get('HPremaining'),
+                        data.get('hits'), data.get('shots'), data.get('rocket_strikes'), data.get('rockets_fired'), data.get('partsLostToAsteroids'), data.get('GMKillReason'),
+                        *(craft_ids[data[field]] if field in data else None for field in KILL_FIELDS)
+                    ))
+                    interactions.extend((heat_id, craft_id, craft_ids[attacker], field_ids[field], value) for field in BY_FIELDS if field in data for attacker, value in data[field].items())
+        db.executemany("INSERT INTO teams VALUES (?, ?, ?, ?)", teams)
+        db.executemany(f"INSERT INTO craft_states VALUES ({','.join('?' * 16)})", states)
+        db.executemany("INSERT INTO interactions VALUES (?, ?, ?, ?, ?)", interactions)
+    return heat_count
+
+
+def ingest_results(db: sqlite3.Connection, tournament_dir: Path) -> int:
+    """ Load the results.json of a tournament folder into the database (see ingest_tournament). """
+    with open(tournament_dir / 'results.json', 'r', encoding='utf-8') as f:
+        return ingest_tournament(db, tournament_dir, json.load(f))
+
+
+def _craft_id(db: sqlite3.Connection, name: str) -> Optional[int]:
+    row = db.execute("SELECT id FROM craft WHERE name = ?", (name,)).fetchone()
+    return row[0] if row is not None else None
+
+
+def _tournament_filter(tournaments: Optional[str]) -> Tuple[str, list]:
+    return ("AND (t.name GLOB ? OR t.path GLOB ?)", [tournaments, tournaments]) if tournaments else ("", [])
+
+
+HEAT_COLUMNS = "t.name AS tournament, r.name AS round, h.name AS heat"
+TOURNAMENT_PATH = "t.path AS tournament_path"  # The folder names repeat between seasons, so the heat queries also give the path (last, as it's long).
+HEAT_JOINS = "JOIN heats h ON h.id = s.heat_id JOIN rounds r ON r.id = h.round_id JOIN tournaments t ON t.id = r.tournament_id"
+
+
+def deaths(db: sqlite3.Connection, craft: str, weapon: Optional[str] = None, tournaments: Optional[str] = None) -> Tuple[List[str], List[tuple]]:
+    """ The heats where a craft died, with who killed it.
+
+    Args:
+        db (sqlite3.Connection): The database.
+        craft (str): The craft name.
+        weapon (Optional[str], optional): Only deaths to this weapon (see WEAPONS): clean kills with it, or dirty deaths where the craft was hit with it.
+        tournaments (Optional[str], optional): Only tournaments whose name or path match this glob pattern.
+
+    Returns:
+        Tuple[List[str], List[tuple]]: The column names and rows.
+    """
+    where, params = _tournament_filter(tournaments)
+    killers = ", ".join(f"(SELECT name FROM craft WHERE id = s.{column}) AS {column}" for column in KILL_COLUMNS.values())
+    if weapon is not None:
+        kill_column, fields = WEAPONS[weapon]
+        where += f""" AND (s.{kill_column} IS NOT NULL OR ({' AND '.join(f's.{column} IS NULL' for column in KILL_COLUMNS.values())} AND EXISTS (
+            SELECT 1 FROM interactions i JOIN interaction_fields f ON f.id = i.field_id
+            WHERE i.heat_id = s.heat_id AND i.victim_id = s.craft_id AND f.field IN ({','.join('?' * len(fields))}))))"""
+        params += list(fields)
+    cursor = db.execute(f"""
+        SELECT {HEAT_COLUMNS}, s.death_order, s.death_time, {killers}, s.gm_kill_reason, {TOURNAMENT_PATH}
+        FROM craft_states s {HEAT_JOINS}
+        WHERE s.craft_id = (SELECT id FROM craft WHERE name = ?) AND s.state = 'DEAD' {where}
+        ORDER BY t.id, r.number, h.id""", [craft] + params)
+    return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+def kills(db: sqlite3.Connection, craft: str, tournaments: Optional[str] = None) -> Tuple[List[str], List[tuple]]:
+    """ The clean kills of a craft: the heat, victim and weapon of each. """
+    where, params = _tournament_filter(tournaments)
+    weapons = " ".join(f"WHEN s.{column} = k.id THEN '{weapon}'" for weapon, (column, _) in WEAPONS.items())
+    cursor = db.execute(f"""
+        SELECT {HEAT_COLUMNS}, v.name AS victim, CASE {weapons} END AS weapon, s.death_time, {TOURNAMENT_PATH}
+        FROM craft k JOIN craft_states s ON k.id IN ({', '.join(f's.{column}' for column in KILL_COLUMNS.values())})
+        JOIN craft v ON v.id = s.craft_id {HEAT_JOINS}
+        WHERE k.name = ? {where}
+        ORDER BY t.id, r.number, h.id""", [craft] + params)
+    return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+def versus(db: sqlite3.Connection, craft: str, opponent: Optional[str] = None, tournaments: Optional[str] = None) -> Tuple[List[str], List[tuple]]:
+    """ The totals of each '...By' field dealt by a craft to each opponent (or one opponent) and taken from them. """
+    where, params = _tournament_filter(tournaments)
+    opponent_filter = "AND o.name = ?" if opponent is not None else ""
+    cursor = db.execute(f"""
+        SELECT o.name AS opponent, f.field, SUM(x.dealt) AS dealt, SUM(x.taken) AS taken
+        FROM (
+            SELECT i.heat_id, i.victim_id AS opponent_id, i.field_id, i.value AS dealt, 0.0 AS taken FROM interactions i WHERE i.attacker_id = :craft
+            UNION ALL
+            SELECT i.heat_id, i.attacker_id AS opponent_id, i.field_id, 0.0 AS dealt, i.value AS taken FROM interactions i WHERE i.victim_id = :craft
+        ) x
+        JOIN craft o ON o.id = x.opponent_id JOIN interaction_fields f ON f.id = x.field_id
+        JOIN heats h ON h.id = x.heat_id JOIN rounds r ON r.id = h.round_id JOIN tournaments t ON t.id = r.tournament_id
+        WHERE x.opponent_id != :craft {opponent_filter.replace('?', ':opponent')} {where.replace('?', ':tournaments')}
+        GROUP BY o.name, f.id ORDER BY o.name, f.id""", {'craft': _craft_id(db, craft), 'opponent': opponent, 'tournaments': tournaments})
+    return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+def sql(db: sqlite3.Connection, query: str, parameters: Sequence = ()) -> Tuple[List[str], List[tuple]]:
+    """ Run an arbitrary query. """
+    cursor = db.execute(query, parameters)
+    return [column[0] for column in cursor.description or ()], cursor.fetchall()
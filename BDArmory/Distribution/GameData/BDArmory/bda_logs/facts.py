@@ -0,0 +1,493 @@
+""" Columnar fact table for the heats of a tournament.
+
+Each heat of tournamentData is visited once to build:
+    - per-(heat, craft) state columns (one row per craft in each heat),
+    - per-(heat, attacker, victim) interaction columns for each of the '...By' maps,
+    - the result and the teams (and dead teams) of each heat.
+The columns are built per heat (HeatFacts) and concatenated, so that only new heats need to be visited when the table is updated.
+The craft summary fields are then grouped reductions (numpy.bincount) over these columns instead of comprehensions over every heat for every craft.
+They're accumulated per (craft, round) in a single pass (see TournamentFacts._rollup) that the tournament summary, the per-round summary and the
+scoring matrices share.
+
+The rows are stored in the same order as tournamentData (rounds, heats, then craft in each heat), and bincount accumulates sequentially, so the sums are
+accumulated in the same order as the original comprehensions and give identical floating point results.
+Values are converted back to python ints and floats following the types that sum() would give, so that the JSON output is unchanged.
+"""
+
+# Standard library imports
+from collections import Counter
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# Third party imports
+import numpy
+
+# Local imports
+from .tokenizer import CalculateAccuracy
+from .variants import variant_aliases
+
+STATES = ('ALIVE', 'DEAD', 'MIA')
+ALIVE, DEAD, MIA = range(len(STATES))
+KILL_FIELDS = ('cleanKillBy', 'cleanRocketKillBy', 'cleanMissileKillBy', 'cleanRamKillBy')
+HIT_FIELDS = ('hitsBy', 'rocketPartsHitBy', 'missilePartsHitBy', 'rammedPartsLostBy')  # Fields that make a death dirty and count towards assists.
+BY_FIELDS = {  # '...By' field: (dealt summary field, taken summary field, value type)
+    'hitsBy': (None, 'hitsTaken', int),  # Hits dealt come from the ACCURACY line.
+    'bulletDamageBy': ('bulletDamage', 'bulletDamageTaken', float),
+    'rocketHitsBy': ('rocketHits', 'rocketHitsTaken', int),
+    'rocketPartsHitBy': ('rocketPartsHit', 'rocketPartsHitTaken', int),
+    'rocketDamageBy': ('rocketDamage', 'rocketDamageTaken', float),
+    'missileHitsBy': ('missileHits', 'missileHitsTaken', int),
+    'missilePartsHitBy': ('missilePartsHit', 'missilePartsHitTaken', int),
+    'missileDamageBy': ('missileDamage', 'missileDamageTaken', float),
+    'rammedPartsLostBy': ('ramScore', 'ramScoreTaken', int),
+    'battleDamageBy': ('battleDamage', 'battleDamageTaken', float),
+}
+WAYPOINT_FIELDS = ('waypointCount', 'waypointTime', 'waypointDeviation')  # Only in the per-round summary, the tournament summary adds them separately.
+UNKNOWN = -1  # Craft index for names that aren't in the list of craft.
+
+
+def CalculateAvgHP(hp, heats): return hp / heats if heats > 0 else 0
+
+
+class Interactions(NamedTuple):
+    """ The attacker -> victim entries of one of the '...By' maps. """
+    row: numpy.ndarray  # State row of the victim.
+    attacker: numpy.ndarray  # Craft index of the attacker.
+    value: numpy.ndarray
+
+
+class HeatFacts:
+    """ The columns of a single heat.
+
+    Craft are indexed by their position in names: the craft in the heat (in the order of the heat record, so also the row index), then any other names
+    that appear as attackers, killers or winners. Missing killers are UNKNOWN.
+    """
+
+    def __init__(self, heat: dict):
+        self.names: List[str] = list(heat['craft'].keys())
+        self.size = len(self.names)
+        index = {craft: i for i, craft in enumerate(self.names)}
+
+        def craft_id(name: str) -> int:
+            if name not in index:
+                index[name] = len(self.names)
+                self.names.append(name)
+            return index[name]
+
+        self.duration = heat['duration']
+        self.result: str = heat['result']['result']
+        self.teams: List[Tuple[str, str, bool]] = [(team, members, dead) for dead, key in ((False, 'teams'), (True, 'dead teams')) for team, members in heat['result'].get(key, {}).items()]
+        self.winners = numpy.array(sorted(set(craft_id(craft) for craft in next(iter(heat['result']['teams'].values())).split(", "))) if heat['result']['result'] == "Win" else [], dtype=int)
+        state, death_order, death_time, hp = [], [], [], []
+        hits, shots, rocket_strikes, rockets_fired, parts_lost_to_asteroids, hit_by = [], [], [], [], [], []
+        waypoint_count, waypoint_time, waypoint_row, waypoint_deviation = [], [], [], []  # The deviations have one entry per waypoint.
+        killers = {field: [] for field in KILL_FIELDS}
+        killed_by = {field: [] for field in KILL_FIELDS}
+        interactions = {field: ([], [], []) for field in BY_FIELDS}
+        rammed = set()  # Craft that rammed someone.
+        for row, data in enumerate(heat['craft'].values()):
+            state.append(STATES.index(data['state']))
+            death_order.append(data.get('deathOrder', numpy.nan))
+            death_time.append(data.get('deathTime', numpy.nan))
+            hp.append(data.get('HPremaining', numpy.nan))
+            hits.append(data.get('hits', 0))
+            shots.append(data.get('shots', 0))
+            rocket_strikes.append(data.get('rocket_strikes', 0))
+            rockets_fired.append(data.get('rockets_fired', 0))
+            parts_lost_to_asteroids.append(data.get('partsLostToAsteroids', 0))
+            hit_by.append(any(field in data for field in HIT_FIELDS))
+            waypoints = data.get('waypoints', ())
+            waypoint_count.append(len(waypoints))
+            waypoint_time.append(float(waypoints[-1][2]) - float(waypoints[0][2]) if 'waypoints' in data else numpy.nan)
+            for waypoint in waypoints:
+                waypoint_row.append(row)
+                waypoint_deviation.append(float(waypoint[1]))
+            for field in KILL_FIELDS:
+                killed_by[field].append(field in data)
+                killers[field].append(craft_id(data[field]) if field in data else UNKNOWN)
+            for field in BY_FIELDS:
+                if field in data:
+                    rows, attackers, values = interactions[field]
+                    rows.extend([row] * len(data[field]))
+                    attackers.extend([craft_id(attacker) for attacker in data[field]])
+                    values.extend(data[field].values())
+            if 'rammedPartsLostBy' in data:
+                rammed.update(data['rammedPartsLostBy'].keys())
+
+        self.state = numpy.array(state, dtype=int)
+        self.death_order = numpy.array(death_order, dtype=float)
+        self.death_time = numpy.array(death_time, dtype=float)
+        self.hp = numpy.array(hp, dtype=float)
+        self.hits = numpy.array(hits, dtype=numpy.int64)
+        self.shots = numpy.array(shots, dtype=numpy.int64)
+        self.rocket_strikes = numpy.array(rocket_strikes, dtype=numpy.int64)
+        self.rockets_fired = numpy.array(rockets_fired, dtype=numpy.int64)
+        self.parts_lost_to_asteroids = numpy.array(parts_lost_to_asteroids, dtype=numpy.int64)
+        self.hit_by = numpy.array(hit_by, dtype=bool)
+        self.waypoint_count = numpy.array(waypoint_count, dtype=numpy.int64)
+        self.waypoint_time = numpy.array(waypoint_time, dtype=float)
+        self.waypoint_row = numpy.array(waypoint_row, dtype=int)
+        self.waypoint_deviation = numpy.array(waypoint_deviation, dtype=float)
+        self.killed_by = {field: numpy.array(killed_by[field], dtype=bool) for field in KILL_FIELDS}
+        self.killers = {field: numpy.array(killers[field], dtype=int) for field in KILL_FIELDS}
+        self.interactions = {
+            field: Interactions(numpy.array(rows, dtype=int), numpy.array(attackers, dtype=int), numpy.array(values, dtype=BY_FIELDS[field][2]))
+            for field, (rows, attackers, values) in interactions.items()
+        }
+        self.rammed_someone = numpy.array([craft in rammed for craft in self.names[:self.size]], dtype=bool)
+
+
+class TournamentFacts:
+    """ Columnar fact table of the heats in tournamentData.
+
+    The table is the concatenation of the HeatFacts of each heat, with the craft indices mapped to the sorted list of craft in the tournament.
+    """
+    _rolled_up: Optional[Tuple[Dict[str, list], Dict[str, list]]] = None  # The summary fields per craft and per (craft, round), see _rollup.
+    COLUMNS = (  # The plain columns, see columns() for the per-field ones.
+        'heat_round', 'heat_duration', 'heat_float_duration', 'heat_size', 'winner_craft', 'winner_heat',
+        'row_heat', 'row_craft', 'state', 'death_order', 'death_time', 'hp', 'hits', 'shots', 'rocket_strikes', 'rockets_fired', 'parts_lost_to_asteroids', 'hit_by',
+        'waypoint_count', 'waypoint_time', 'rammed_someone', 'waypoint_row', 'waypoint_deviation',
+    )
+
+    def __init__(self, tournamentData: Dict[str, Dict[str, dict]], heat_facts: Optional[Dict[Tuple[str, str], Tuple[dict, HeatFacts]]] = None, merge_variants: bool = False):
+        """
+        Args:
+            tournamentData (Dict[str, Dict[str, dict]]): The heat records for each round.
+            heat_facts (Optional[Dict[Tuple[str, str], Tuple[dict, HeatFacts]]]): The HeatFacts from a previous update, keyed by (round, heat), to only build them for new or changed heats.
+                This is updated in place.
+            merge_variants (bool, optional): Index the variants of a craft ('Craft_1', 'Craft_2', etc., see variants.py) as the craft itself, so that all the
+                fields are for the merged craft. A win by several variants in a heat counts once. Defaults to False.
+        """
+        self.rounds: List[str] = list(tournamentData.keys())
+        blocks = []  # (round number, HeatFacts)
+        for round_number, (round_name, round) in enumerate(tournamentData.items()):
+            for heat_name, heat in round.items():
+                cached = heat_facts.get((round_name, heat_name)) if heat_facts is not None else None
+                if cached is not None and cached[0] is heat:
+                    blocks.append((round_number, cached[1]))
+                else:
+                    blocks.append((round_number, HeatFacts(heat)))
+                    if heat_facts is not None:
+                        heat_facts[(round_name, heat_name)] = (heat, blocks[-1][1])
+        if heat_facts is not None and len(heat_facts) > len(blocks):  # Drop heats that are gone.
+            current = set((round_name, heat_name) for round_name, round in tournamentData.items() for heat_name in round)
+            for key in [key for key in heat_facts if key not in current]:
+                del heat_facts[key]
+
+        self.craft: List[str] = sorted(set(craft for _, block in blocks for craft in block.names[:block.size]))
+        aliases = variant_aliases(self.craft) if merge_variants else {}
+        if len(aliases) > 0:
+            self.craft = [craft for craft in self.craft if craft not in aliases]
+        craft_index = {craft: i for i, craft in enumerate(self.craft)}
+        craft_index.update({variant: craft_index[base] for variant, base in aliases.items()})
+        mappings = [numpy.array([craft_index.get(name, UNKNOWN) for name in block.names] + [UNKNOWN], dtype=int) for _, block in blocks]  # Local UNKNOWN (-1) maps to the last entry.
+        sizes = numpy.array([block.size for _, block in blocks], dtype=int)
+        row_offsets = numpy.concatenate([[0], numpy.cumsum(sizes)[:-1]]).astype(int) if len(blocks) > 0 else numpy.zeros(0, dtype=int)
+
+        def concatenate(columns: list, dtype: type) -> numpy.ndarray:
+            return numpy.concatenate(columns).astype(dtype) if len(columns) > 0 else numpy.zeros(0, dtype=dtype)
+
+        self.heat_round = numpy.array([round_number for round_number, _ in blocks], dtype=int)
+        self.heat_duration = numpy.array([block.duration for _, block in blocks], dtype=float)
+        self.heat_float_duration = numpy.array([isinstance(block.duration, float) for _, block in blocks], dtype=bool)
+        self.heat_size = sizes
+        self.heat_result: List[str] = [block.result for _, block in blocks]
+        self.teams: List[Tuple[int, str, str, bool]] = [(heat, team, members, dead) for heat, (_, block) in enumerate(blocks) for team, members, dead in block.teams]  # (heat, team, members, dead)
+        winners = [(mapping[block.winners], numpy.full(len(block.winners), heat)) for heat, (mapping, (_, block)) in enumerate(zip(mappings, blocks))]
+        self.winner_craft = concatenate([craft for craft, _ in winners], int)
+        self.winner_heat = concatenate([heat for _, heat in winners], int)
+        known = self.winner_craft != UNKNOWN
+        self.winner_craft, self.winner_heat = self.winner_craft[known], self.winner_heat[known]
+        if len(aliases) > 0:  # Merged variants win a heat once.
+            self.winner_heat, self.winner_craft = numpy.divmod(numpy.unique(self.winner_heat * len(self.craft) + self.winner_craft), max(len(self.craft), 1))
+        self.row_heat = numpy.repeat(numpy.arange(len(blocks)), sizes)
+        self.row_craft = concatenate([mapping[:block.size] for mapping, (_, block) in zip(mappings, blocks)], int)
+        for column, dtype in (
+            ('state', int), ('death_order', float), ('death_time', float), ('hp', float), ('hits', numpy.int64), ('shots', numpy.int64), ('rocket_strikes', numpy.int64),
+            ('rockets_fired', numpy.int64), ('parts_lost_to_asteroids', numpy.int64), ('hit_by', bool), ('waypoint_count', numpy.int64), ('waypoint_time', float),
+            ('waypoint_deviation', float), ('rammed_someone', bool)
+        ):
+            setattr(self, column, concatenate([getattr(block, column) for _, block in blocks], dtype))
+        self.waypoint_row = concatenate([block.waypoint_row + offset for offset, (_, block) in zip(row_offsets, blocks)], int)
+        self.killed_by = {field: concatenate([block.killed_by[field] for _, block in blocks], bool) for field in KILL_FIELDS}
+        self.killers = {field: concatenate([mapping[block.killers[field]] for mapping, (_, block) in zip(mappings, blocks)], int) for field in KILL_FIELDS}
+        self.interactions = {
+            field: Interactions(
+                concatenate([block.interactions[field].row + offset for offset, (_, block) in zip(row_offsets, blocks)], int),
+                concatenate([mapping[block.interactions[field].attacker] for mapping, (_, block) in zip(mappings, blocks)], int),
+                concatenate([block.interactions[field].value for _, block in blocks], BY_FIELDS[field][2]),
+            ) for field in BY_FIELDS
+        }
+
+    def columns(self) -> Dict[str, numpy.ndarray]:
+        """ The columns of the table by name.
+
+        The per-field columns are named 'killed_by.<field>', 'killers.<field>' and 'interactions.<field>.<row|attacker|value>'.
+        """
+        columns = {column: getattr(self, column) for column in self.COLUMNS}
+        columns.update({f'killed_by.{field}': self.killed_by[field] for field in KILL_FIELDS})
+        columns.update({f'killers.{field}': self.killers[field] for field in KILL_FIELDS})
+        columns.update({f'interactions.{field}.{part}': getattr(self.interactions[field], part) for field in BY_FIELDS for part in Interactions._fields})
+        return columns
+
+    @classmethod
+    def from_columns(cls, craft: Sequence[str], rounds: Sequence[str], columns: Mapping[str, numpy.ndarray]) -> 'TournamentFacts':
+        """ Rebuild the table from its craft, rounds and columns (e.g., from a results store).
+
+        The heat results and teams aren't columns of the table, they're rebuilt from the 'result_types', 'heat_result' and 'team_*' arrays if columns has
+        them (as a results store does).
+
+        Args:
+            craft (Sequence[str]): The craft names.
+            rounds (Sequence[str]): The round names.
+            columns (Mapping[str, numpy.ndarray]): The columns, as from columns().
+
+        Returns:
+            TournamentFacts: The table.
+        """
+        facts = cls.__new__(cls)
+        facts.craft, facts.rounds = list(craft), list(rounds)
+        for column in cls.COLUMNS:
+            setattr(facts, column, columns[column])
+        facts.killed_by = {field: columns[f'killed_by.{field}'] for field in KILL_FIELDS}
+        facts.killers = {field: columns[f'killers.{field}'] for field in KILL_FIELDS}
+        facts.interactions = {field: Interactions(*(columns[f'interactions.{field}.{part}'] for part in Interactions._fields)) for field in BY_FIELDS}
+        facts.heat_result, facts.teams = [], []
+        if 'team_heat' in columns:
+            result_types, team_names = columns['result_types'].tolist(), columns['team_names'].tolist()
+            facts.heat_result = [result_types[result] for result in columns['heat_result'].tolist()]
+            facts.teams = [
+                (heat, team_names[team], members, dead)
+                for heat, team, members, dead in zip(*(columns[column].tolist() for column in ('team_heat', 'team_name', 'team_members', 'team_dead')))
+            ]
+        return facts
+
+    @staticmethod
+    def _typed(totals: numpy.ndarray, floats: numpy.ndarray) -> list:
+        """ Convert the totals to the type that sum() would have given: int if there were no float terms. """
+        return [float(total) if count > 0 else int(total) for total, count in zip(totals.tolist(), floats.tolist())]
+
+    def _rollup(self) -> Tuple[Dict[str, list], Dict[str, list]]:
+        """ Compute the summary fields for each craft and for each (craft, round) pair in one pass over the columns.
+
+        The masks and the selected kills, assists and interactions are computed once and accumulated per (craft, round). Counts and integer sums for each
+        craft are the sums of its per-round accumulators, while float sums are also accumulated per craft, since adding up the per-round partial sums would
+        change the order of the additions (and so the last bits of the totals).
+        The result is kept, so the tournament summary, the per-round summary and the round matrices (for scoring and weight sweeps) all share it.
+
+        Returns:
+            Tuple[Dict[str, list], Dict[str, list]]: The values of each summary field for each craft and for each (craft, round) pair (by craft, then round).
+                The waypoint fields are only in the per-round values, see waypoint_summary for the tournament ones.
+        """
+        if self._rolled_up is not None:
+            return self._rolled_up
+        C, R = len(self.craft), len(self.rounds)
+        zeros = (numpy.zeros(C, dtype=int), numpy.zeros(C * R, dtype=int))
+
+        def accumulate(craft: numpy.ndarray, heat: numpy.ndarray, values: numpy.ndarray = None) -> Tuple[numpy.ndarray, numpy.ndarray]:
+            """ Sum the values (in row order), or count the entries, per craft and per (craft, round). """
+            by_round = numpy.bincount(craft * R + self.heat_round[heat], weights=values, minlength=C * R)
+            if values is not None and values.dtype.kind == 'f':
+                return numpy.bincount(craft, weights=values, minlength=C), by_round
+            return by_round.reshape(C, R).sum(axis=1), by_round  # Exact for counts and integers.
+
+        def count(rows: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+            """ Count the selected rows (boolean mask). """
+            return accumulate(self.row_craft[rows], self.row_heat[rows])
+
+        def total(values: numpy.ndarray, rows: numpy.ndarray = None) -> Tuple[numpy.ndarray, numpy.ndarray]:
+            """ Sum the values, optionally only for the selected rows (boolean mask). """
+            if rows is None:
+                return accumulate(self.row_craft, self.row_heat, values)
+            return accumulate(self.row_craft[rows], self.row_heat[rows], values[rows])
+
+        def both(function, *values) -> tuple:
+            """ Apply the function to the per-craft and to the per-(craft, round) values. """
+            return tuple(function(*grouped) for grouped in zip(*values))
+
+        def tolist(*values: numpy.ndarray) -> list:
+            """ The values, or tuples of the values if there are several. """
+            return values[0].tolist() if len(values) == 1 else list(zip(*(value.tolist() for value in values)))
+
+        def dealt(field: str, exclude_self: bool = False) -> tuple:
+            """ Sum the values of the field per attacker, in the order of the victims. """
+            interactions = self.interactions[field]
+            known = interactions.attacker != UNKNOWN
+            if exclude_self:
+                known &= interactions.attacker != self.row_craft[interactions.row]
+            attacker, heat = interactions.attacker[known], self.row_heat[interactions.row[known]]
+            counts = accumulate(attacker, heat) if BY_FIELDS[field][2] is float else zeros
+            return both(self._typed, accumulate(attacker, heat, interactions.value[known]), counts)
+
+        def taken(field: str) -> tuple:
+            """ Sum the values of the field per victim. The values are summed per heat first, then over the heats, as in sum(sum(...) for heat in ...). """
+            interactions = self.interactions[field]
+            per_row = numpy.bincount(interactions.row, weights=interactions.value, minlength=len(self.row_heat))
+            if BY_FIELDS[field][2] is float:
+                return both(self._typed, total(per_row), accumulate(self.row_craft[interactions.row], self.row_heat[interactions.row]))
+            return both(self._typed, total(per_row.astype(numpy.int64)), zeros)
+
+        def integers(values: numpy.ndarray) -> tuple:
+            return both(lambda totals: totals.astype(numpy.int64).tolist(), total(values))
+
+        dead = self.state == DEAD
+        killed = numpy.zeros_like(dead)
+        for field in KILL_FIELDS:
+            killed |= self.killed_by[field]
+        alive = self.state == ALIVE
+        fields = {
+            'wins': both(tolist, accumulate(self.winner_craft, self.winner_heat)),
+            'survivedCount': both(tolist, count(alive)),
+            'miaCount': both(tolist, count(self.state == MIA)),
+        }
+        fields['deathCount'] = both(
+            tolist,
+            count(dead),  # Total
+            *(count(dead & self.killed_by[field]) for field in KILL_FIELDS),  # Bullets, Rockets, Missiles, Rams
+            count(dead & ~killed & self.hit_by),  # Dirty kill
+            count(dead & ~self.hit_by & ~self.rammed_someone),  # Suicide (died without being hit or ramming anyone).
+        )
+
+        has_death_order = ~numpy.isnan(self.death_order)
+        fields['deathOrder'] = both(self._typed, total(numpy.where(has_death_order, self.death_order / self.heat_size[self.row_heat], 1)), count(has_death_order))
+        has_death_time = ~numpy.isnan(self.death_time)
+        fields['deathTime'] = both(self._typed, total(numpy.where(has_death_time, self.death_time, self.heat_duration[self.row_heat])), count(has_death_time | self.heat_float_duration[self.row_heat]))
+
+        killers = numpy.stack([self.killers[field] for field in KILL_FIELDS])
+        clean_kills = []
+        first_kills = []  # Each victim counts once towards the total, even if the killer is listed for several kill types.
+        for i, field in enumerate(KILL_FIELDS):
+            known = killers[i] != UNKNOWN
+            clean_kills.append(accumulate(killers[i][known], self.row_heat[known]))
+            first = known & numpy.all(killers[:i] != killers[i], axis=0)
+            first_kills.append((killers[i][first], self.row_heat[first]))
+        any_kill = accumulate(*(numpy.concatenate(column) for column in zip(*first_kills)))
+        fields['cleanKills'] = both(tolist, any_kill, *clean_kills)
+
+        encoding = max(C, 1)
+        assist_pairs = []  # (victim row, attacker) pairs encoded as row * encoding + attacker, so that they're counted once even if the attacker appears in several fields.
+        for field in HIT_FIELDS:
+            interactions = self.interactions[field]
+            known = interactions.attacker != UNKNOWN
+            assist_pairs.append(interactions.row[known] * encoding + interactions.attacker[known])
+        assist_rows, assist_attackers = numpy.divmod(numpy.unique(numpy.concatenate(assist_pairs)), encoding)
+        assisted = (dead & ~killed)[assist_rows]
+        fields['assists'] = both(tolist, accumulate(assist_attackers[assisted], self.row_heat[assist_rows[assisted]]))
+
+        fields['hits'] = integers(self.hits)
+        for field, (dealt_field, taken_field, _) in BY_FIELDS.items():
+            if dealt_field is not None:
+                fields[dealt_field] = dealt(field, exclude_self=(field == 'battleDamageBy'))
+            fields[taken_field] = taken(field)
+        fields['partsLostToAsteroids'] = integers(self.parts_lost_to_asteroids)
+
+        has_hp = alive & ~numpy.isnan(self.hp)
+        hp = both(self._typed, total(self.hp, has_hp), count(has_hp))
+        fields['HPremaining'] = both(lambda hp, survived: [CalculateAvgHP(*values) for values in zip(hp, survived)], hp, fields['survivedCount'])
+        fields['accuracy'] = both(lambda hits, shots: [CalculateAccuracy(*values) for values in zip(hits, shots)], fields['hits'], integers(self.shots))
+        fields['rocket_accuracy'] = both(lambda strikes, fired: [CalculateAccuracy(*values) for values in zip(strikes, fired)], integers(self.rocket_strikes), integers(self.rockets_fired))
+
+        has_waypoints = ~numpy.isnan(self.waypoint_time)
+        fields['waypointCount'] = integers(self.waypoint_count)
+        fields['waypointTime'] = both(self._typed, total(self.waypoint_time, has_waypoints), count(has_waypoints))
+        waypoint_craft, waypoint_heat = self.row_craft[self.waypoint_row], self.row_heat[self.waypoint_row]
+        fields['waypointDeviation'] = both(self._typed, accumulate(waypoint_craft, waypoint_heat, self.waypoint_deviation), accumulate(waypoint_craft, waypoint_heat))  # Summed over all the waypoints, not per heat.
+
+        self._rolled_up = (
+            {field: values[0] for field, values in fields.items() if field not in WAYPOINT_FIELDS},
+            {field: values[1] for field, values in fields.items()},
+        )
+        return self._rolled_up
+
+    def summary(self) -> Dict[str, dict]:
+        """ Compute the craft fields of the tournament summary.
+
+        Returns:
+            Dict[str, dict]: The summary fields for each craft.
+        """
+        fields, _ = self._rollup()
+        return {craft: {field: values[c] for field, values in fields.items()} for c, craft in enumerate(self.craft)}
+
+    def round_summary(self) -> Dict[str, List[dict]]:
+        """ Compute the summary fields of each craft in each round.
+
+        Returns:
+            Dict[str, List[dict]]: The summary fields for each craft for each round.
+        """
+        _, fields = self._rollup()
+        R = len(self.rounds)
+        return {craft: [{field: values[c * R + r] for field, values in fields.items()} for r in range(R)] for c, craft in enumerate(self.craft)}
+
+    def round_matrix(self, fields: Sequence[str]) -> numpy.ndarray:
+        """ Compute the (craft x round x field) matrix of the per-round summary fields for scoring, without building the per-round dicts.
+
+        As in scoring.Scorer.round_matrix, tuple fields use their first (total) element and unknown fields are 0.
+
+        Args:
+            fields (Sequence[str]): The summary fields.
+
+        Returns:
+            numpy.ndarray: The matrix of the fields for each craft in each round.
+        """
+        _, values = self._rollup()
+        matrix = numpy.zeros((len(self.craft) * len(self.rounds), len(fields)))
+        for i, field in enumerate(fields):
+            if field in values and len(values[field]) > 0:
+                matrix[:, i] = [value[0] for value in values[field]] if isinstance(values[field][0], tuple) else values[field]
+        return matrix.reshape(len(self.craft), len(self.rounds), len(fields))
+
+    def waypoint_summary(self) -> Dict[str, dict]:
+        """ Compute the waypoint fields of the tournament summary.
+
+        The deviations are summed per heat, then over the heats. The best count is the most waypoints a craft reached in a heat, and the best time and
+        deviation are the lowest of its heats with the best count (0 if it has none).
+
+        Returns:
+            Dict[str, dict]: The waypoint fields for each craft, or nothing if there are no waypoint results.
+        """
+        has_waypoints = ~numpy.isnan(self.waypoint_time)
+        if not numpy.any(has_waypoints):
+            return {}
+        C = len(self.craft)
+        craft = self.row_craft[has_waypoints]
+        waypoint_count = self.waypoint_count[has_waypoints]
+        waypoint_time = self.waypoint_time[has_waypoints]
+        deviation = numpy.bincount(self.waypoint_row, weights=self.waypoint_deviation, minlength=len(self.row_craft))[has_waypoints]  # Per heat.
+        heats = numpy.bincount(craft, minlength=C)
+        best_count = numpy.zeros(C, dtype=numpy.int64)
+        numpy.maximum.at(best_count, craft, waypoint_count)
+        best = waypoint_count == best_count[craft]
+        best_heats = numpy.bincount(craft[best], minlength=C)
+        best_time, best_deviation = numpy.full(C, numpy.inf), numpy.full(C, numpy.inf)
+        numpy.minimum.at(best_time, craft[best], waypoint_time[best])
+        numpy.minimum.at(best_deviation, craft[best], deviation[best])
+        fields = {
+            'waypointCount': numpy.bincount(craft, weights=waypoint_count, minlength=C).astype(numpy.int64).tolist(),
+            'waypointTime': self._typed(numpy.bincount(craft, weights=waypoint_time, minlength=C), heats),
+            'waypointDeviation': self._typed(numpy.bincount(craft, weights=deviation, minlength=C), heats),
+            'waypointBestCount': best_count.tolist(),
+            'waypointBestTime': self._typed(numpy.where(best_heats > 0, best_time, 0), best_heats),
+            'waypointBestDeviation': self._typed(numpy.where(best_heats > 0, best_deviation, 0), best_heats),
+        }
+        return {craft: {field: values[c] for field, values in fields.items()} for c, craft in enumerate(self.craft)}
+
+    def team_results(self) -> Tuple[Counter, Counter, Counter, Dict[str, str]]:
+        """ Count the wins, draws and deaths of each team and find the members of each team.
+
+        Returns:
+            Tuple[Counter, Counter, Counter, Dict[str, str]]: The wins, draws and deaths of each team (in order of first occurrence) and the members of each
+                team (from its last listing in the dead teams of a heat, otherwise in the teams).
+        """
+        wins, draws, deaths = Counter(), Counter(), Counter()
+        members, dead_members = {}, {}
+        for heat, team, team_members, dead in self.teams:
+            if dead:
+                deaths[team] += 1
+                dead_members[team] = team_members
+                continue
+            if self.heat_result[heat] == "Win":
+                wins[team] += 1
+            elif self.heat_result[heat] == "Draw":
+                draws[team] += 1
+            members[team] = team_members
+        members.update(dead_members)
+        return wins, draws, deaths, members
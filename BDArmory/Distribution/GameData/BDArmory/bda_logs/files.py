@@ -0,0 +1,35 @@
+""" File helpers. """
+
+# Standard library imports
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator
+
+
+@contextmanager
+def atomic_open(path: Path, mode: str = 'w') -> Iterator[IO]:
+    """ Open a temporary file that replaces path once it's been written, so that readers (and interrupted runs) never see a partially written file.
+
+    Args:
+        path (Path): The file to write.
+        mode (str, optional): 'w' or 'wb'. Defaults to 'w'.
+
+    Yields:
+        IO: The temporary file.
+    """
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, mode, encoding='utf-8' if 'b' not in mode else None) as f:
+        yield f
+    os.replace(tmp, path)
+
+
+def write_atomically(path: Path, text: str):
+    """ Write text to path via a temporary file (see atomic_open).
+
+    Args:
+        path (Path): The file to write.
+        text (str): The contents.
+    """
+    with atomic_open(path) as f:
+        f.write(text)
@@ -0,0 +1,51 @@
+""" Parsing of a single heat log into its heat record. """
+
+# Standard library imports
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+# Local imports
+from . import profiling
+from .names import encode_names
+from .reader import read_competition_lines
+from .tokenizer import tokenize_heat_log
+
+
+def parse_heat_log(log_lines: List[str]) -> Tuple[dict, List[Tuple[float, datetime]]]:
+    """ Parse the log lines of a heat.
+
+    Args:
+        log_lines (List[str]): The (stripped) log lines.
+
+    Returns:
+        Tuple[dict, List[Tuple[float, datetime]]]: The heat record and the (duration, timestamp) of each 'Dumping Results' line.
+    """
+    heat_data = {'result': None, 'duration': 0, 'craft': {}}
+    durations = []
+    profiler = profiling.current()
+    with profiler.phase('encode names'):
+        encoded_craft_names, log_lines = encode_names(log_lines)
+    with profiler.phase('dispatch events'):
+        for event in profiler.counted(tokenize_heat_log(log_lines, encoded_craft_names), 'events'):
+            if event.kind == 'craft':
+                heat_data['craft'][event.craft].update(event.data)
+            elif event.kind == 'state':
+                heat_data['craft'][event.craft] = event.data
+            elif event.kind == 'duration':
+                heat_data['duration'] = event.data[0]
+                durations.append(event.data)
+            elif event.kind == 'result':
+                heat_data['result'] = event.data
+            elif event.kind == 'dead teams':
+                heat_data['result'].update(event.data)
+    return heat_data, durations
+
+
+def parse_heat_log_file(log_file: Path) -> Tuple[dict, List[Tuple[float, datetime]]]:
+    """ Parse a heat log file (see parse_heat_log). Only the competition lines are read (see read_competition_lines). """
+    profiler = profiling.current()
+    with profiler.phase('read lines'):
+        log_lines = read_competition_lines(log_file)
+        profiler.count('lines', len(log_lines))
+    return parse_heat_log(log_lines)
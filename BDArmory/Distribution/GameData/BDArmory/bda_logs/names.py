@@ -0,0 +1,93 @@
+""" Craft name resolution for heat logs.
+
+Craft names can contain anything, including ':', so they are swapped for tokens holding an integer craft ID before the lines are split into fields.
+All the names are matched in a single pass per line by a regex compiled from a trie of the names and anchored to the field boundaries.
+The regex engine walks the trie in C instead of calling str.replace once per name per line.
+"""
+
+# Standard library imports
+import json
+import re
+from typing import Dict, Iterable, List, Tuple
+
+# Local imports
+from .tokenizer import COMPETITION_TAG
+
+CRAFT_ID_TOKEN = '\ue000{}\ue001'  # Private use characters: not ':', JSON-safe and not going to appear in craft names.
+
+
+def _trie_regex(node: dict) -> str:
+    """ Convert a trie of characters into a regex that matches the longest word in the trie. """
+    branches = [re.escape(char) + _trie_regex(child) for char, child in node.items() if char != '']
+    if len(branches) == 0:
+        return ''
+    if len(branches) == 1 and '' not in node:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')' + ('?' if '' in node else '')  # Greedy, so longer names are tried first.
+
+
+class CraftNameMatcher:
+    """ Match all the craft names in a line in a single pass, replacing them with craft ID tokens.
+
+    Names only match whole fields (after a ':' or '"' and before a ':', '"' or the end of the line), so names containing ':' can't match across the tag or other names.
+    Within a field, the longest name wins, so a name that is a prefix of another name (e.g., 'Craft' and 'Craft_1') doesn't split the longer name.
+    """
+
+    def __init__(self, craft_names: Iterable[str]):
+        self.names: List[str] = sorted(set(craft_names))  # Craft ID -> name.
+        self.ids: Dict[str, int] = {name: craft_id for craft_id, name in enumerate(self.names)}
+        self.tokens: Dict[str, str] = {CRAFT_ID_TOKEN.format(craft_id): name for craft_id, name in enumerate(self.names)}  # Token -> name, for the tokenizer.
+        self._replacements = {name: CRAFT_ID_TOKEN.format(craft_id) for craft_id, name in enumerate(self.names)}
+        trie = {}
+        for name in self.names:
+            node = trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[''] = {}  # End of a name.
+        self._pattern = re.compile('(?<=[:"])' + _trie_regex(trie) + '(?=[:"]|$)') if len(self.names) > 0 else None
+
+    def _replace(self, match: re.Match) -> str:
+        return self._replacements[match[0]]
+
+    def rewrite(self, line: str) -> str:
+        """ Replace the craft names in the line with their tokens. """
+        return self._pattern.sub(self._replace, line) if self._pattern is not None else line
+
+
+def collect_craft_names(log_lines: Iterable[str]) -> List[str]:
+    """ Find the craft names from the ALIVE, DEAD and MIA lines of a heat log.
+
+    The JSON-escaped versions of the names (as they appear in the RESULT and DEADTEAMS lines) are included.
+
+    Args:
+        log_lines (Iterable[str]): The log lines.
+
+    Returns:
+        List[str]: The craft names.
+    """
+    craft_names = set()
+    for line in log_lines:
+        m = COMPETITION_TAG.match(line)
+        if m is None:
+            continue
+        tag = m.group(1)
+        if tag == 'DEAD':
+            craft_names.add(line[m.end() + 1:].split(':', 2)[2])
+        elif tag in ('MIA', 'ALIVE'):
+            craft_names.add(line[m.end() + 1:])
+    craft_names.update({json.dumps(name, ensure_ascii=False)[1:-1] for name in craft_names})  # Handle manually encoded DEADTEAMS.
+    return sorted(craft_names)
+
+
+def encode_names(log_lines: List[str]) -> Tuple[Dict[str, str], List[str]]:
+    """ Replace the craft names in the log lines with craft ID tokens to avoid issues with naming.
+
+    Args:
+        log_lines (List[str]): The log lines.
+
+    Returns:
+        Tuple[Dict[str, str], List[str]]: The dictionary of tokens to actual names and the modified log lines.
+    """
+    matcher = CraftNameMatcher(collect_craft_names(log_lines))
+    rewrite = matcher.rewrite
+    return matcher.tokens, log_lines[:1] + [rewrite(line) for line in log_lines[1:]]  # The first line doesn't contain craft names
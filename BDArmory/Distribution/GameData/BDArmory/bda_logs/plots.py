@@ -0,0 +1,74 @@
+""" Plots of tournament results (plot_summary.py and parse_pvp_scores.py --plot).
+
+This is the only module that needs matplotlib, so import it only when plotting.
+"""
+
+# Standard library imports
+import math
+from typing import Dict, List, Optional, Sequence
+
+# Third party imports
+import matplotlib.pyplot as plt
+import numpy
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+
+def plot_cumulative_scores(names: Sequence[str], scores: numpy.ndarray, title: Optional[str] = None, cut_zero: bool = False) -> Figure:
+    """ Plot the scores of the craft as they accumulated per round.
+
+    Args:
+        names (Sequence[str]): The craft, in the order of the legend.
+        scores (numpy.ndarray): The (craft x round) cumulative scores.
+        title (Optional[str], optional): A title. Defaults to none.
+        cut_zero (bool, optional): Cut the y axis off at zero to avoid large negative scores. Defaults to False.
+
+    Returns:
+        Figure: The figure.
+    """
+    fig = plt.figure(figsize=(16, 10), dpi=200)
+    plt.plot(numpy.asarray(scores).transpose(), linewidth=5)
+    plt.axhline(color='black')
+    if len(names) > 16:  # Roughly half the plot height, put them outside the graph
+        plt.legend(names, loc='upper left', bbox_to_anchor=(1, 1))
+    else:
+        plt.legend(names, loc='upper left')
+    plt.autoscale(enable=True, tight=True)
+    plt.tight_layout()
+    if cut_zero:
+        y0, y1 = plt.ylim()
+        plt.ylim(max(y0, 0), y1)
+    if title is not None:
+        plt.title(title)
+    return fig
+
+
+def plot_pvp_scores(score_totals: Dict[str, Dict[str, float]]) -> Figure:
+    """ Plot the PvP score totals as a network of the players, with an edge from each player to each opponent whose width is the player's score against them.
+
+    Args:
+        score_totals (Dict[str, Dict[str, float]]): The total score of each player against each opponent (as from pvp.pvp_report).
+
+    Returns:
+        Figure: The figure.
+    """
+    grand_totals = {player: sum(scores.values()) for player, scores in score_totals.items()}
+    players: List[str] = sorted(grand_totals, key=lambda k: grand_totals[k], reverse=True)
+    L = len(score_totals)
+    angles = numpy.arange(L) * 2 * math.pi / L
+    nodes = numpy.stack([numpy.sin(angles), numpy.cos(angles)], axis=1)
+    colours = plt.get_cmap('hsv')(numpy.arange(L) / L)
+    p0, p1 = (index.ravel() for index in numpy.meshgrid(numpy.arange(L), numpy.arange(L), indexing='ij'))
+    p0, p1 = p0[p0 != p1], p1[p0 != p1]  # All the directed edges, as (from, to) player indices.
+    widths = numpy.array([score_totals[players[i]][players[j]] for i, j in zip(p0.tolist(), p1.tolist())], dtype=float)
+    order = numpy.argsort(-widths, kind='stable')  # Widest first, so that the narrower edges are drawn on top.
+    p0, p1, widths = p0[order], p1[order], widths[order]
+    minWidth, maxWidth = (widths.min(), widths.max()) if len(widths) > 0 else (0, 0)
+    fig, ax = plt.subplots(figsize=(16, 10), dpi=200)
+    for i in range(L):
+        ax.plot(nodes[i, 0], nodes[i, 1], color=colours[i], marker='*', markersize=20)
+    ax.add_collection(LineCollection(numpy.stack([nodes[p0], nodes[p1]], axis=1), colors=colours[p0], linewidths=widths * 10 / ((maxWidth - minWidth) or 1) + minWidth + 2, capstyle='round'))  # All the edges in one artist.
+    ax.autoscale_view()
+    ax.legend(players, loc='upper right')
+    ax.axis('equal')
+    return fig
@@ -0,0 +1,21 @@
+""" Process pools for parsing logs in parallel (--jobs). """
+
+# Standard library imports
+import multiprocessing
+import signal
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+
+def make_process_pool(jobs: int) -> Optional[Executor]:
+    """ A pool of jobs worker processes, or None to parse serially (for a single job, or where the pool isn't supported).
+
+    The workers are forked, as other start methods would re-run the calling script in them, and they ignore Ctrl-C, leaving it to the main process.
+    """
+    if jobs <= 1:
+        return None
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        print("Parallel parsing (--jobs) isn't supported on this platform, parsing serially.", file=sys.stderr)
+        return None
+    return ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context('fork'), initializer=signal.signal, initargs=(signal.SIGINT, signal.SIG_IGN))
@@ -0,0 +1,180 @@
+""" Phase profiling for the log parsers (--profile).
+
+A Profiler records the wall time, CPU time, calls, event counts and peak RSS of named phases. Phases nest, so each tournament (or log) is a top-level
+phase with the parsing phases inside it, and repeated phases (e.g., per heat) accumulate into one entry.
+Phases are either entered with `with profiler.phase(name):`, or marked with start/stop and section (which ends the previous section at the same level)
+to split a long stretch of code into phases without re-indenting it.
+
+The parsers and the shared modules get the profiler from current(), which is a NullProfiler unless enable() has been called. Its methods do nothing
+(phase returns a shared no-op context manager), so the instrumentation doesn't slow down normal runs.
+Peak RSS is the high-water mark of the process at the end of each phase (it's not available on Windows).
+Note: phases that run in other processes (e.g., heats parsed with --jobs) aren't recorded.
+"""
+
+# Standard library imports
+import contextlib
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+T = TypeVar('T')
+
+
+def peak_rss() -> Optional[float]:
+    """ The peak resident set size (MB) of this process so far. """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)  # Bytes on macOS, kB elsewhere.
+
+
+class PhaseStats:
+    """ The accumulated statistics of a phase. """
+    __slots__ = ('wall_time', 'cpu_time', 'calls', 'counts', 'peak_rss')
+
+    def __init__(self):
+        self.wall_time = 0.
+        self.cpu_time = 0.
+        self.calls = 0
+        self.counts = Counter()
+        self.peak_rss = None
+
+    def as_dict(self) -> dict:
+        return {'wall time': self.wall_time, 'cpu time': self.cpu_time, 'calls': self.calls, 'counts': dict(self.counts), 'peak rss': self.peak_rss}
+
+
+class Profiler:
+    """ Record the statistics of named, nested phases. """
+    enabled = True
+
+    def __init__(self):
+        self.phases: Dict[Tuple[str, ...], PhaseStats] = {}  # Path of phase names -> stats, in the order the phases were first entered.
+        self._stack: List[Tuple[Tuple[str, ...], float, float, bool]] = []  # (path, start wall time, start CPU time, is a section) of the open phases.
+        self._start = (time.perf_counter(), time.process_time())
+
+    def start(self, name: str):
+        """ Start a phase inside the current phase. """
+        self._push(name, False)
+
+    def stop(self):
+        """ Stop the current phase (and its open section). """
+        if len(self._stack) > 0 and self._stack[-1][3]:
+            self._pop()
+        self._pop()
+
+    def section(self, name: str):
+        """ End the current section (if any) and start a new one at the same level. """
+        if len(self._stack) > 0 and self._stack[-1][3]:
+            self._pop()
+        self._push(name, True)
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """ Context manager for a phase inside the current phase. """
+        self._push(name, False)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def count(self, name: str, n: int = 1):
+        """ Add to a count of the current phase. """
+        if len(self._stack) > 0:
+            self.phases[self._stack[-1][0]].counts[name] += n
+
+    def counted(self, iterable: Iterable[T], name: str) -> Iterator[T]:
+        """ Pass through the items of iterable, adding their number to a count of the phase that's current when it's exhausted. """
+        n = 0
+        for n, item in enumerate(iterable, 1):
+            yield item
+        self.count(name, n)
+
+    def _push(self, name: str, is_section: bool):
+        path = (self._stack[-1][0] if len(self._stack) > 0 else ()) + (name,)
+        if path not in self.phases:
+            self.phases[path] = PhaseStats()
+        self._stack.append((path, time.perf_counter(), time.process_time(), is_section))
+
+    def _pop(self):
+        path, wall_time, cpu_time, _ = self._stack.pop()
+        stats = self.phases[path]
+        stats.wall_time += time.perf_counter() - wall_time
+        stats.cpu_time += time.process_time() - cpu_time
+        stats.calls += 1
+        stats.peak_rss = peak_rss()
+
+    def report(self, name: str) -> List[str]:
+        """ A compact table of the phases inside a top-level phase (e.g., a tournament). """
+        top = self.phases.get((name,))
+        if top is None:
+            return []
+        rss = f", peak RSS {top.peak_rss:.1f}MB" if top.peak_rss is not None else ""
+        strings = [f"Profile of {name}: {top.wall_time:.3f}s wall, {top.cpu_time:.3f}s CPU{rss}"]
+        rows = [(path, stats) for path, stats in self.phases.items() if len(path) > 1 and path[0] == name]
+        if len(rows) == 0:
+            return strings
+        name_length = max(2 * (len(path) - 2) + len(path[-1]) for path, _ in rows)
+        strings.append(f"{'Phase':{name_length}s}  {'Wall(s)':>8s}  {'%':>5s}  {'CPU(s)':>8s}  {'Calls':>6s}  {'Peak MB':>8s}  Counts")
+        order = {path: index for index, path in enumerate(self.phases)}
+        for path, stats in sorted(rows, key=lambda row: [order[row[0][:depth]] for depth in range(1, len(row[0]) + 1)]):  # Depth-first, in order of entry.
+            label = '  ' * (len(path) - 2) + path[-1]
+            percent = 100 * stats.wall_time / top.wall_time if top.wall_time > 0 else 0
+            counts = ", ".join(f"{count}={value}" for count, value in stats.counts.items())
+            strings.append(f"{label:{name_length}s}  {stats.wall_time:8.3f}  {percent:5.1f}  {stats.cpu_time:8.3f}  {stats.calls:6d}  " + (f"{stats.peak_rss:8.1f}" if stats.peak_rss is not None else f"{'-':>8s}") + f"  {counts}".rstrip())
+        return strings
+
+    def trace(self) -> dict:
+        """ The statistics of all the phases, for writing as JSON. """
+        return {
+            'command': sys.argv,
+            'wall time': time.perf_counter() - self._start[0],
+            'cpu time': time.process_time() - self._start[1],
+            'peak rss': peak_rss(),
+            'phases': [dict(path=list(path), **stats.as_dict()) for path, stats in self.phases.items()],
+        }
+
+
+class NullProfiler:
+    """ A profiler that does nothing, for when profiling is off. """
+    enabled = False
+    _null_context = contextlib.nullcontext()
+
+    def start(self, name: str):
+        pass
+
+    def stop(self):
+        pass
+
+    def section(self, name: str):
+        pass
+
+    def phase(self, name: str) -> contextlib.nullcontext:
+        return self._null_context
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def counted(self, iterable: Iterable[T], name: str) -> Iterable[T]:
+        return iterable
+
+
+NULL_PROFILER = NullProfiler()
+_current: Union[Profiler, NullProfiler] = NULL_PROFILER
+
+
+def current() -> Union[Profiler, NullProfiler]:
+    """ The active profiler (a NullProfiler unless profiling has been enabled). """
+    return _current
+
+
+def enable() -> Profiler:
+    """ Start profiling (if it isn't already), returning the active profiler. """
+    global _current
+    if not _current.enabled:
+        _current = Profiler()
+    return _current
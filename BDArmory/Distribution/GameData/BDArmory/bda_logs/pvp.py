@@ -0,0 +1,233 @@
+""" Pairwise player vs player (PvP) scores (parse_pvp_scores.py).
+
+Each craft's score in a heat is split between its opponents: the pair fields (kills, assists, hits, damage, etc. between the craft and an opponent)
+score against that opponent, and the shared fields (wins, survival, accuracy, etc.) score against all the opponents equally.
+
+The directed (craft, opponent) pairs of every heat are built from the fact table (see facts.py) as arrays, with a (pair x field) value for each
+weighted field. The weights are applied to these one field at a time, and the pair scores are then added up per (round, craft, opponent) with a single
+numpy.bincount, which accumulates in the order of the heats, as the nested dict loops did. This keeps the scores identical to the previous per-heat sums.
+The (round x craft x opponent x field) totals of the fields are also available (field_tensor) for analysing what the scores are made of.
+"""
+
+# Standard library imports
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# Third party imports
+import numpy
+
+# Local imports
+from .facts import ALIVE, DEAD, HIT_FIELDS, KILL_FIELDS, MIA, UNKNOWN, TournamentFacts
+
+SHARED_FIELDS = ('wins', 'survivedCount', 'miaCount', 'deathCount', 'deathOrder', 'deathTime', 'HPremaining', 'accuracy', 'rocket_accuracy')
+PAIR_BY_FIELDS = {  # Pair field dealt to the opponent: the '...By' map of the opponent that it's from. The taken field ('...Taken') is from the craft's map.
+    'hits': 'hitsBy',
+    'bulletDamage': 'bulletDamageBy',
+    'rocketHits': 'rocketHitsBy',
+    'rocketPartsHit': 'rocketPartsHitBy',
+    'rocketDamage': 'rocketDamageBy',
+    'missileHits': 'missileHitsBy',
+    'missilePartsHit': 'missilePartsHitBy',
+    'missileDamage': 'missileDamageBy',
+    'ramScore': 'rammedPartsLostBy',
+    'battleDamage': 'battleDamageBy',
+}
+PAIR_FIELDS = ('cleanKills', 'assists') + tuple(field for dealt in PAIR_BY_FIELDS for field in (dealt, dealt + 'Taken'))
+
+
+class PvpScores:
+    """ The PvP scores of a tournament as a (round x player x opponent) tensor.
+
+    Players are the craft of the fact table, or their base names when variants are merged (aliases), in which case the scores between variants of the
+    same craft are the player's scores against itself.
+    """
+
+    def __init__(self, facts: TournamentFacts, weights: Mapping[str, float], aliases: Optional[Mapping[str, str]] = None):
+        """
+        Args:
+            facts (TournamentFacts): The fact table of the tournament (without merged variants).
+            weights (Mapping[str, float]): The score weights of the fields (fields that aren't shared or pair fields count as 0).
+            aliases (Optional[Mapping[str, str]], optional): The player that each craft counts as (see variants.variant_aliases). Defaults to none.
+        """
+        self.facts = facts
+        self.weights = dict(weights)
+        aliases = aliases or {}
+        self.players: List[str] = sorted(set(aliases.get(craft, craft) for craft in facts.craft))
+        player_index = {player: i for i, player in enumerate(self.players)}
+        self.player_of_craft = numpy.array([player_index[aliases.get(craft, craft)] for craft in facts.craft], dtype=int)
+        self.craft_row, self.opponent_row = self._pairs()
+        self.pair_heat = facts.row_heat[self.craft_row]
+        self.pair_round = facts.heat_round[self.pair_heat]
+        self.pair_player = self.player_of_craft[facts.row_craft[self.craft_row]]
+        self.pair_opponent = self.player_of_craft[facts.row_craft[self.opponent_row]]
+        self._scores = None
+
+    def _pairs(self) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """ The rows of the craft and the opponent of each directed pair in each heat, in the order of the heats, craft, then opponents. """
+        facts = self.facts
+        opponents = facts.heat_size[facts.row_heat] - 1  # Per row.
+        heat_start = numpy.concatenate([[0], numpy.cumsum(facts.heat_size)[:-1]]).astype(int) if len(facts.heat_size) > 0 else numpy.zeros(0, dtype=int)
+        craft_row = numpy.repeat(numpy.arange(len(facts.row_heat)), opponents)
+        pair_start = numpy.concatenate([[0], numpy.cumsum(opponents)[:-1]]).astype(int) if len(opponents) > 0 else numpy.zeros(0, dtype=int)
+        k = numpy.arange(len(craft_row)) - numpy.repeat(pair_start, opponents)  # Position among the opponents.
+        start = heat_start[facts.row_heat[craft_row]]
+        k += k >= craft_row - start  # Skip the craft itself.
+        return craft_row, start + k
+
+    def _lookup(self, by_field: str, victim_row: numpy.ndarray, attacker_row: numpy.ndarray) -> numpy.ndarray:
+        """ The value in the '...By' map of each victim row for the craft of the attacker row (0 if it's not there). """
+        interactions = self.facts.interactions[by_field]
+        stride = len(self.facts.craft) + 1
+        keys = interactions.row * stride + (interactions.attacker - UNKNOWN)
+        order = numpy.argsort(keys, kind='stable')
+        keys = keys[order]
+        wanted = victim_row * stride + (self.facts.row_craft[attacker_row] - UNKNOWN)
+        position = numpy.minimum(numpy.searchsorted(keys, wanted), max(len(keys) - 1, 0))
+        found = keys[position] == wanted if len(keys) > 0 else numpy.zeros(len(wanted), dtype=bool)
+        return numpy.where(found, interactions.value[order][position] if len(keys) > 0 else 0, 0)
+
+    def shared_values(self, field: str) -> numpy.ndarray:
+        """ The value of a shared field for each row (craft in a heat). """
+        facts = self.facts
+        if field == 'wins':
+            C = len(facts.craft)
+            return numpy.isin(facts.row_heat * C + facts.row_craft, facts.winner_heat * C + facts.winner_craft).astype(int)
+        if field == 'survivedCount':
+            return (facts.state == ALIVE).astype(int)
+        if field == 'miaCount':
+            return (facts.state == MIA).astype(int)
+        if field == 'deathCount':
+            return (facts.state == DEAD).astype(int)
+        if field == 'deathOrder':
+            return numpy.where(numpy.isnan(facts.death_order), 1, facts.death_order / facts.heat_size[facts.row_heat])
+        if field == 'deathTime':
+            return numpy.where(numpy.isnan(facts.death_time), facts.heat_duration[facts.row_heat], facts.death_time)
+        if field == 'HPremaining':
+            return numpy.where((facts.state == ALIVE) & ~numpy.isnan(facts.hp), facts.hp, 0)
+        if field in ('accuracy', 'rocket_accuracy'):
+            hits, shots = (facts.hits, facts.shots) if field == 'accuracy' else (facts.rocket_strikes, facts.rockets_fired)
+            return numpy.where(shots > 0, 100 * hits / numpy.maximum(shots, 1), 0)
+        return numpy.zeros(len(facts.row_heat), dtype=int)
+
+    def pair_values(self, field: str) -> numpy.ndarray:
+        """ The value of a pair field for each directed pair. """
+        facts = self.facts
+        craft_row, opponent_row = self.craft_row, self.opponent_row
+        if field == 'cleanKills':
+            kills = numpy.zeros(len(craft_row), dtype=bool)
+            for kill_field in KILL_FIELDS:
+                kills |= facts.killers[kill_field][opponent_row] == facts.row_craft[craft_row]
+            return kills.astype(int)
+        if field == 'assists':
+            hit = numpy.zeros(len(craft_row), dtype=bool)
+            for by_field in HIT_FIELDS:
+                interactions = facts.interactions[by_field]
+                stride = len(facts.craft) + 1
+                hit |= numpy.isin(opponent_row * stride + (facts.row_craft[craft_row] - UNKNOWN), interactions.row * stride + (interactions.attacker - UNKNOWN))
+            clean = numpy.zeros(len(facts.row_heat), dtype=bool)
+            for kill_field in KILL_FIELDS:
+                clean |= facts.killed_by[kill_field]
+            return ((facts.state[opponent_row] == DEAD) & hit & ~clean[opponent_row]).astype(int)
+        if field in PAIR_BY_FIELDS:
+            return self._lookup(PAIR_BY_FIELDS[field], opponent_row, craft_row)
+        if field.endswith('Taken') and field[:-len('Taken')] in PAIR_BY_FIELDS:
+            return self._lookup(PAIR_BY_FIELDS[field[:-len('Taken')]], craft_row, opponent_row)
+        return numpy.zeros(len(craft_row), dtype=int)
+
+    def _weighted(self, fields: Tuple[str, ...], values) -> numpy.ndarray:
+        """ The weighted sum of the fields, one field at a time in the order of the weights (as sum() would). Other weighted fields count as 0. """
+        total = 0
+        for field, weight in self.weights.items():
+            total = total + weight * (values(field) if field in fields else 0.)
+        return total
+
+    @property
+    def scores(self) -> numpy.ndarray:
+        """ The (round x player x opponent) PvP scores: the pair score plus the opponent's share of the shared score, added up over the heats of each round. """
+        if self._scores is None:
+            R, P = len(self.facts.rounds), len(self.players)
+            shared = self._weighted(SHARED_FIELDS, self.shared_values) * numpy.ones(len(self.facts.row_heat))
+            pair = self._weighted(PAIR_FIELDS, self.pair_values) * numpy.ones(len(self.craft_row))
+            share = shared[self.craft_row] / (self.facts.heat_size[self.pair_heat] - 1)
+            keys = (self.pair_round * P + self.pair_player) * P + self.pair_opponent
+            terms = numpy.stack([pair, share], axis=1).ravel()  # (score vs opponent, share of score vs all) for each pair in turn.
+            self._scores = numpy.bincount(numpy.repeat(keys, 2), weights=terms, minlength=R * P * P).reshape(R, P, P)
+        return self._scores
+
+    @property
+    def met(self) -> numpy.ndarray:
+        """ The (round x player x opponent) mask of the pairs that met in each round. """
+        R, P = len(self.facts.rounds), len(self.players)
+        return numpy.bincount((self.pair_round * P + self.pair_player) * P + self.pair_opponent, minlength=R * P * P).reshape(R, P, P) > 0
+
+    def field_tensor(self, fields: Optional[Tuple[str, ...]] = None) -> numpy.ndarray:
+        """ The (round x player x opponent x field) totals of the unweighted fields (the shared fields are split between the opponents).
+
+        Args:
+            fields (Optional[Tuple[str, ...]], optional): The fields. Defaults to the shared fields then the pair fields.
+        """
+        fields = fields if fields is not None else SHARED_FIELDS + PAIR_FIELDS
+        R, P = len(self.facts.rounds), len(self.players)
+        keys = (self.pair_round * P + self.pair_player) * P + self.pair_opponent
+        tensor = numpy.zeros((R * P * P, len(fields)))
+        for i, field in enumerate(fields):
+            values = self.pair_values(field) if field in PAIR_FIELDS else self.shared_values(field)[self.craft_row] / (self.facts.heat_size[self.pair_heat] - 1)
+            tensor[:, i] = numpy.bincount(keys, weights=values, minlength=R * P * P)
+        return tensor.reshape(R, P, P, len(fields))
+
+    def round_scores(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """ The PvP scores of each round: {round: {player: {opponent: score}}}.
+
+        The players are in the order they first appear in each round, and their opponents in the order they first meet them (as the nested loops
+        over the heats gave). Players that only appear in single craft heats have no opponents.
+        """
+        facts, P = self.facts, len(self.players)
+        scores = self.scores.tolist()
+        round_scores = {round_name: {} for round_name in facts.rounds}
+        row_round = facts.heat_round[facts.row_heat]
+        row_keys = row_round * P + self.player_of_craft[facts.row_craft]
+        keys, first = numpy.unique(row_keys, return_index=True)
+        for key in keys[numpy.argsort(first, kind='stable')].tolist():
+            round_scores[facts.rounds[key // P]][self.players[key % P]] = {}
+        pair_keys = (self.pair_round * P + self.pair_player) * P + self.pair_opponent
+        keys, first = numpy.unique(pair_keys, return_index=True)
+        for key in keys[numpy.argsort(first, kind='stable')].tolist():
+            round_number, player, opponent = key // (P * P), key // P % P, key % P
+            round_scores[facts.rounds[round_number]][self.players[player]][self.players[opponent]] = scores[round_number][player][opponent]
+        return round_scores
+
+    def totals(self, rounds: Optional[List[int]] = None) -> numpy.ndarray:
+        """ The (player x opponent) totals over the rounds (as indices, defaulting to all of them), added up in the order of the rounds.
+
+        Pairs that never met are 0 (see met).
+        """
+        rounds = rounds if rounds is not None else list(range(len(self.facts.rounds)))
+        total = numpy.zeros((len(self.players), len(self.players)))
+        for round_number in rounds:
+            total = total + self.scores[round_number]
+        return total
+
+
+def pvp_report(pvp: PvpScores) -> Tuple[dict, List[str]]:
+    """ The PvP scores as written to pvp_scores.json and the players in order of their overall rank.
+
+    Returns:
+        Tuple[dict, List[str]]: The score weights, the scores of each round and the 'totals' over the rounds ({player: {opponent: score}}, 0 for pairs
+            that never met), and the players from the highest sum of their totals to the lowest.
+    """
+    pvp_score = {'score weights': pvp.weights}
+    pvp_score.update(pvp.round_scores())
+    in_rounds = set().union(*[set(round_data.keys()) for round_index, round_data in pvp_score.items() if round_index.startswith('Round')])
+    players = [player for player in pvp.players if player in in_rounds]
+    rounds = [round_number for round_number, round_name in enumerate(pvp.facts.rounds) if round_name.startswith('Round')]
+    totals, met = pvp.totals(rounds).tolist(), pvp.met[rounds].any(axis=0).tolist()
+    index = {player: i for i, player in enumerate(pvp.players)}
+    score_totals = {player1: {player2: totals[index[player1]][index[player2]] if met[index[player1]][index[player2]] else 0 for player2 in players} for player1 in players}  # Combine scores over all rounds
+    players = sorted(players, key=lambda p: sum(score_totals[p].values()), reverse=True)  # Sort by overall rank (ties in the order of pvp.players)
+    pvp_score['totals'] = score_totals
+    return pvp_score, players
+
+
+def pvp_csv(score_totals: Dict[str, Dict[str, float]], players: List[str]) -> str:
+    """ The contents of pvp_scores.csv: the totals of each player (rows) against each opponent (columns), both in the order of players, and their sum. """
+    lines = ['Player,' + ','.join(players) + ',Sum'] + [f'{player},' + ','.join(str(score_totals[player][opponent]) for opponent in players) + f",{sum(score_totals[player].values())}" for player in players]
+    return '\n'.join(lines)
@@ -0,0 +1,157 @@
+""" Ratings of the teams in a season of heats (rate_tournaments.py).
+
+The heat outcomes are from wins.py. Every surviving team of a heat beats every dead team, and the surviving teams of a Draw draw with each other.
+Dead teams aren't compared with each other, so a Mutual Annihilation doesn't change the ratings.
+
+Two ratings are kept:
+    - Elo ratings, updated online as each heat is added. All the comparisons of a heat use the ratings from before the heat, and a team's update is the
+      average over its comparisons in the heat (times K), so a heat costs O(comparisons) whatever the length of the season.
+    - A Bradley-Terry fit of the sparse win matrix (the (winner, loser) pairs that have occurred, with draws counting half a win each way). This is a
+      batch fit over the whole season, solved iteratively with the minorisation-maximisation updates of Hunter (2004), warm started from the previous fit,
+      so re-fitting after a new round only takes a few iterations. Each team also plays `prior` virtual wins and losses against a team of strength 1, so
+      that teams without any wins (or losses) have finite ratings. The strengths are reported on the Elo scale (initial + scale * log10(strength)).
+The ratings, the win matrix and the heats that have been added are persisted (RATINGS_FILENAME), so later runs only add the heats of new rounds.
+"""
+
+# Standard library imports
+import json
+import math
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Third party imports
+import numpy
+
+# Local imports
+from .files import write_atomically
+from .wins import HeatOutcome
+
+RATINGS_FILENAME = 'ratings.json'
+RATINGS_VERSION = 2  # Bump this when the layout (or the heat keys) change.
+
+
+def comparisons(outcome: HeatOutcome) -> Iterator[Tuple[str, str, float]]:
+    """ The pairwise comparisons of a heat, as (team, opponent, score of the team): 1 for a win, 0.5 for a draw. """
+    for i, team in enumerate(outcome.survivors):
+        for opponent in outcome.survivors[i + 1:]:
+            yield team, opponent, 0.5
+        for opponent in outcome.dead:
+            yield team, opponent, 1.
+
+
+class Ratings:
+    """ The Elo ratings and sparse win matrix of a season of heats, and their Bradley-Terry fit. """
+
+    def __init__(self, k: float = 32, initial: float = 1500, scale: float = 400, craft: bool = False):
+        """
+        Args:
+            k (float, optional): The Elo K factor. Defaults to 32.
+            initial (float, optional): The rating of new teams. Defaults to 1500.
+            scale (float, optional): The rating difference for 10:1 odds. Defaults to 400.
+            craft (bool, optional): Whether the craft in the teams are rated instead of the teams (see heat_outcomes). Defaults to False.
+        """
+        self.k = k
+        self.initial = initial
+        self.scale = scale
+        self.craft = craft
+        self.heats = set()  # The keys of the heats that have been added.
+        self.elo: Dict[str, float] = {}
+        self.played = Counter()  # Heats played by each team.
+        self.wins: Dict[Tuple[str, str], float] = Counter()  # (winner, loser): wins, with draws as half a win each way.
+        self.strengths: Dict[str, float] = {}  # The last Bradley-Terry fit, to warm start the next one.
+        self.iterations = 0  # The iterations of the last Bradley-Terry fit.
+
+    def add_heat(self, outcome: HeatOutcome) -> bool:
+        """ Update the ratings with the outcome of a heat, unless it has already been added. Returns whether it was added. """
+        if outcome.key in self.heats:
+            return False
+        self.heats.add(outcome.key)
+        teams = outcome.survivors + outcome.dead
+        self.played.update(teams)
+        ratings = {team: self.elo.get(team, self.initial) for team in teams}
+        surprise, compared = Counter(), Counter()
+        for team, opponent, score in comparisons(outcome):
+            expected = 1 / (1 + 10 ** ((ratings[opponent] - ratings[team]) / self.scale))
+            surprise[team] += score - expected
+            surprise[opponent] -= score - expected
+            compared.update((team, opponent))
+            self.wins[(team, opponent)] += score
+            if score < 1:
+                self.wins[(opponent, team)] += 1 - score
+        for team in teams:
+            self.elo[team] = ratings[team] + (self.k * surprise[team] / compared[team] if compared[team] > 0 else 0)
+        return True
+
+    def add_heats(self, outcomes: Iterable[HeatOutcome]) -> int:
+        """ Add the heats (in order) that haven't already been added. Returns the number added. """
+        return sum(self.add_heat(outcome) for outcome in outcomes)
+
+    def bradley_terry(self, prior: float = 1., tolerance: float = 1e-9, max_iterations: int = 10000) -> Dict[str, float]:
+        """ Fit the Bradley-Terry strengths of the teams to the win matrix.
+
+        Args:
+            prior (float, optional): The virtual wins and losses of each team against a team of strength 1 (must be positive). Defaults to 1.
+            tolerance (float, optional): Stop once no log strength changes by more than this in an iteration. Defaults to 1e-9.
+            max_iterations (int, optional): The most iterations to make. Defaults to 10000.
+
+        Returns:
+            Dict[str, float]: The Bradley-Terry rating of each team, on the Elo scale.
+        """
+        if prior <= 0:
+            raise ValueError("The Bradley-Terry prior must be positive.")
+        teams = sorted(self.played)
+        index = {team: i for i, team in enumerate(teams)}
+        entries = [(index[winner], index[loser], wins) for (winner, loser), wins in self.wins.items() if wins > 0]
+        winner, loser, wins = (numpy.array(values, dtype=dtype) for values, dtype in zip(zip(*entries), (int, int, float))) if len(entries) > 0 else (numpy.zeros(0, dtype=int), numpy.zeros(0, dtype=int), numpy.zeros(0))
+        row, column, games = numpy.concatenate([winner, loser]), numpy.concatenate([loser, winner]), numpy.concatenate([wins, wins])  # Each win is a game for both teams.
+        total_wins = numpy.bincount(winner, wins, len(teams)) + prior
+        strength = numpy.array([self.strengths.get(team, 1.) for team in teams])
+        self.iterations = 0
+        while self.iterations < max_iterations and len(teams) > 0:
+            self.iterations += 1
+            updated = total_wins / (numpy.bincount(row, games / (strength[row] + strength[column]), len(teams)) + 2 * prior / (strength + 1))
+            change = numpy.abs(numpy.log(updated) - numpy.log(strength)).max()
+            strength = updated
+            if change < tolerance:
+                break
+        self.strengths = dict(zip(teams, strength.tolist()))
+        return {team: self.initial + self.scale * math.log10(strength) for team, strength in self.strengths.items()}
+
+    @classmethod
+    def load(cls, path: Path, k: Optional[float] = None, initial: Optional[float] = None, scale: Optional[float] = None, craft: bool = False) -> 'Ratings':
+        """ Load the ratings from a file, or start afresh if there isn't one (or it's invalid).
+
+        The parameters are those of the file if there is one (they apply to its whole history), otherwise these or the defaults.
+        Note: the heats are only added once, whether the teams or the craft are rated, so check that the craft of the loaded ratings is the one wanted.
+        """
+        ratings = cls(**{name: value for name, value in (('k', k), ('initial', initial), ('scale', scale)) if value is not None}, craft=craft)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('version') != RATINGS_VERSION:
+                return ratings
+            loaded = cls(saved['k'], saved['initial'], saved['scale'], saved['craft'])
+            loaded.heats = set(saved['heats'])
+            loaded.elo = saved['elo']
+            loaded.played = Counter(saved['played'])
+            loaded.wins = Counter({(winner, loser): wins for winner, loser, wins in saved['wins']})
+            loaded.strengths = saved['strengths']
+            return loaded
+        except (OSError, ValueError, KeyError, TypeError):
+            return ratings  # No ratings or invalid ratings: start afresh.
+
+    def save(self, path: Path):
+        """ Save the ratings, with the win matrix as (winner, loser, wins) triples. """
+        write_atomically(path, json.dumps({
+            'version': RATINGS_VERSION,
+            'k': self.k,
+            'initial': self.initial,
+            'scale': self.scale,
+            'craft': self.craft,
+            'heats': sorted(self.heats),
+            'elo': self.elo,
+            'played': self.played,
+            'wins': [[winner, loser, wins] for (winner, loser), wins in sorted(self.wins.items())],
+            'strengths': self.strengths,
+        }, indent=2, ensure_ascii=False))
@@ -0,0 +1,65 @@
+""" Prefiltered reading of heat logs.
+
+Heat logs are mostly KSP noise, with the competition results on lines tagged with 'BDArmory.BDACompetitionMode'.
+The log is memory-mapped and the tag is searched for in the raw bytes, so only the competition lines are decoded and kept: memory use depends on the
+number of competition lines, not the size of the log.
+Lines are split as reading the log in text mode would (on '\n', '\r' or '\r\n'), so the result is the same as filtering the stripped lines of the log.
+"""
+
+# Standard library imports
+import mmap
+from pathlib import Path
+from typing import Iterator, List, Union
+
+COMPETITION_MARKER = b'BDArmory.BDACompetitionMode'
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+def _line_bounds(buffer: Buffer, position: int) -> slice:
+    """ The bounds of the line containing position (excluding the line break). """
+    start = buffer.rfind(b'\n', 0, position) + 1
+    start = buffer.rfind(b'\r', start, position) + 1 or start
+    end = buffer.find(b'\n', position)
+    end = end if end >= 0 else len(buffer)
+    cr = buffer.find(b'\r', position, end)
+    return slice(start, cr if cr >= 0 else end)
+
+
+def competition_lines(buffer: Buffer) -> Iterator[str]:
+    """ The (stripped) first line and competition lines of a heat log.
+
+    The first line is always included (it's normally the 'Dumping Results' line), as the parser treats it specially.
+    Other lines are only included (and decoded) if they contain the competition tag.
+
+    Args:
+        buffer (Buffer): The contents of the log.
+
+    Yields:
+        str: The lines.
+    """
+    if len(buffer) == 0:
+        return
+    line = _line_bounds(buffer, 0)
+    yield buffer[line].decode('utf-8').strip()
+    position = buffer.find(COMPETITION_MARKER, line.stop)
+    while position >= 0:
+        line = _line_bounds(buffer, position)
+        yield buffer[line].decode('utf-8').strip()
+        position = buffer.find(COMPETITION_MARKER, line.stop + 1)
+
+
+def read_competition_lines(log_file: Path) -> List[str]:
+    """ Read the first line and competition lines of a heat log (see competition_lines).
+
+    Args:
+        log_file (Path): The heat log.
+
+    Returns:
+        List[str]: The (stripped) lines.
+    """
+    with open(log_file, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return []  # Empty files can't be memory-mapped.
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return list(competition_lines(buffer))
@@ -0,0 +1,124 @@
+""" Tournament scoring.
+
+The summary fields of each craft (and of each craft in each round) are put in a (craft x round x field) matrix once, then the scores are weighted sums along the field axis:
+    - the per-round score is the non-waypoint term plus the waypoint term clamped to be non-negative,
+    - the total score is the non-waypoint term of the tournament summary plus the clamped waypoint terms of each round,
+    - the cumulative scores are the running sums of the per-round scores.
+
+The weighted sums are accumulated one field at a time (vectorised over craft and rounds) instead of using a matrix product, so that the scores match
+the previous scalar sums exactly.
+"""
+
+# Standard library imports
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Sequence
+
+# Third party imports
+import numpy
+
+SCORE_FIELDS = ('wins', 'survivedCount', 'miaCount', 'deathCount', 'deathOrder', 'deathTime', 'cleanKills', 'assists', 'hits', 'hitsTaken', 'bulletDamage', 'bulletDamageTaken', 'rocketHits', 'rocketHitsTaken', 'rocketPartsHit', 'rocketPartsHitTaken', 'rocketDamage', 'rocketDamageTaken',
+                'missileHits', 'missileHitsTaken', 'missilePartsHit', 'missilePartsHitTaken', 'missileDamage', 'missileDamageTaken', 'ramScore', 'ramScoreTaken', 'battleDamage', 'partsLostToAsteroids', 'HPremaining', 'accuracy', 'rocket_accuracy', 'waypointCount', 'waypointTime', 'waypointDeviation')
+DEFAULT_WEIGHTS = "1,0,0,-1,1,2e-3,3,1.5,4e-3,0,1e-4,4e-5,0.035,0,6e-4,0,1.5e-4,5e-5,0.15,0,0.002,0,3e-5,1.5e-5,0.075,0,0,0,0,0,0,10,-1,-1"  # The default score weights (--weights) of the tournament parsers, in the order of SCORE_FIELDS.
+WAYPOINT_WEIGHTS = "0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1,-0.02,-0.003"  # The score weights of waypoint tournaments (--waypoint-scores).
+
+
+def summary_matrix(records: Iterable[Mapping], fields: Sequence[str]) -> numpy.ndarray:
+    """ Build the (record x field) matrix of the summary records. Missing fields are 0, tuple fields use their first (total) element. """
+    records = list(records)
+    values = numpy.zeros((len(records), len(fields)))
+    for i, field in enumerate(fields):
+        column = [record.get(field, 0) for record in records]
+        values[:, i] = [value[0] if isinstance(value, tuple) else value for value in column] if any(isinstance(value, tuple) for value in column) else column
+    return values
+
+
+class TournamentScores(NamedTuple):
+    """ The scores of a tournament. """
+    total: Dict[str, float]  # Craft -> total score.
+    per_round: Dict[str, List[float]]  # Craft -> score in each round.
+    cumulative: Dict[str, List[float]]  # Craft -> cumulative score after each round.
+
+
+class Scorer:
+    """ Compute scores as weighted sums of the summary fields.
+
+    Fields beyond the number of weights are ignored. Tuple fields (deathCount, cleanKills) use their first (total) element.
+    """
+
+    def __init__(self, weights: Sequence[float], fields: Sequence[str] = SCORE_FIELDS):
+        self.fields = tuple(fields)[:len(weights)]
+        self.weights = numpy.array(weights[:len(self.fields)], dtype=float)
+        self.waypoint = numpy.array([field.startswith('waypoint') for field in self.fields], dtype=bool)
+
+    def matrix(self, records: Iterable[Mapping]) -> numpy.ndarray:
+        """ Build the (record x field) matrix of the summary records (see summary_matrix). """
+        return summary_matrix(records, self.fields)
+
+    def round_matrix(self, per_round_records: Iterable[Sequence[Mapping]]) -> numpy.ndarray:
+        """ Build the (craft x round x field) matrix of the per-round summary records. """
+        per_round_records = list(per_round_records)
+        rounds = len(per_round_records[0]) if len(per_round_records) > 0 else 0
+        return self.matrix(record for records in per_round_records for record in records).reshape(len(per_round_records), rounds, len(self.fields))
+
+    def weighted_sum(self, values: numpy.ndarray, mask: numpy.ndarray) -> numpy.ndarray:
+        """ Sum the weighted values of the fields in the mask along the last axis, one field at a time. """
+        total = numpy.zeros(values.shape[:-1])
+        for field in numpy.flatnonzero(mask):
+            total = total + self.weights[field] * values[..., field]
+        return total
+
+    def waypoint_scores(self, rounds: numpy.ndarray) -> numpy.ndarray:
+        """ The waypoint term of the (craft x round) scores, clamped to be non-negative. """
+        return numpy.maximum(0, self.weighted_sum(rounds, self.waypoint))
+
+    def round_scores(self, rounds: numpy.ndarray) -> numpy.ndarray:
+        """ The (craft x round) scores. """
+        return self.weighted_sum(rounds, ~self.waypoint) + self.waypoint_scores(rounds)
+
+    def total_scores(self, totals: numpy.ndarray, rounds: numpy.ndarray) -> numpy.ndarray:
+        """ The total scores from the (craft x field) tournament totals and the (craft x round x field) per-round values.
+
+        The waypoint term is clamped per round, so it comes from the per-round values.
+        """
+        waypoint_scores = self.waypoint_scores(rounds)
+        return self.weighted_sum(totals, ~self.waypoint) + (numpy.add.accumulate(waypoint_scores, axis=1)[:, -1] if waypoint_scores.shape[1] > 0 else 0)
+
+    @staticmethod
+    def cumulative(round_scores: numpy.ndarray) -> numpy.ndarray:
+        """ The running totals of the (craft x round) scores. """
+        return numpy.cumsum(round_scores, axis=1)
+
+    def score(self, craft_summary: Mapping[str, Mapping], round_craft: Sequence[str], rounds: numpy.ndarray) -> TournamentScores:
+        """ Score a tournament from its summary and its (craft x round x field) matrix.
+
+        Args:
+            craft_summary (Mapping[str, Mapping]): The summary fields of each craft.
+            round_craft (Sequence[str]): The craft of each row of rounds.
+            rounds (numpy.ndarray): The (craft x round x field) matrix of the per-round summary fields (e.g., from round_matrix).
+
+        Returns:
+            TournamentScores: The total scores of the craft in craft_summary and the per-round and cumulative scores of the craft in round_craft.
+        """
+        round_index = {craft: i for i, craft in enumerate(round_craft)}
+        totals = self.total_scores(self.matrix(craft_summary.values()), rounds[[round_index[craft] for craft in craft_summary]])
+        round_scores = self.round_scores(rounds)
+        return TournamentScores(
+            dict(zip(craft_summary, totals.tolist())),
+            dict(zip(round_craft, round_scores.tolist())),
+            dict(zip(round_craft, self.cumulative(round_scores).tolist())),
+        )
+
+
+def score_tournament(craft_summary: Mapping[str, Mapping], per_round_summary: Mapping[str, Sequence[Mapping]], weights: Sequence[float], fields: Sequence[str] = SCORE_FIELDS) -> TournamentScores:
+    """ Score a tournament.
+
+    Args:
+        craft_summary (Mapping[str, Mapping]): The summary fields of each craft.
+        per_round_summary (Mapping[str, Sequence[Mapping]]): The summary fields of each craft in each round.
+        weights (Sequence[float]): The score weights, in the order of fields.
+        fields (Sequence[str], optional): The score fields. Defaults to SCORE_FIELDS.
+
+    Returns:
+        TournamentScores: The total scores of the craft in craft_summary and the per-round and cumulative scores of the craft in per_round_summary.
+    """
+    scorer = Scorer(weights, fields)
+    return scorer.score(craft_summary, list(per_round_summary), scorer.round_matrix(per_round_summary.values()))
@@ -0,0 +1,130 @@
+""" Lazy decoder for tournament.state files (parse_tournament_state.py).
+
+The tournament.state file is recursively encoded JSON due to Unity's simplistic JSONUtility functionality: the heats, the scores and the team files are
+JSON strings inside the JSON, and the scores contain a JSON string for each player, which contains a JSON string for each heat they've played, which
+contains a JSON string of the easily serialisable score fields.
+Only the outer layer is decoded when the state is loaded. Each nested string is decoded when its section is first accessed and the result is cached,
+so fetching the heat schedule or one player's scores doesn't decode the scores of every player in every heat, and repeated lookups are free.
+"""
+
+# Standard library imports
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# The per-opponent score fields, serialised as lists in the order of the players.
+OPPONENT_FIELDS = ("hitCounts", "damageFromGuns", "damageFromRockets", "rocketPartDamageCounts", "rocketStrikeCounts", "rammingPartLossCounts", "damageFromMissiles", "missilePartDamageCounts", "missileHitCounts", "battleDamageFrom")
+# The encoded fields of each section, which are replaced by their decoded fields.
+STATE_ENCODED_FIELDS = ("_heats", "_scores", "_teamFiles")
+SCORES_ENCODED_FIELDS = ("_weightKeys", "_weightValues", "_players", "_scores", "_files", "_results")
+
+
+class TournamentState:
+    """ A tournament.state file, decoded section by section on demand. """
+
+    def __init__(self, state: dict):
+        """
+        Args:
+            state (dict): The outer JSON of the tournament.state file (with the nested JSON strings still encoded).
+        """
+        self.state = state
+        self._heats: Dict[int, dict] = {}  # Heat index: decoded heat.
+        self._scores: Optional[dict] = None  # The scores, with only the outer layer decoded.
+        self._player_scores: Dict[str, List[dict]] = {}  # Player: decoded scores of each heat they've played.
+        self._results: Optional[List[dict]] = None
+        self._team_files: Optional[List[List[str]]] = None
+
+    @classmethod
+    def load(cls, path: Path) -> 'TournamentState':
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    # Heats (configurations for spawning and teams)
+    @property
+    def heat_count(self) -> int:
+        return len(self.state["_heats"])
+
+    def heat(self, index: int) -> dict:
+        """ The configuration of a heat (in the order of the state file), with its teams decoded. """
+        if index not in self._heats:
+            heat = json.loads(self.state["_heats"][index])
+            heat["teams"] = [json.loads(team)["team"] for team in heat["_teams"]]
+            del heat["_teams"]
+            self._heats[index] = heat
+        return self._heats[index]
+
+    def heats(self, round: Optional[int] = None) -> Dict[str, dict]:
+        """ The configurations of the heats, or only those of a round, keyed by 'Heat <index>'. """
+        heats = (self.heat(i) for i in range(self.heat_count))
+        return {f"Heat {i}": heat for i, heat in enumerate(heats) if round is None or heat["round"] == round}
+
+    # Scores
+    @property
+    def scores(self) -> dict:
+        """ The weights, players, files and other fields of the scores (the scores of the players and the heat results are only decoded by player_scores and results). """
+        if self._scores is None:
+            self._scores = json.loads(self.state["_scores"])
+        return self._scores
+
+    @property
+    def players(self) -> List[str]:
+        return self.scores["_players"]
+
+    def weights(self) -> Dict[str, float]:
+        return {k: v for k, v in zip(self.scores["_weightKeys"], self.scores["_weightValues"])}
+
+    def files(self) -> Dict[str, str]:
+        """ The craft file of each player. """
+        return {p: s for p, s in zip(self.players, self.scores["_files"])}
+
+    def player_scores(self, player: str) -> List[dict]:
+        """ The scores of a player in each heat they've played, with the per-opponent fields keyed by the opponent. Raises KeyError for unknown players. """
+        if player not in self._player_scores:
+            players = self.players
+            if player not in players:
+                raise KeyError(player)
+            serialized = json.loads(self.scores["_scores"][players.index(player)])["serializedScoreData"]
+            self._player_scores[player] = [
+                json.loads(score_data["scoreData"]) | {
+                    field: {other_player: values for other_player, values in zip(players, score_data[field]) if other_player != player} for field in OPPONENT_FIELDS
+                } | {
+                    "damageTypesTaken": score_data["damageTypesTaken"],
+                    "everyoneWhoDamagedMe": score_data["everyoneWhoDamagedMe"]
+                } for score_data in (json.loads(rnd) for rnd in serialized)
+            ]
+        return self._player_scores[player]
+
+    def results(self) -> List[dict]:
+        """ The outcomes of the heats that have been played (in the order they were played). """
+        if self._results is None:
+            results = [json.loads(result) for result in self.scores["_results"]]
+            for result in results:
+                result["survivingTeams"] = [json.loads(team) for team in result["_survivingTeams"]]
+                del result["_survivingTeams"]
+                result["deadTeams"] = [json.loads(team) for team in result["_deadTeams"]]
+                del result["_deadTeams"]
+            self._results = results
+        return self._results
+
+    def decoded_scores(self) -> dict:
+        """ The fully decoded scores. """
+        scores = {k: v for k, v in self.scores.items() if k not in SCORES_ENCODED_FIELDS}
+        scores["weights"] = self.weights()
+        scores["scores"] = {player: self.player_scores(player) for player in self.players}
+        scores["files"] = self.files()
+        scores["results"] = self.results()
+        return scores
+
+    # Team files
+    def team_files(self) -> List[List[str]]:
+        if self._team_files is None:
+            self._team_files = [json.loads(team)["ls"] for team in self.state["_teamFiles"]]
+        return self._team_files
+
+    def decoded(self) -> dict:
+        """ The fully decoded state (as tournament.json). """
+        state = {k: v for k, v in self.state.items() if k not in STATE_ENCODED_FIELDS}
+        state["heats"] = self.heats()
+        state["scores"] = self.decoded_scores()
+        state["teamFiles"] = self.team_files()
+        return state
@@ -0,0 +1,108 @@
+""" Compact columnar results store.
+
+results.json holds the heat records as nested dicts, which downstream tools have to load in full. The results store (results.npz in the tournament folder)
+holds the same heats as typed arrays:
+    - the craft and round names, and the name, round, duration and result of each heat,
+    - the teams (and dead teams) of each heat,
+    - the fact table columns (see TournamentFacts.columns), including the attacker -> victim interactions of each of the '...By' maps.
+The arrays are stored uncompressed and each one is only read when it's first accessed, so opening a store is quick and tools only pay for the columns they use.
+"""
+
+# Standard library imports
+from pathlib import Path
+from typing import Dict, List
+
+# Third party imports
+import numpy
+
+# Local imports
+from .facts import TournamentFacts
+from .files import atomic_open
+
+STORE_FILENAME = 'results.npz'
+STORE_VERSION = 1  # Bump this when the layout changes.
+
+
+def write_results_store(path: Path, tournamentData: Dict[str, Dict[str, dict]], facts: TournamentFacts):
+    """ Write the results store of a tournament.
+
+    Args:
+        path (Path): The file to write (normally STORE_FILENAME in the tournament folder).
+        tournamentData (Dict[str, Dict[str, dict]]): The heat records for each round.
+        facts (TournamentFacts): The fact table of tournamentData.
+    """
+    heats = [(heat_name, heat) for round in tournamentData.values() for heat_name, heat in round.items()]
+    result_types = list(dict.fromkeys(facts.heat_result))
+    teams = facts.teams  # (heat, team, members, dead)
+    team_names = sorted(set(team for _, team, _, _ in teams))
+    team_index = {team: i for i, team in enumerate(team_names)}
+    arrays = {
+        'version': numpy.array(STORE_VERSION),
+        'craft': numpy.array(facts.craft, dtype=str),
+        'rounds': numpy.array(facts.rounds, dtype=str),
+        'heat_name': numpy.array([heat_name for heat_name, _ in heats], dtype=str),
+        'result_types': numpy.array(result_types, dtype=str),
+        'heat_result': numpy.array([result_types.index(result) for result in facts.heat_result], dtype=numpy.int8),
+        'team_names': numpy.array(team_names, dtype=str),
+        'team_heat': numpy.array([heat for heat, _, _, _ in teams], dtype=int),
+        'team_name': numpy.array([team_index[team] for _, team, _, _ in teams], dtype=int),
+        'team_members': numpy.array([members for _, _, members, _ in teams], dtype=str),
+        'team_dead': numpy.array([dead for _, _, _, dead in teams], dtype=bool),
+    }
+    arrays.update(facts.columns())
+    with atomic_open(path, 'wb') as f:
+        numpy.savez(f, **arrays)
+
+
+class ResultsStore:
+    """ A results store, opened lazily: each array is read from the file when it's first accessed (store[name]).
+
+    The arrays are those described in the module docstring. Heats are indexed in the order of results.json, craft by their index in craft.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._npz = numpy.load(path, allow_pickle=False)
+        self._arrays: Dict[str, numpy.ndarray] = {}
+        if 'version' not in self._npz.files or int(self['version']) != STORE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {STORE_VERSION} results store.")
+        self.craft: List[str] = self['craft'].tolist()
+        self.rounds: List[str] = self['rounds'].tolist()
+
+    def __getitem__(self, name: str) -> numpy.ndarray:
+        if name not in self._arrays:
+            self._arrays[name] = self._npz[name]
+        return self._arrays[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._npz.files
+
+    def __enter__(self) -> 'ResultsStore':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._npz.close()
+
+    @property
+    def heat_names(self) -> List[str]:
+        return self['heat_name'].tolist()
+
+    @property
+    def result_types(self) -> List[str]:
+        return self['result_types'].tolist()
+
+    def first_team(self, dead: bool = False) -> numpy.ndarray:
+        """ The index in team_names of the first team (or dead team) of each heat, -1 for heats without any. """
+        selected = self['team_dead'] == dead
+        first = numpy.full(len(self['heat_name']), -1, dtype=int)
+        heats, indices = numpy.unique(self['team_heat'][selected], return_index=True)
+        first[heats] = self['team_name'][selected][indices]
+        return first
+
+    def facts(self) -> TournamentFacts:
+        """ The fact table of the tournament (reads all of its columns). """
+        return TournamentFacts.from_columns(self.craft, self.rounds, self)
@@ -0,0 +1,212 @@
+""" Score weight sweeps.
+
+Re-score a tournament for many weight vectors at once from its summary and per-round stats, without re-parsing anything.
+The scores of all the vectors are matrix products of the (craft x field) summary matrix with the (field x vector) weight matrix, plus the per-round
+waypoint terms (clamped per round, as in Scorer), which are batched over blocks of vectors to bound the memory use.
+The ranks of the craft for each vector are then compared with the ranks for a baseline vector:
+    - per craft: the mean, spread and range of its rank, and how often it keeps its baseline rank,
+    - per vector: the Spearman and Kendall rank correlations with the baseline ranking.
+
+Note: the matrix products sum the fields in a different order to Scorer, so scores can differ from the parser's scores in the last bits.
+"""
+
+# Standard library imports
+import itertools
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Sequence, Tuple
+
+# Third party imports
+import numpy
+
+# Local imports
+from .scoring import SCORE_FIELDS, summary_matrix
+
+BLOCK_SIZE = 1024  # Weight vectors per block for the per-round terms.
+
+
+def parse_weight_vectors(lines: Iterable[str], fields: Sequence[str] = SCORE_FIELDS) -> numpy.ndarray:
+    """ Parse weight vectors, one per line as for --weights (comma separated, missing trailing weights are 0). Blank lines and '#' comments are skipped.
+
+    Raises ValueError for invalid lines or if there are no weight vectors.
+
+    Returns:
+        numpy.ndarray: The (vector x field) weights.
+    """
+    vectors = []
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if len(line) == 0:
+            continue
+        weights = [float(w) for w in line.split(',')]
+        if len(weights) > len(fields):
+            raise ValueError(f"Too many weights ({len(weights)} > {len(fields)}) in '{line}'")
+        vectors.append(weights + [0.] * (len(fields) - len(weights)))
+    if len(vectors) == 0:
+        raise ValueError("No weight vectors found")
+    return numpy.array(vectors, dtype=float).reshape(len(vectors), len(fields))
+
+
+def weight_grid(base: Sequence[float], spec: str, fields: Sequence[str] = SCORE_FIELDS) -> numpy.ndarray:
+    """ A grid of weight vectors varying some of the weights of base.
+
+    Args:
+        base (Sequence[float]): The base weights (missing trailing weights are 0).
+        spec (str): Comma separated 'field=start:stop:count' entries, each varying a field's weight over count evenly spaced values (inclusive), e.g., 'wins=0:2:5,cleanKills=1:4:7'.
+        fields (Sequence[str], optional): The score fields. Defaults to SCORE_FIELDS.
+
+    Raises ValueError for invalid entries.
+
+    Returns:
+        numpy.ndarray: The (vector x field) weights of every combination of the varied weights.
+    """
+    base = numpy.array(list(base) + [0.] * (len(fields) - len(base)), dtype=float)
+    axes = []
+    for entry in spec.split(','):
+        field, _, values = entry.partition('=')
+        field = field.strip()
+        if field not in fields:
+            raise ValueError(f"Unknown score field '{field}' in '{entry}'")
+        try:
+            start, stop, count = values.split(':')
+            start, stop, count = float(start), float(stop), int(count)
+        except ValueError:
+            raise ValueError(f"Invalid entry '{entry}', expected 'field=start:stop:count'")
+        if count < 1:
+            raise ValueError(f"The count of '{entry}' must be at least 1")
+        axes.append((fields.index(field), numpy.linspace(start, stop, count)))
+    vectors = numpy.tile(base, (int(numpy.prod([len(values) for _, values in axes])), 1))
+    vectors[:, [field for field, _ in axes]] = list(itertools.product(*(values for _, values in axes)))
+    return vectors
+
+
+def rank(scores: numpy.ndarray) -> numpy.ndarray:
+    """ The rank (0 is best) of each craft along the last axis. Ties keep the craft order, as the sorted summary does. """
+    order = numpy.argsort(-scores, axis=-1, kind='stable')
+    ranks = numpy.empty_like(order)
+    numpy.put_along_axis(ranks, order, numpy.arange(scores.shape[-1]), axis=-1)
+    return ranks
+
+
+def spearman(ranks: numpy.ndarray, baseline: numpy.ndarray) -> numpy.ndarray:
+    """ Spearman's rank correlation of each row of ranks with the baseline ranks. """
+    n = ranks.shape[-1]
+    if n < 2:
+        return numpy.ones(ranks.shape[:-1])
+    return 1 - 6 * ((ranks - baseline) ** 2).sum(axis=-1) / (n * (n * n - 1))
+
+
+def kendall(ranks: numpy.ndarray, baseline: numpy.ndarray) -> numpy.ndarray:
+    """ Kendall's rank correlation of each row of ranks with the baseline ranks. """
+    n = ranks.shape[-1]
+    if n < 2:
+        return numpy.ones(ranks.shape[:-1])
+    first, second = numpy.triu_indices(n, 1)  # All the pairs of craft.
+    baseline_order = numpy.sign(baseline[first] - baseline[second])
+    tau = numpy.empty(ranks.shape[0])
+    block_size = max(1, (1 << 22) // len(first))  # Vectors per block to keep the (vector x pair) blocks to a few million entries.
+    for start in range(0, ranks.shape[0], block_size):
+        block = ranks[start:start + block_size]
+        tau[start:start + block_size] = (numpy.sign(block[:, first] - block[:, second]) * baseline_order).sum(axis=-1)
+    return tau / len(first)
+
+
+class SweepResult(NamedTuple):
+    """ The scores and ranks of the craft for each weight vector. """
+    craft: List[str]
+    weights: numpy.ndarray  # (vector x field)
+    scores: numpy.ndarray  # (vector x craft)
+    ranks: numpy.ndarray  # (vector x craft), 0 is best.
+    baseline_scores: numpy.ndarray  # (craft)
+    baseline_ranks: numpy.ndarray  # (craft)
+
+    def craft_stability(self) -> Dict[str, dict]:
+        """ The rank statistics of each craft over the weight vectors. """
+        return {
+            craft: {
+                'baseline rank': int(self.baseline_ranks[i]) + 1,
+                'mean rank': float(self.ranks[:, i].mean()) + 1,
+                'rank std': float(self.ranks[:, i].std()),
+                'best rank': int(self.ranks[:, i].min()) + 1,
+                'worst rank': int(self.ranks[:, i].max()) + 1,
+                'same rank': float((self.ranks[:, i] == self.baseline_ranks[i]).mean()),
+            } for i, craft in enumerate(self.craft)
+        }
+
+    def correlations(self) -> Dict[str, numpy.ndarray]:
+        """ The Spearman and Kendall rank correlations of each weight vector's ranking with the baseline ranking. """
+        return {'spearman': spearman(self.ranks, self.baseline_ranks), 'kendall': kendall(self.ranks, self.baseline_ranks)}
+
+
+class WeightSweep:
+    """ Score a tournament for many weight vectors.
+
+    Args:
+        craft_summary (Mapping[str, Mapping]): The summary fields of each craft.
+        round_craft (Sequence[str]): The craft of each row of rounds.
+        rounds (numpy.ndarray): The (craft x round x field) matrix of the per-round summary fields of fields (e.g., from TournamentFacts.round_matrix).
+        fields (Sequence[str], optional): The score fields. Defaults to SCORE_FIELDS.
+    """
+
+    def __init__(self, craft_summary: Mapping[str, Mapping], round_craft: Sequence[str], rounds: numpy.ndarray, fields: Sequence[str] = SCORE_FIELDS):
+        self.fields = tuple(fields)
+        self.craft = list(craft_summary)
+        self.waypoint = numpy.array([field.startswith('waypoint') for field in self.fields], dtype=bool)
+        round_index = {craft: i for i, craft in enumerate(round_craft)}
+        self.totals = summary_matrix(craft_summary.values(), self.fields)[:, ~self.waypoint]  # (craft x non-waypoint field)
+        self.waypoint_rounds = rounds[[round_index[craft] for craft in self.craft]][:, :, self.waypoint]  # (craft x round x waypoint field)
+
+    def scores(self, weights: numpy.ndarray) -> numpy.ndarray:
+        """ The (vector x craft) scores for the (vector x field) weights. """
+        weights = numpy.atleast_2d(weights)
+        scores = weights[:, ~self.waypoint] @ self.totals.T
+        waypoint_weights = weights[:, self.waypoint]
+        if self.waypoint_rounds.size > 0 and numpy.any(waypoint_weights != 0):
+            for start in range(0, len(weights), BLOCK_SIZE):  # (craft x round x vector) blocks.
+                scores[start:start + BLOCK_SIZE] += numpy.maximum(0, self.waypoint_rounds @ waypoint_weights[start:start + BLOCK_SIZE].T).sum(axis=1).T
+        return scores
+
+    def sweep(self, weights: numpy.ndarray, baseline: Sequence[float]) -> SweepResult:
+        """ Score and rank the craft for each weight vector and for the baseline weights.
+
+        Args:
+            weights (numpy.ndarray): The (vector x field) weights.
+            baseline (Sequence[float]): The baseline weights (missing trailing weights are 0).
+
+        Returns:
+            SweepResult: The scores and ranks.
+        """
+        baseline = numpy.array(list(baseline) + [0.] * (len(self.fields) - len(baseline)), dtype=float)
+        baseline_scores = self.scores(baseline)[0]
+        scores = self.scores(weights)
+        return SweepResult(self.craft, weights, scores, rank(scores), baseline_scores, rank(baseline_scores))
+
+
+def summarise_correlations(correlations: Mapping[str, numpy.ndarray]) -> Dict[str, Dict[str, float]]:
+    """ The mean, minimum and 5th/50th percentiles of each correlation. """
+    return {
+        name: {'mean': float(values.mean()), 'min': float(values.min()), 'p5': float(numpy.percentile(values, 5)), 'median': float(numpy.median(values))}
+        if len(values) > 0 else {} for name, values in correlations.items()
+    }
+
+
+def sweep_report(result: SweepResult) -> Tuple[List[str], dict]:
+    """ A console report and a JSON-serialisable summary of a sweep.
+
+    Returns:
+        Tuple[List[str], dict]: The lines of the report and the summary (with the per-vector correlations).
+    """
+    stability = result.craft_stability()
+    correlations = result.correlations()
+    summary = summarise_correlations(correlations)
+    name_length = max([len(craft) for craft in result.craft] + [4])
+    strings = [f"Weight sweep of {len(result.weights)} weight vectors"]
+    strings.extend(f"{name.capitalize()} rank correlation with the baseline: mean {values['mean']:.3f}, median {values['median']:.3f}, 5th percentile {values['p5']:.3f}, min {values['min']:.3f}" for name, values in summary.items() if len(values) > 0)
+    strings.append(f"\n{'Name':{name_length}s}  Base  Mean   Std   Best  Worst  Same%")
+    for craft in sorted(stability, key=lambda craft: stability[craft]['baseline rank']):
+        s = stability[craft]
+        strings.append(f"{craft:{name_length}s}  {s['baseline rank']:4d}  {s['mean rank']:5.1f}  {s['rank std']:4.1f}  {s['best rank']:4d}  {s['worst rank']:5d}  {100 * s['same rank']:5.1f}")
+    return strings, {
+        'vectors': len(result.weights),
+        'craft': stability,
+        'correlation': summary,
+        'per vector': {name: values.tolist() for name, values in correlations.items()},
+    }
@@ -0,0 +1,369 @@
+""" Synthetic BDArmory logs for benchmarking and testing the log parsers.
+
+Heat logs (Tournament N/Round M/<competition ID>-Heat H.log) and continuous spawning logs (cts-<competition ID>.log) are written in the formats of
+Scoring.LogResults and ContinuousSpawning.DumpContinuousSpawningScores from a simple model of the competitions: each craft has a skill that scales
+how much it hits its opponents and how likely it is to survive, so the results have some structure to rank, rate and plot.
+Tournament states are generated as they're decoded from tournament.state by parse_tournament_state.py (tournament.json).
+KSP noise lines can be mixed in between the competition lines, as when the logs are cut from KSP.log.
+Everything is drawn from a seeded random.Random, so the same arguments always give the same logs.
+"""
+
+# Standard library imports
+import itertools
+import math
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Local imports
+from .state import OPPONENT_FIELDS
+
+# Names that have tripped up the parsers: duplicates with _N suffixes (see --average-duplicates), names that are prefixes of other names, ':' and '"'
+# (which clash with the log and JSON separators), backslashes, spaces and non-ASCII characters.
+AWKWARD_NAMES = [
+    "Foo", "Foo_1", "Foo_2", "Foo_1_3", "Foobar", "A:B", "Colon:End:", "Quote\"Craft", "Back\\slash", "x y", "Ünïcode ✈", "Kraken's Revenge", "Mk2 (v1.3)",
+]
+CTS_UNSAFE = (':', ';', ', ')  # The CTS log entries are separated by these, so names containing them can't be parsed from a CTS log.
+
+NOISE_LINES = [
+    "[LOG {time}] [FlightIntegrator]: Vessel {number} has been unloaded 1.0 times",
+    "[LOG {time}] [UiApp] Awake: KSPedia",
+    "[WRN {time}] [Part]: PartModule indexing mismatch at module {number}",
+    "[LOG {time}] [BDArmory.BDArmorySetup]: Ammo {number} loaded",
+    "[LOG {time}] Look rotation viewing vector is zero",
+    "[LOG {time}] [PhysicsGlobals]: Setting up physics for {number} parts",
+]
+
+# Weapon: (hits tag, parts hit tag, damage tag, chance of an engagement, mean hits per engagement, damage per hit).
+WEAPONS = {
+    'GUNS': ('WHOSHOTWHOWITHGUNS', None, 'WHODAMAGEDWHOWITHGUNS', 0.6, 40, (5, 30)),
+    'ROCKETS': ('WHOHITWHOWITHROCKETS', 'WHOPARTSHITWHOWITHROCKETS', 'WHODAMAGEDWHOWITHROCKETS', 0.25, 4, (50, 300)),
+    'MISSILES': ('WHOHITWHOWITHMISSILES', 'WHOPARTSHITWHOWITHMISSILES', 'WHODAMAGEDWHOWITHMISSILES', 0.15, 1.5, (200, 1500)),
+}
+RAM_CHANCE = 0.05
+BATTLE_DAMAGE_CHANCE = 0.2
+GM_KILL_REASONS = ['GM', 'OutOfAmmo', 'BigRedButton', 'LandedTooLong', 'Asteroids']
+STATE_WEIGHTS = {"Wins": 1.0, "Survived": 0.0, "MIA": 0.0, "Deaths": -1.0, "Death Order": 1.0, "Death Time": 0.002, "Clean Kills": 3.0, "Assists": 1.5}
+
+
+def craft_names(count: int, awkward: bool = False) -> List[str]:
+    """ Names for count craft ('Craft 0', 'Craft 1', ...), starting with the awkward names if requested. """
+    names = AWKWARD_NAMES[:count] if awkward else []
+    return names + [f"Craft {i}" for i in range(count - len(names))]
+
+
+def craft_skills(craft: Iterable[str], rng: random.Random) -> Dict[str, float]:
+    """ A random skill (around 1) for each craft. """
+    return {name: rng.lognormvariate(0, 0.5) for name in craft}
+
+
+def with_noise(lines: Iterable[str], ratio: float, rng: random.Random) -> Iterator[str]:
+    """ Mix ratio noise lines per line (on average) in after each of the lines. """
+    for line in lines:
+        yield line
+        for _ in range(int(ratio) + (rng.random() < ratio % 1)):
+            yield rng.choice(NOISE_LINES).format(time=f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{rng.randrange(1000):03d}", number=rng.randrange(100000))
+
+
+def _engagements(attackers: Sequence[str], victim: str, skill: Dict[str, float], rng: random.Random) -> Dict[str, Dict[str, Tuple[int, int, float]]]:
+    """ The (hits, parts hit, damage) on the victim from each attacker with each weapon. """
+    engagements = {weapon: {} for weapon in WEAPONS}
+    for attacker in attackers:
+        for weapon, (_, _, _, chance, mean_hits, damage_per_hit) in WEAPONS.items():
+            if rng.random() < chance:
+                hits = 1 + int(rng.expovariate(1 / (mean_hits * skill[attacker] / skill[victim])))
+                engagements[weapon][attacker] = (hits, hits * rng.randint(1, 4), round(hits * rng.uniform(*damage_per_hit), 1))
+    return engagements
+
+
+def heat_log_lines(competition_id: int, teams: Dict[str, str], skill: Dict[str, float], rng: random.Random, timestamp: datetime, duration: float = 300,
+                   waypoints: bool = False) -> Tuple[List[str], float]:
+    """ The competition lines of a heat.
+
+    Args:
+        competition_id (int): The competition ID.
+        teams (Dict[str, str]): The team of each craft in the heat (in the order of the players).
+        skill (Dict[str, float]): The skill of each craft.
+        rng (random.Random): The random number generator.
+        timestamp (datetime): The time the results were dumped.
+        duration (float, optional): The competition duration limit (s). Defaults to 300.
+        waypoints (bool, optional): Include waypoint results. Defaults to False.
+
+    Returns:
+        Tuple[List[str], float]: The lines of the heat log and the duration of the heat (s).
+    """
+    prefix = f"[BDArmory.BDACompetitionMode:{competition_id}]: "
+    players = list(teams)
+    engagements = {victim: _engagements([player for player in players if teams[player] != teams[victim]], victim, skill, rng) for victim in players}
+    rams = {victim: {attacker: rng.randint(1, 20) for attacker in players if teams[attacker] != teams[victim] and rng.random() < RAM_CHANCE} for victim in players}
+    battle_damage = {victim: {source: round(rng.uniform(1, 50), 1) for source in rng.sample(players, rng.randint(1, 2))} for victim in players if rng.random() < BATTLE_DAMAGE_CHANCE}
+
+    # Who died and when.
+    death_times, mia = {}, []
+    for victim in players:
+        pressure = sum(damage for weapon in engagements[victim].values() for _, _, damage in weapon.values()) / (2000 * skill[victim])
+        if rng.random() < pressure / (1 + pressure):
+            if rng.random() < 0.03:
+                mia.append(victim)
+            else:
+                death_times[victim] = round(rng.uniform(20, duration), 1)
+    alive = [player for player in players if player not in death_times and player not in mia]
+    surviving_teams = list(dict.fromkeys(teams[player] for player in alive))
+    dead_teams = list(dict.fromkeys(teams[player] for player in players if teams[player] not in surviving_teams))
+    heat_duration = duration if len(surviving_teams) > 1 or len(death_times) == 0 else min(duration, int(max(death_times.values())) + rng.randint(1, 10))
+
+    def team_json(team: str) -> str:
+        return '{"team": "' + team + '", "members": [' + ", ".join('"' + member.replace('"', '\\"') + '"' for member in players if teams[member] == team) + ']}'
+
+    lines = [prefix + f"Dumping Results after {int(heat_duration)}s (of {duration:g}s) at {timestamp.strftime('%Y-%m-%d %H:%M:%S')} +00:00"]
+    if len(surviving_teams) == 0:
+        lines.append(prefix + "RESULT:Mutual Annihilation")
+    elif len(surviving_teams) == 1:
+        lines.append(prefix + "RESULT:Win:" + team_json(surviving_teams[0]))
+    else:
+        lines.append(prefix + "RESULT:Draw:[" + ", ".join(team_json(team) for team in surviving_teams) + "]")
+    lines.append(prefix + "DEADTEAMS:[" + ", ".join(team_json(team) for team in dead_teams) + "]")
+    lines.extend(prefix + f"ALIVE:{player}" for player in alive)
+    death_order = {player: order for order, player in enumerate(sorted(death_times, key=lambda player: death_times[player]))}
+    for player in players:
+        if player in death_times:
+            lines.append(prefix + f"DEAD:{death_order[player]}:{death_times[player]:.1f}:{player}")
+        elif player in mia:
+            lines.append(prefix + f"MIA:{player}")
+
+    # Who hit who with what.
+    for weapon, tags in WEAPONS.items():
+        for index, tag in enumerate(tags[:3]):
+            if tag is None:
+                continue
+            for victim in players:
+                if len(engagements[victim][weapon]) > 0:
+                    lines.append(prefix + f"{tag}:{victim}" + "".join(f":{values[index]}:{attacker}" for attacker, values in engagements[victim][weapon].items()))
+    lines.extend(prefix + f"WHORAMMEDWHO:{victim}" + "".join(f":{parts}:{attacker}" for attacker, parts in rammers.items()) for victim, rammers in rams.items() if len(rammers) > 0)
+    lines.extend(prefix + f"WHODAMAGEDWHOWITHBATTLEDAMAGE:{victim}" + "".join(f":{damage}:{source}" for source, damage in sources.items()) for victim, sources in battle_damage.items())
+
+    # Kills.
+    for victim in death_times:
+        damagers = {}
+        for weapon, attackers in engagements[victim].items():
+            for attacker, (_, _, damage) in attackers.items():
+                damagers[(attacker, weapon)] = damagers.get((attacker, weapon), 0) + damage
+        damagers.update({(attacker, 'RAMMING'): 100 * parts for attacker, parts in rams[victim].items()})
+        if len(damagers) == 0 or rng.random() < 0.05:
+            lines.append(prefix + f"GMKILL:{victim}:{rng.choice(GM_KILL_REASONS)}")
+        elif rng.random() < 0.7:
+            killer, weapon = rng.choices(list(damagers), weights=list(damagers.values()))[0]
+            lines.append(prefix + f"{rng.choices(['CLEANKILL', 'HEADSHOT', 'KILLSTEAL'], weights=[7, 2, 1])[0]}{weapon}:{victim}:{killer}")
+    lines.extend(prefix + f"PARTSLOSTTOASTEROIDS:{player}:{rng.randint(1, 5)}" for player in players if rng.random() < 0.02)
+    lines.extend(prefix + f"HPLEFT:{player}:{round(rng.uniform(5, 100), 2) if player in alive else 0}" for player in players)
+    for player in players:
+        hits = [sum(engagements[victim][weapon][player][0] for victim in players if player in engagements[victim][weapon]) for weapon in ('GUNS', 'ROCKETS')]
+        shots = [hit + int(hit * rng.uniform(1.5, 9)) + rng.randint(0, 20) for hit in hits]
+        lines.append(prefix + f"ACCURACY:{player}:{hits[0]}/{shots[0]}:{hits[1]}/{shots[1]}")
+    if waypoints:
+        for player in players:
+            times = list(itertools.accumulate(rng.uniform(5, 30) for _ in range(rng.randint(0, 10))))
+            if len(times) > 0:
+                lines.append(prefix + f"WAYPOINTS:{player}:" + ";".join(f"{index}:{rng.uniform(0, 100 / skill[player]):.2f}:{time:.2f}" for index, time in enumerate(times)))
+    return lines, heat_duration
+
+
+def write_tournament(folder: Path, tournament_id: int, craft: Sequence[str], rounds: int, vessels_per_heat: int = 8, heats: Optional[int] = None, team_size: int = 0,
+                     waypoints: bool = False, noise: float = 0, seed: int = 0) -> Path:
+    """ Write the heat logs of a tournament.
+
+    Args:
+        folder (Path): The folder to write the tournament folder ('Tournament <tournament_id>') in.
+        tournament_id (int): The tournament ID.
+        craft (Sequence[str]): The craft.
+        rounds (int): The number of rounds.
+        vessels_per_heat (int, optional): The number of craft in each heat. Defaults to 8.
+        heats (Optional[int], optional): The number of heats per round, each with a random selection of the craft (teams). Defaults to enough heats for each craft to fly once per round.
+        team_size (int, optional): Split the craft into teams of this size ('Team 1', 'Team 2', ...) that fly together. Defaults to 0 (free-for-all).
+        waypoints (bool, optional): Include waypoint results. Defaults to False.
+        noise (float, optional): The number of KSP noise lines per competition line. Defaults to 0.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        Path: The tournament folder.
+    """
+    rng = random.Random(seed)
+    skill = craft_skills(craft, rng)
+    if team_size > 0:
+        members = {f"Team {i + 1}": craft[start:start + team_size] for i, start in enumerate(range(0, len(craft), team_size))}
+        units_per_heat = max(1, vessels_per_heat // team_size)
+    else:
+        members = {name: [name] for name in craft}
+        units_per_heat = vessels_per_heat
+    units = list(members)
+    units_per_heat = min(units_per_heat, len(units))
+    tournament_dir = Path(folder) / f"Tournament {tournament_id}"
+    timestamp = datetime(2024, 1, 1, 12) + timedelta(days=rng.randrange(365))
+    for round in range(rounds):
+        round_dir = tournament_dir / f"Round {round}"
+        round_dir.mkdir(parents=True, exist_ok=True)
+        if heats is None:
+            rng.shuffle(units)
+            heat_units = [units[start:start + units_per_heat] for start in range(0, len(units), units_per_heat)]
+        else:
+            heat_units = [rng.sample(units, units_per_heat) for _ in range(heats)]
+        for heat, selection in enumerate(heat_units):
+            competition_id = rng.randrange(10000, 100000)
+            teams = {name: (unit if team_size > 0 else name) for unit in selection for name in members[unit]}
+            lines, duration = heat_log_lines(competition_id, teams, skill, rng, timestamp, waypoints=waypoints)
+            with open(round_dir / f"{competition_id}-Heat {heat}.log", 'w', encoding='utf-8') as f:
+                f.writelines(line + '\n' for line in with_noise(lines, noise, rng))
+            timestamp += timedelta(seconds=duration + rng.randint(20, 60))
+    return tournament_dir
+
+
+def cts_log_lines(competition_id: int, craft: Sequence[str], skill: Dict[str, float], rng: random.Random, deaths: float = 10, elapsed: int = 3600) -> List[str]:
+    """ The lines of a continuous spawning log.
+
+    Args:
+        competition_id (int): The competition ID.
+        craft (Sequence[str]): The craft (without any of the CTS_UNSAFE separators in their names).
+        skill (Dict[str, float]): The skill of each craft.
+        rng (random.Random): The random number generator.
+        deaths (float, optional): The mean number of deaths per craft. Defaults to 10.
+        elapsed (int, optional): The time since the start of the competition (s). Defaults to 3600.
+
+    Returns:
+        List[str]: The lines of the log.
+    """
+    prefix = f"[BDArmory.VesselSpawner:{competition_id}]: "
+    death_counts = {name: max(0, round(rng.gauss(deaths / skill[name], deaths / 4))) for name in craft}
+    # Per victim life: {weapon: {attacker: (hits, parts hit, damage)}}, and per attacker life: [hits, shots, rocket strikes, rockets fired].
+    engagements = {name: [] for name in craft}
+    accuracy = {name: [[0, 0, 0, 0] for _ in range(death_counts[name] + 1)] for name in craft}
+    for victim in craft:
+        for life in range(death_counts[victim] + 1):
+            attackers = rng.sample([name for name in craft if name != victim], min(len(craft) - 1, 1 + int(rng.expovariate(1 / 3))))
+            engagements[victim].append(_engagements(attackers, victim, skill, rng))
+            engagements[victim][-1]['RAMMING'] = {attacker: (0, rng.randint(1, 20), 0) for attacker in attackers if rng.random() < RAM_CHANCE}
+            for weapon, index in (('GUNS', 0), ('ROCKETS', 2)):
+                for attacker, (hits, _, _) in engagements[victim][-1][weapon].items():
+                    accuracy[attacker][rng.randrange(len(accuracy[attacker]))][index] += hits
+
+    def by(tag: str, weapon: str, index: int, lives: List[dict]) -> List[str]:
+        entries = ", ".join(f"{life}:" + ";".join(f"{values[index]}:{attacker}" for attacker, values in engagement[weapon].items()) for life, engagement in enumerate(lives) if len(engagement[weapon]) > 0)
+        return [prefix + f" {tag}:{entries}"] if entries != "" else []
+
+    lines = [prefix + f"Dumping Results at {elapsed}s"]
+    for victim in craft:
+        lives = engagements[victim]
+        death_times = sorted(round(rng.uniform(0, elapsed), 1) for _ in range(death_counts[victim]))
+        lines.append(prefix + f"Name:{victim}")
+        lines.append(prefix + f" DEATHCOUNT:{death_counts[victim]}")
+        if len(death_times) > 0:
+            lines.append(prefix + " DEATHTIMES:" + ";".join(f"{time:.1f}" for time in death_times))
+        lines.extend(by("WHOSHOTME", 'GUNS', 0, lives))
+        lines.extend(by("WHODAMAGEDMEWITHBULLETS", 'GUNS', 2, lives))
+        lines.extend(by("WHOSTRUCKMEWITHROCKETS", 'ROCKETS', 0, lives))
+        lines.extend(by("WHOPARTSHITMEWITHROCKETS", 'ROCKETS', 1, lives))
+        lines.extend(by("WHODAMAGEDMEWITHROCKETS", 'ROCKETS', 2, lives))
+        lines.extend(by("WHOSTRUCKMEWITHMISSILES", 'MISSILES', 0, lives))
+        lines.extend(by("WHOPARTSHITMEWITHMISSILES", 'MISSILES', 1, lives))
+        lines.extend(by("WHODAMAGEDMEWITHMISSILES", 'MISSILES', 2, lives))
+        lines.extend(by("WHORAMMEDME", 'RAMMING', 1, lives))
+        asteroids = ", ".join(f"{life}:{rng.randint(1, 5)}" for life in range(len(lives)) if rng.random() < 0.02)
+        if asteroids != "":
+            lines.append(prefix + f" PARTSLOSTTOASTEROIDS: {asteroids}")
+        gm_kills, clean_kills = [], {'GUNS': [], 'ROCKETS': [], 'RAMMING': [], 'MISSILES': []}
+        for life in range(death_counts[victim]):  # The last life is the current one.
+            damagers = {(attacker, weapon): values[2] + 100 * values[1] * (weapon == 'RAMMING') for weapon, attackers in lives[life].items() for attacker, values in attackers.items()}
+            if len(damagers) == 0 or rng.random() < 0.05:
+                gm_kills.append(f"{life}:{rng.choice(GM_KILL_REASONS)}")
+            elif rng.random() < 0.7:
+                killer, weapon = rng.choices(list(damagers), weights=list(damagers.values()))[0]
+                clean_kills[weapon].append(f"{life}:{killer}")
+        if len(gm_kills) > 0:
+            lines.append(prefix + " GMKILL:" + ", ".join(gm_kills))
+        for tag, weapon in (("CLEANKILL", 'GUNS'), ("CLEANFRAG", 'ROCKETS'), ("CLEANRAM", 'RAMMING'), ("CLEANMISSILEKILL", 'MISSILES')):
+            if len(clean_kills[weapon]) > 0:
+                lines.append(prefix + f" {tag}:" + ", ".join(clean_kills[weapon]))
+        for counts in accuracy[victim]:
+            counts[1] = counts[0] + int(counts[0] * rng.uniform(1.5, 9)) + rng.randint(0, 20)
+            counts[3] = counts[2] + int(counts[2] * rng.uniform(0.5, 3)) + rng.randint(0, 5)
+        lines.append(prefix + " ACCURACY:" + ", ".join(f"{life}:{hits}/{shots}:{strikes}/{fired}" for life, (hits, shots, strikes, fired) in enumerate(accuracy[victim])))
+    return lines
+
+
+def write_cts_log(folder: Path, craft: Sequence[str], deaths: float = 10, noise: float = 0, seed: int = 0) -> Path:
+    """ Write a continuous spawning log (cts-<competition ID>.log) of the craft (see cts_log_lines).
+    Craft with any of the CTS_UNSAFE separators in their names are left out.
+
+    Returns:
+        Path: The log file.
+    """
+    rng = random.Random(seed)
+    craft = [name for name in craft if not any(separator in name for separator in CTS_UNSAFE)]
+    skill = craft_skills(craft, rng)
+    competition_id = rng.randrange(10000, 100000)
+    lines = cts_log_lines(competition_id, craft, skill, rng, deaths, elapsed=int(math.ceil(60 * deaths * rng.uniform(5, 10))))
+    Path(folder).mkdir(parents=True, exist_ok=True)
+    log_file = Path(folder) / f"cts-{competition_id}.log"
+    with open(log_file, 'w', encoding='utf-8') as f:
+        f.writelines(line + '\n' for line in with_noise(lines, noise, rng))
+    return log_file
+
+
+def tournament_state(craft: Sequence[str], rounds: int, vessels_per_heat: int = 8, played: Optional[int] = None, seed: int = 0) -> dict:
+    """ A free-for-all tournament state, as decoded from tournament.state (see bda_logs/state.py).
+
+    Args:
+        craft (Sequence[str]): The craft (the players, whose craft files are '<craft>.craft').
+        rounds (int): The number of rounds, each with enough heats for each craft to fly once.
+        vessels_per_heat (int, optional): The number of craft in each heat. Defaults to 8.
+        played (Optional[int], optional): The number of rounds that have been completed, with scores and results. Defaults to all of them.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        dict: The decoded state. Its heats, scores and teamFiles are last, as in the decoded state (so that re-encoding and decoding it gives the same JSON).
+    """
+    rng = random.Random(seed)
+    skill = craft_skills(craft, rng)
+    played = rounds if played is None else played
+    files = {name: f"{name}.craft" for name in craft}
+    heats, scores, results = {}, {name: [] for name in craft}, []
+    for round_number in range(rounds):
+        order = list(craft)
+        rng.shuffle(order)
+        for heat, start in enumerate(range(0, len(order), vessels_per_heat)):
+            players = order[start:start + vessels_per_heat]
+            heats[f"Heat {len(heats)}"] = {
+                "worldIndex": 1, "latitude": round(rng.uniform(-60, 60), 4), "longitude": round(rng.uniform(-180, 180), 4), "altitude": 1000.0, "distance": 1000.0, "absDistanceOrFactor": False,
+                "easeInSpeed": 1.0, "killEverythingFirst": True, "folder": "", "craftFiles": [], "round": round_number, "heat": heat, "completed": round_number < played,
+                "teams": [[files[player]] for player in players],
+            }
+            if round_number >= played:
+                continue
+            competition_id, duration = rng.randrange(10000, 100000), round(rng.uniform(120, 300), 2)
+            dead = [player for player in players if rng.random() > skill[player] / (skill[player] + 1)]
+            if len(dead) == len(players) and rng.random() < 0.5:
+                dead.pop()  # Mostly leave a survivor.
+            rng.shuffle(dead)
+            survivors = [player for player in players if player not in dead]
+            for player in players:
+                damaged_by = [other for other in players if other != player and rng.random() < 0.5 * skill[other]]
+                score_data = {
+                    "competitionID": competition_id, "aliveState": 5 if player in dead else 0, "survivalState": 2 if player in dead else 0, "team": player, "numberOfCompetitors": len(players),
+                    "compDuration": duration, "hits": rng.randint(0, int(200 * skill[player])), "shotsFired": rng.randint(200, 2000), "rocketStrikes": rng.randint(0, 10), "rocketsFired": rng.randint(10, 40),
+                    "partsLostToAsteroids": 0, "deathOrder": dead.index(player) if player in dead else -1, "deathTime": round(rng.uniform(0, duration), 2) if player in dead else -1.0,
+                    "gmKillReason": 0,
+                }
+                opponent_data = {field: {other: (rng.randint(1, 50) if field.endswith("Counts") else round(rng.uniform(1, 500), 2)) if other in damaged_by else 0 for other in craft if other != player} for field in OPPONENT_FIELDS}
+                scores[player].append(score_data | opponent_data | {"damageTypesTaken": sorted(rng.sample(range(1, 5), min(len(damaged_by), 4))), "everyoneWhoDamagedMe": damaged_by})
+            results.append({
+                "competitionResult": 0 if len(survivors) == 1 else 1 if len(survivors) > 1 else 2,
+                "survivingTeams": [{"ls": [player]} for player in survivors],
+                "deadTeams": [{"ls": [player]} for player in dead],
+            })
+    return {
+        "tournamentID": rng.randrange(1 << 31), "savegame": "BDArmory", "vesselCount": len(craft), "teamCount": len(craft), "teamsPerHeat": vessels_per_heat, "vesselsPerTeam": 1, "fullTeams": False,
+        "vesselsPerHeat": vessels_per_heat, "numberOfRounds": rounds, "npcsPerHeat": 0, "npcFiles": [], "tournamentType": 0, "tournamentStyle": 0, "tournamentRoundType": 0,
+        "heats": heats,
+        "scores": {"lastUpdated": float(played), "_npcs": [], "weights": dict(STATE_WEIGHTS), "scores": scores, "files": files, "results": results},
+        "teamFiles": [[files[name]] for name in craft],
+    }
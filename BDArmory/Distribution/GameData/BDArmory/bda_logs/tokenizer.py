@@ -0,0 +1,177 @@
+""" Tokenizer for the competition results in heat logs.
+
+A single compiled pattern finds the tag of each competition line, then a dispatch table sends the rest of the line to a handler for that tag.
+The handlers convert the payload to typed values and the tokenizer yields them as HeatEvents, which the tournament parser folds into the heat record.
+"""
+
+# Standard library imports
+import json
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, NamedTuple, Optional
+
+
+class HeatEvent(NamedTuple):
+    """ A structured event from a heat log.
+
+    kind is one of:
+        'duration': data is (duration, timestamp) of the heat.
+        'state': craft has a new record, data is the record (ALIVE, DEAD or MIA).
+        'craft': data is a dict of fields to update in the craft's record.
+        'result': data is the heat result.
+        'dead teams': data is a dict of fields to update in the heat result.
+    """
+    kind: str
+    craft: Optional[str]
+    data: Any
+
+
+Handler = Callable[[str, Mapping[str, str]], Optional[HeatEvent]]
+
+COMPETITION_TAG = re.compile(r'[^ ]*BDArmory\.BDACompetitionMode[^ ]* (Dumping Results|[A-Z]+)')  # The tag is the first word of the field after the log prefix.
+
+
+def CalculateAccuracy(hits, shots): return 100 * hits / shots if shots > 0 else 0
+
+
+def _teams(teams: list, names: Mapping[str, str]) -> Dict[str, str]:
+    return {names.get(team['team'], team['team']): ', '.join((names[craft] for craft in team['members'])) for team in teams}
+
+
+def _dumping_results(field: str, names: Mapping[str, str]) -> HeatEvent:
+    """ Handler for the header line: Dumping Results [<message>] after <time>s (of <duration>s) at <timestamp> """
+    duration = float(field[field.find('(') + 4:field.find(')') - 1])
+    timestamp = datetime.fromisoformat(field[field.find(' at ') + 4:])
+    return HeatEvent('duration', None, (duration, timestamp))
+
+
+def _alive_or_mia(state: str) -> Handler:
+    def handler(craft: str, names: Mapping[str, str]) -> HeatEvent:
+        return HeatEvent('state', names[craft], {'state': state})
+    return handler
+
+
+def _dead(payload: str, names: Mapping[str, str]) -> HeatEvent:
+    order, time, craft = payload.split(':', 2)
+    return HeatEvent('state', names[craft], {'state': 'DEAD', 'deathOrder': int(order), 'deathTime': float(time)})
+
+
+def _by(key: str, value_type: Callable[[str], Any]) -> Handler:
+    """ Handler for the WHO* tags: <craft>:<value>:<player>:<value>:<player>... """
+    def handler(payload: str, names: Mapping[str, str]) -> HeatEvent:
+        craft, shooters = payload.split(':', 1)
+        data = shooters.split(':')
+        return HeatEvent('craft', names[craft], {key: dict(zip(map(names.__getitem__, data[1::2]), map(value_type, data[::2])))})
+    return handler
+
+
+def _killer(key: str) -> Handler:
+    """ Handler for the clean-kill, head-shot and kill-steal tags: <craft>:<killer> """
+    def handler(payload: str, names: Mapping[str, str]) -> HeatEvent:
+        craft, killer = payload.split(':', 1)
+        return HeatEvent('craft', names[craft], {key: names[killer]})
+    return handler
+
+
+def _value(key: str, value_type: Callable[[str], Any]) -> Handler:
+    """ Handler for tags with a single value: <craft>:<value> """
+    def handler(payload: str, names: Mapping[str, str]) -> HeatEvent:
+        craft, value = payload.split(':', 1)
+        return HeatEvent('craft', names[craft], {key: value_type(value)})
+    return handler
+
+
+def _accuracy(payload: str, names: Mapping[str, str]) -> HeatEvent:
+    craft, accuracy, rocket_accuracy = payload.split(':', 2)
+    hits, shots = accuracy.split('/')
+    rocket_strikes, rockets_fired = rocket_accuracy.split('/')
+    return HeatEvent('craft', names[craft], {
+        'accuracy': CalculateAccuracy(int(hits), int(shots)), 'hits': int(hits), 'shots': int(shots),
+        'rocket_accuracy': CalculateAccuracy(int(rocket_strikes), int(rockets_fired)), 'rocket_strikes': int(rocket_strikes), 'rockets_fired': int(rockets_fired)
+    })
+
+
+def _result(payload: str, names: Mapping[str, str]) -> HeatEvent:
+    heat_result = payload.split(':', 1)
+    result_type = heat_result[0]
+    if len(heat_result) > 1:
+        teams = json.loads(heat_result[1])
+        if isinstance(teams, dict):  # Win, single team
+            return HeatEvent('result', None, {'result': result_type, 'teams': _teams([teams], names)})
+        elif isinstance(teams, list):  # Draw, multiple teams
+            return HeatEvent('result', None, {'result': result_type, 'teams': _teams(teams, names)})
+    return HeatEvent('result', None, {'result': result_type})  # Mutual Annihilation
+
+
+def _dead_teams(payload: str, names: Mapping[str, str]) -> Optional[HeatEvent]:
+    dead_teams = json.loads(payload)
+    if len(dead_teams) > 0:
+        return HeatEvent('dead teams', None, {'dead teams': _teams(dead_teams, names)})
+    return None
+
+
+def _waypoints(payload: str, names: Mapping[str, str]) -> HeatEvent:
+    craft, waypoints_str = payload.split(':', 1)
+    return HeatEvent('craft', names[craft], {'waypoints': [waypoint.split(':') for waypoint in waypoints_str.split(';')]})  # List[Tuple[int, float, float]] = [(index, deviation, timestamp),]
+
+
+HANDLERS: Dict[str, Handler] = {
+    'Dumping Results': _dumping_results,
+    'ALIVE': _alive_or_mia('ALIVE'),
+    'DEAD': _dead,
+    'MIA': _alive_or_mia('MIA'),
+    'WHOSHOTWHOWITHGUNS': _by('hitsBy', int),
+    'WHODAMAGEDWHOWITHGUNS': _by('bulletDamageBy', float),
+    'WHOHITWHOWITHMISSILES': _by('missileHitsBy', int),
+    'WHOPARTSHITWHOWITHMISSILES': _by('missilePartsHitBy', int),
+    'WHODAMAGEDWHOWITHMISSILES': _by('missileDamageBy', float),
+    'WHOHITWHOWITHROCKETS': _by('rocketHitsBy', int),
+    'WHOPARTSHITWHOWITHROCKETS': _by('rocketPartsHitBy', int),
+    'WHODAMAGEDWHOWITHROCKETS': _by('rocketDamageBy', float),
+    'WHORAMMEDWHO': _by('rammedPartsLostBy', int),
+    'WHODAMAGEDWHOWITHBATTLEDAMAGE': _by('battleDamageBy', float),
+    'CLEANKILLGUNS': _killer('cleanKillBy'),
+    'CLEANKILLROCKETS': _killer('cleanRocketKillBy'),
+    'CLEANKILLMISSILES': _killer('cleanMissileKillBy'),
+    'CLEANKILLRAMMING': _killer('cleanRamKillBy'),
+    'HEADSHOTGUNS': _killer('cleanKillBy'),  # FIXME make head-shots separate from clean-kills
+    'HEADSHOTROCKETS': _killer('cleanRocketKillBy'),
+    'HEADSHOTMISSILES': _killer('cleanMissileKillBy'),
+    'HEADSHOTRAMMING': _killer('cleanRamKillBy'),
+    'KILLSTEALGUNS': _killer('cleanKillBy'),  # FIXME make kill-steals separate from clean-kills
+    'KILLSTEALROCKETS': _killer('cleanRocketKillBy'),
+    'KILLSTEALMISSILES': _killer('cleanMissileKillBy'),
+    'KILLSTEALRAMMING': _killer('cleanRamKillBy'),
+    'GMKILL': _value('GMKillReason', str),
+    'PARTSLOSTTOASTEROIDS': _value('partsLostToAsteroids', int),
+    'HPLEFT': _value('HPremaining', float),
+    'ACCURACY': _accuracy,
+    'RESULT': _result,
+    'DEADTEAMS': _dead_teams,
+    # Ignore Tag mode for now.
+    'WAYPOINTS': _waypoints,
+}
+
+
+def tokenize_heat_log(log_lines: Iterable[str], names: Mapping[str, str]) -> Iterator[HeatEvent]:
+    """ Tokenize the competition lines of a heat log into HeatEvents.
+
+    Args:
+        log_lines (Iterable[str]): The (stripped) log lines.
+        names (Mapping[str, str]): Map from the craft names as they appear in the log lines to the actual craft names.
+
+    Yields:
+        HeatEvent: The events in the order they appear in the log.
+    """
+    match = COMPETITION_TAG.match
+    handlers = HANDLERS
+    for line in log_lines:
+        m = match(line)
+        if m is None:
+            continue  # Ignore irrelevant lines
+        handler = handlers.get(m.group(1))
+        if handler is None:
+            continue  # Ignore unknown tags
+        event = handler(line[m.end() + 1:], names)  # Skip the ':' (or ' ') after the tag.
+        if event is not None:
+            yield event
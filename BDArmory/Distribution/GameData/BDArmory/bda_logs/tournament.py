@@ -0,0 +1,268 @@
+""" Parsing, aggregation and scoring of a tournament (parse_tournament_log_files.py), as an importable library.
+
+A Tournament holds everything that the tournament parser works out, in memory:
+    - data: the heat records of each round (as written to results.json),
+    - metadata: the tournament ID, number of rounds and the time span of its heats,
+    - facts: the fact table of the heats (see facts.py),
+    - summary: the summary of each craft, the team results and the teams (as written to summary.json), once summarise has been called,
+    - scores: the total, per-round and cumulative scores of each craft, once score has been called.
+Tools that follow on from the tournament parser (PvP scores, who-beat-who, plots, etc.) can use these directly instead of reading results.json and
+summary.json back in, e.g.,
+    tournament = Tournament.load(Path("Logs/Tournament 1"), weights)
+    pvp = PvpScores(tournament.facts, tournament.score_weights())
+"""
+
+# Standard library imports
+import json
+import re
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Third party imports
+import numpy
+
+# Local imports
+from .cache import PARSE_CHUNKSIZE, HeatCache
+from .facts import TournamentFacts
+from .heats import parse_heat_log_file
+from .scoring import SCORE_FIELDS, Scorer, TournamentScores
+from .variants import average_groups, average_variants
+
+HeatLoader = Iterator[Tuple[dict, List[Tuple[float, datetime]]]]
+
+
+def natural_sort_key(key: Union[str, Path]):
+    """ Sort 'Round 10' after 'Round 9', etc. """
+    if isinstance(key, Path):
+        key = key.name
+    try:
+        return int(key.rsplit(' ')[1])  # If the key ends in an integer, split that off and use that as the sort key.
+    except:
+        return key  # Otherwise, just use the key.
+
+
+def find_heat_logs(tournament_dir: Path, current_dir: bool = False, first: Optional[int] = None, include=None) -> List[Tuple[str, Path]]:
+    """ Find the heat logs of a tournament.
+
+    Args:
+        tournament_dir (Path): The tournament folder.
+        current_dir (bool, optional): The heat logs are in the folder itself instead of its round folders. Defaults to False.
+        first (Optional[int], optional): Only the first this many logs of each round. Defaults to all of them.
+        include (optional): A predicate on the log files to select which to include. Defaults to all of them.
+
+    Returns:
+        List[Tuple[str, Path]]: The round name and log file of each heat, in order.
+    """
+    heat_logs = []
+    for round in sorted((round_dir for round_dir in tournament_dir.iterdir() if round_dir.is_dir()), key=natural_sort_key) if not current_dir else (tournament_dir,):
+        if not current_dir and len(round.name) == 0:
+            continue
+        log_files = sorted(round.glob("[0-9]*.log"))
+        if include is not None:
+            log_files = [heat for heat in log_files if include(heat)]
+        heat_logs.extend((round.name, heat) for heat in (log_files if first is None else log_files[:first]))
+    return heat_logs
+
+
+def load_heat_logs(heat_logs: Sequence[Tuple[str, Path]], cache: Optional[HeatCache] = None, executor: Optional[Executor] = None) -> HeatLoader:
+    """ Start loading the heat logs (from the cache where it's up to date, and in the executor, e.g., a process pool, if given).
+
+    Returns:
+        HeatLoader: An iterator over the heat records and durations of the heat logs, in order.
+    """
+    if cache is not None:
+        return cache.load_all([heat for _, heat in heat_logs], executor)
+    if executor is not None:
+        return executor.map(parse_heat_log_file, [heat for _, heat in heat_logs], chunksize=PARSE_CHUNKSIZE)
+    return map(parse_heat_log_file, (heat for _, heat in heat_logs))
+
+
+def collect_heats(tournament_dir: Path, heat_logs: Sequence[Tuple[str, Path]], loaded_heats: HeatLoader) -> Tuple[Dict[str, Dict[str, dict]], dict]:
+    """ Collect the loaded heats into the heat records of each round and the tournament metadata.
+
+    Args:
+        tournament_dir (Path): The tournament folder.
+        heat_logs (Sequence[Tuple[str, Path]]): The round name and log file of each heat (from find_heat_logs).
+        loaded_heats (HeatLoader): The loaded heats (from load_heat_logs).
+
+    Returns:
+        Tuple[Dict[str, Dict[str, dict]], dict]: The heat records of each round and the metadata: 'ID' (if the folder is named 'Tournament <ID>'),
+            'rounds' (the number of round folders) and 'duration' (the (start, end) datetimes, if there were any heats).
+    """
+    data, metadata = {}, {}
+    m = re.search('Tournament (\\d+)', str(tournament_dir))
+    if m is not None and len(m.groups()) > 0:
+        metadata['ID'] = m.groups()[0]
+    metadata['rounds'] = len([round_dir for round_dir in tournament_dir.iterdir() if round_dir.is_dir() and round_dir.name.startswith('Round')])
+    for (round_name, heat), (heat_data, durations) in zip(heat_logs, loaded_heats):
+        data.setdefault(round_name, {})[heat.name] = heat_data
+        for duration, timestamp in durations:
+            metadata['duration'] = (min(metadata['duration'][0], timestamp), max(metadata['duration'][1], timestamp + timedelta(seconds=duration))
+                                    ) if 'duration' in metadata else (timestamp, timestamp + timedelta(seconds=duration))
+    return data, metadata
+
+
+class Tournament:
+    """ A parsed tournament: its heat records, metadata and fact table, and its summary and scores once they've been worked out. """
+
+    def __init__(self, path: Path, data: Dict[str, Dict[str, dict]], metadata: dict, facts: TournamentFacts):
+        """
+        Args:
+            path (Path): The tournament folder.
+            data (Dict[str, Dict[str, dict]]): The heat records of each round.
+            metadata (dict): The tournament metadata (see collect_heats).
+            facts (TournamentFacts): The fact table of data.
+        """
+        self.path = path
+        self.data = data
+        self.metadata = metadata
+        self.facts = facts
+        self.summary: dict = {}
+        self.scores: Optional[TournamentScores] = None
+        self.has_waypoints = False
+        self.average_groups: Dict[str, List[str]] = {}  # The craft averaged into each craft of the summary (--average-duplicates).
+
+    @classmethod
+    def load(cls, path: Path, weights: Sequence[float], current_dir: bool = False, cache: Optional[HeatCache] = None, executor: Optional[Executor] = None,
+             merge_duplicates: bool = False, average_duplicates: bool = False, score: bool = True, zero_lowest_score: bool = False) -> 'Tournament':
+        """ Parse, summarise and score a tournament, as the tournament parser does.
+
+        Args:
+            path (Path): The tournament folder.
+            weights (Sequence[float]): The score weights, in the order of SCORE_FIELDS.
+            current_dir (bool, optional): The heat logs are in the folder itself instead of its round folders. Defaults to False.
+            cache (Optional[HeatCache], optional): The heat cache of the tournament. Defaults to parsing all the heats.
+            executor (Optional[Executor], optional): The executor to parse the heats with. Defaults to parsing them in this process.
+            merge_duplicates (bool, optional): Merge the variants of each craft when building the fact table. Defaults to False.
+            average_duplicates (bool, optional): Average the variants of each craft in the summary. Defaults to False.
+            score (bool, optional): Score the craft. Defaults to True.
+            zero_lowest_score (bool, optional): Shift the scores so that the lowest is 0. Defaults to False.
+        """
+        heat_logs = find_heat_logs(path, current_dir)
+        data, metadata = collect_heats(path, heat_logs, load_heat_logs(heat_logs, cache, executor))
+        tournament = cls(path, data, metadata, TournamentFacts(data, merge_variants=merge_duplicates))
+        tournament.summarise(weights, average_duplicates)
+        if score:
+            tournament.score(weights, zero_lowest_score)
+        return tournament
+
+    def summarise(self, weights: Sequence[float], average_duplicates: bool = False) -> dict:
+        """ Build the summary of the tournament (as written to summary.json), without the scores.
+
+        Args:
+            weights (Sequence[float]): The score weights (recorded in the metadata of the summary).
+            average_duplicates (bool, optional): Average the variants of each craft. Defaults to False.
+
+        Returns:
+            dict: The summary.
+        """
+        team_wins, team_draws, team_deaths, teams = self.facts.team_results()
+        self.summary = {
+            'meta': {
+                'ID': self.metadata.get('ID', 'unknown'),
+                'duration': [ts.isoformat() for ts in self.metadata.get('duration', (datetime.now(), datetime.now()))],
+                'rounds': self.metadata.get('rounds', -1),
+                'score weights': {f: w for f, w in zip(SCORE_FIELDS, weights)},
+            },
+            'craft': self.facts.summary(),
+            'team results': {
+                'wins': team_wins,
+                'draws': team_draws,
+                'deaths': team_deaths
+            },
+            'teams': teams
+        }
+        self.average_groups = average_groups(self.summary['craft']) if average_duplicates else {}
+        if len(self.average_groups) > 0:
+            self.summary['craft'] = average_variants(self.summary['craft'], self.average_groups)
+
+        for craft in self.summary['craft'].values():
+            spawns = craft['survivedCount'] + craft['deathCount'][0]
+            craft.update({
+                'damage/hit': craft['bulletDamage'] / craft['hits'] if craft['hits'] > 0 else 0,
+                'hits/spawn': craft['hits'] / spawns if spawns > 0 else 0,
+                'damage/spawn': craft['bulletDamage'] / spawns if spawns > 0 else 0,
+            })
+
+        waypoints = self.facts.waypoint_summary()
+        self.has_waypoints = len(waypoints) > 0
+        for craft, waypoint_fields in waypoints.items():
+            if craft in self.summary['craft']:  # Duplicates may have been averaged.
+                self.summary['craft'][craft].update(waypoint_fields)
+        return self.summary
+
+    def score(self, weights: Sequence[float], zero_lowest_score: bool = False) -> TournamentScores:
+        """ Score the craft, adding their total scores to the summary.
+
+        Args:
+            weights (Sequence[float]): The score weights, in the order of SCORE_FIELDS.
+            zero_lowest_score (bool, optional): Shift the total scores so that the lowest is 0. Defaults to False.
+
+        Returns:
+            TournamentScores: The total, per-round and cumulative scores. Averaged duplicates are scored on the averages of their per-round values.
+        """
+        scorer = Scorer(weights)
+        round_craft, rounds = self.facts.craft, self.facts.round_matrix(scorer.fields)  # The per-round values are needed for the waypoint scores to avoid negative scores.
+        if len(self.average_groups) > 0:
+            index = {craft: i for i, craft in enumerate(round_craft)}
+            round_craft = list(self.summary['craft'])
+            rounds = numpy.stack([rounds[[index[variant] for variant in self.average_groups.get(craft, [craft])]].mean(axis=0) for craft in round_craft]) if len(round_craft) > 0 else rounds[:0]
+        self.scores = scorer.score(self.summary['craft'], round_craft, rounds)
+        for craft, summary_data in self.summary['craft'].items():
+            summary_data.update({'score': self.scores.total[craft]})
+        if zero_lowest_score and len(self.summary['craft']) > 0:
+            offset = min(summary_data['score'] for summary_data in self.summary['craft'].values())
+            for summary_data in self.summary['craft'].values():
+                summary_data['score'] -= offset
+        return self.scores
+
+    def score_weights(self) -> Dict[str, float]:
+        """ The non-zero score weights of the summary, by field (as the PvP scores use them). """
+        return {field: w for field, w in self.summary['meta']['score weights'].items() if w != 0}
+
+    def ranking(self) -> List[str]:
+        """ The craft in the summary, from the highest score to the lowest. """
+        return sorted(self.summary['craft'], key=lambda craft: self.summary['craft'][craft]['score'], reverse=True)
+
+    def cumulative_scores(self) -> Dict[str, List[float]]:
+        """ The cumulative score of each craft in the summary after each round, from the highest total score to the lowest. """
+        return {craft: self.scores.cumulative[craft] for craft in self.ranking()} if self.scores is not None else {}
+
+    def team_names(self) -> List[str]:
+        """ The names of the teams in the team results. """
+        return sorted(list(set([team for result_type in self.summary['team results'].values() for team in result_type])))
+
+    def results_json(self, cache: Optional[HeatCache] = None) -> str:
+        """ The contents of results.json (assembled from the cached heat JSON if the heats were loaded with a cache). """
+        return cache.results_json(self.data) if cache is not None else json.dumps(self.data, indent=2, ensure_ascii=False)
+
+    def summary_json(self) -> str:
+        """ The contents of summary.json. """
+        return json.dumps(self.summary, indent=2, ensure_ascii=False)
+
+    def summary_csv(self, cumulative: bool = True) -> str:
+        """ The contents of summary.csv: the craft summary (by score), the team results and the cumulative scores (if scored and cumulative). """
+        headers = (["score", ] if self.scores is not None else []) + [k for k in next(iter(self.summary['craft'].values())).keys() if k not in ('score',)]
+        csv_summary = ["craft," + ",".join(
+            ",".join(('deathCount', 'dcB', 'dcR', 'dcM', 'dcR', 'dcA', 'dcS')) if k == 'deathCount' else
+            ",".join(('cleanKills', 'ckB', 'ckR', 'ckM', 'ckR')) if k == 'cleanKills' else
+            k for k in headers), ]
+        for craft, score in sorted(self.summary['craft'].items(), key=lambda i: i[1]['score'], reverse=True):
+            csv_summary.append(craft + "," + ",".join(
+                ",".join(str(int(100 * sf) / 100) for sf in score[h]) if isinstance(score[h], tuple)
+                else ",".join(str(int(100 * sf) / 100) for sf in score[h].values()) if isinstance(score[h], dict)
+                else str(int(100 * score[h]) / 100)
+            for h in headers))
+
+        team_results = self.summary['team results']
+        csv_summary.append('\nTeam,Wins,Draws,Deaths,Vessels')
+        for team in sorted(self.team_names(), key=lambda team: team_results['wins'][team], reverse=True):
+            csv_summary.append(','.join([str(v) for v in (team, team_results['wins'][team], team_results['draws'][team], team_results['deaths'][team], self.summary['teams'][team].replace(", ", ","))]))
+        if self.scores is not None and cumulative:
+            cumulative_scores = self.cumulative_scores()
+            csv_summary.append(f"\nName \\ Cumulative Score Per Round," + ",".join(f"{r:>7d}" for r in range(len(next(iter(cumulative_scores.values()))))))
+            for craft, scores in cumulative_scores.items():
+                csv_summary.append(f"{craft}," + ",".join(f"{s:.2f}" for s in scores))
+        return '\n'.join(csv_summary)
@@ -0,0 +1,98 @@
+""" Duplicate craft variants (--average-duplicates and --merge-duplicates).
+
+Craft that are entered more than once are named 'Craft', 'Craft_1', 'Craft_2', etc. Each name is split once into its base name and numeric suffix, and
+the variants are grouped by their base name in a single pass, instead of comparing every name with every other name.
+Only names whose base name is also a craft are variants, so 'Craft_1' and 'Craft_2' without a 'Craft' are separate craft.
+Variants of variants (e.g., 'Craft_1_2') belong to the top-level craft, both when merging and when averaging.
+"""
+
+# Standard library imports
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Third party imports
+import numpy
+
+
+def split_variant(name: str) -> Tuple[str, Optional[str]]:
+    """ Split a name into its base name and numeric suffix, e.g., 'Craft_2' -> ('Craft', '2'). Names without a suffix give (name, None). """
+    base, separator, suffix = name.rpartition('_')
+    if separator and suffix.isdigit():
+        return base, suffix
+    return name, None
+
+
+def variant_groups(names: Iterable[str]) -> Dict[str, List[str]]:
+    """ Group the variants of each craft.
+
+    Args:
+        names (Iterable[str]): The craft names.
+
+    Returns:
+        Dict[str, List[str]]: The variants (in the order of names) followed by the base name, for each base name that has variants.
+    """
+    names = list(names)
+    present = set(names)
+    groups: Dict[str, List[str]] = {}
+    for name in names:
+        base, suffix = split_variant(name)
+        if suffix is not None and base in present:
+            groups.setdefault(base, []).append(name)
+    return {base: variants + [base] for base, variants in groups.items()}
+
+
+def variant_aliases(names: Iterable[str]) -> Dict[str, str]:
+    """ The base name of each variant in names, for merging them. Variants of variants (e.g., 'Craft_1_2') are merged into the top-level base name. """
+    aliases = {variant: base for base, group in variant_groups(names).items() for variant in group if variant != base}
+    for variant, base in aliases.items():
+        while base in aliases:
+            base = aliases[base]
+        aliases[variant] = base
+    return aliases
+
+
+def average_groups(names: Iterable[str]) -> Dict[str, List[str]]:
+    """ The craft to average for each craft with variants: every variant that merges into it (see variant_aliases, so variants of variants are
+    included), in the order of names, followed by the base name.
+    """
+    names = list(names)
+    aliases = variant_aliases(names)
+    groups: Dict[str, List[str]] = {}
+    for name in names:
+        if name in aliases:
+            groups.setdefault(aliases[name], []).append(name)
+    return {base: variants + [base] for base, variants in groups.items()}
+
+
+def average_stats(stats: Sequence[Mapping]) -> dict:
+    """ The average of the stats of several craft.
+
+    Each craft's stats are flattened into one vector (tuple fields element-wise) and the vectors are added up in order, as sum() would, then divided by
+    their number. The result has the fields and tuple lengths of the last craft's stats.
+    """
+    template = stats[-1]
+    fields = [(field, len(value) if isinstance(value, tuple) else None) for field, value in template.items()]
+
+    def vector(craft: Mapping) -> List[float]:
+        return [element for field, length in fields for element in (craft[field][:length] if length is not None else (craft[field],))]
+
+    vectors = numpy.array([vector(craft) for craft in stats], dtype=float)
+    total = vectors[0].copy()
+    for row in vectors[1:]:
+        total += row
+    averages = iter((total / len(stats)).tolist())
+    return {field: tuple(next(averages) for _ in range(length)) if length is not None else next(averages) for field, length in fields}
+
+
+def average_variants(craft_stats: Mapping[str, dict], groups: Mapping[str, Sequence[str]]) -> Dict[str, dict]:
+    """ Replace the variants of each craft with their average.
+
+    Args:
+        craft_stats (Mapping[str, dict]): The stats of each craft.
+        groups (Mapping[str, Sequence[str]]): The variant groups, as from average_groups.
+
+    Returns:
+        Dict[str, dict]: The stats of each craft that isn't a variant, averaged over its variants where it has any.
+    """
+    variants = set(variant for base, group in groups.items() for variant in group if variant != base)
+    averages = {base: average_stats([craft_stats[craft] for craft in group]) for base, group in groups.items() if base not in variants}
+    return {craft: averages.get(craft, stats) for craft, stats in craft_stats.items() if craft not in variants}
@@ -0,0 +1,118 @@
+""" Heat outcomes and who-beat-who counts of N-choose-K style tournaments (parse_n-choose-k_results.py).
+
+The outcome of a heat is its surviving teams (from RESULT, none for a Mutual Annihilation) and its dead teams (from DEADTEAMS). The winning team of each
+heat that was won beats each of the dead teams of the heat.
+The counts are kept sparse, as the wins of each team over the teams it has beaten, as most pairs of teams in a large season never meet. They can be
+written as the dense who-beat-who table, one row at a time, or as (winner, loser, wins) coordinate triples, which stay small for any number of teams.
+
+Note: this module only uses the standard library (results stores need numpy, but they're only read if there is one).
+"""
+
+# Standard library imports
+from collections import Counter
+from typing import Dict, IO, Iterable, Iterator, List, NamedTuple, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .store import ResultsStore
+
+
+class HeatOutcome(NamedTuple):
+    key: str  # '<tournament>/<round>/<heat>', to recognise heats that have already been counted.
+    result: str
+    survivors: List[str]  # The surviving teams.
+    dead: List[str]  # The dead teams.
+
+
+def heat_outcomes(tournament_data: Dict[str, Dict[str, dict]], source: str = "", craft: bool = False) -> Iterator[HeatOutcome]:
+    """ The outcomes of the heats in the heat records of each round (as in results.json).
+
+    Args:
+        tournament_data (Dict[str, Dict[str, dict]]): The heat records for each round.
+        source (str, optional): The tournament (e.g., its path), to distinguish its heats from those of other tournaments (folder names repeat between seasons). Defaults to "".
+        craft (bool, optional): List the craft in the teams instead of the teams (e.g., for FFA heats, where the team names are just 'A', 'B', etc.).
+            Defaults to False.
+    """
+    for round_name, heats in tournament_data.items():
+        for heat_name, heat in heats.items():
+            result = heat['result']
+            survivors, dead = result.get('teams', {}), result.get('dead teams', {})
+            if craft:
+                yield HeatOutcome(f"{source}/{round_name}/{heat_name}", result['result'], [member for members in survivors.values() for member in members.split(", ")], [member for members in dead.values() for member in members.split(", ")])
+            else:
+                yield HeatOutcome(f"{source}/{round_name}/{heat_name}", result['result'], list(survivors), list(dead))
+
+
+def store_heat_outcomes(store: 'ResultsStore', source: str = "", craft: bool = False) -> Iterator[HeatOutcome]:
+    """ The outcomes of the heats in a results store (reading only its heat and team columns), as for heat_outcomes. """
+    teams: Dict[int, Tuple[List[str], List[str]]] = {}  # Heat: (survivors, dead)
+    team_names = store['team_names'].tolist()
+    for heat, team, members, dead in zip(store['team_heat'].tolist(), store['team_name'].tolist(), store['team_members'].tolist(), store['team_dead'].tolist()):
+        teams.setdefault(heat, ([], []))[dead].extend(members.split(", ") if craft else (team_names[team],))
+    result_types = store.result_types
+    for heat, (round_number, heat_name, result) in enumerate(zip(store['heat_round'].tolist(), store.heat_names, store['heat_result'].tolist())):
+        survivors, dead = teams.get(heat, ([], []))
+        yield HeatOutcome(f"{source}/{store.rounds[round_number]}/{heat_name}", result_types[result], survivors, dead)
+
+
+class WinCounts:
+    """ Sparse who-beat-who counts: the wins of each team over each team that it has beaten. """
+
+    def __init__(self):
+        self.wins: Dict[str, Counter] = {}  # Winner: {loser: wins}
+        self.heats = set()  # The keys of the heats that have been counted.
+
+    def add(self, outcome: HeatOutcome):
+        """ Count the wins of a heat (if it was won and hasn't already been counted). """
+        if outcome.key in self.heats:
+            return
+        self.heats.add(outcome.key)
+        if outcome.result != 'Win' or len(outcome.dead) == 0:
+            return
+        for winner in outcome.survivors:
+            self.wins.setdefault(winner, Counter()).update(outcome.dead)
+
+    def add_all(self, outcomes: Iterable[HeatOutcome]) -> 'WinCounts':
+        """ Count the wins of the heats. """
+        for outcome in outcomes:
+            self.add(outcome)
+        return self
+
+    def names(self) -> List[str]:
+        """ All the teams that have won or lost, sorted. """
+        return sorted(set(self.wins).union(*self.wins.values()))
+
+    def losses(self) -> Counter:
+        """ The total losses of each team. """
+        losses = Counter()
+        for beaten in self.wins.values():
+            losses.update(beaten)
+        return losses
+
+    def triples(self) -> Iterator[Tuple[str, str, int]]:
+        """ The non-zero counts as (winner, loser, wins), in order of the winner then the loser. """
+        for winner in sorted(self.wins):
+            for loser, count in sorted(self.wins[winner].items()):
+                yield winner, loser, count
+
+    def write_table(self, f: IO, separator: str = ","):
+        """ Write the who-beat-who table: the wins of each team (rows) over each other team (columns), with the sums of the wins and losses.
+
+        The rows are written as they're built, so only one row of the table is held in memory.
+        """
+        names = self.names()
+        index = {name: i for i, name in enumerate(names)}
+        f.write("vs" + separator + separator.join(names) + separator * 2 + "sum(wins)\n")
+        for name in names:
+            row = ["0"] * len(names)
+            beaten = self.wins.get(name, {})
+            for loser, count in beaten.items():
+                row[index[loser]] = str(count)
+            f.write(name + separator + separator.join(row) + separator * 2 + str(sum(beaten.values())) + "\n")
+        f.write(separator * (len(names) + 2))
+        losses = self.losses()
+        f.write("\nsum(losses)" + separator + separator.join(str(losses[name]) for name in names) + separator * 2 + "\n")
+
+    def write_triples(self, f: IO, separator: str = ","):
+        """ Write the non-zero counts as (winner, loser, wins) coordinate triples, with a header line. """
+        f.write("winner" + separator + "loser" + separator + "wins\n")
+        f.writelines(f"{winner}{separator}{loser}{separator}{count}\n" for winner, loser, count in self.triples())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+# Local imports
+from bda_logs.synthetic import craft_names, write_cts_log, write_tournament
+
+VERSION = "1.0.0"
+
+SCALES = {  # Name: (craft, rounds, vessels per heat)
+    'small': (16, 5, 8),
+    'medium': (64, 20, 8),
+    'large': (128, 50, 8),
+}
+
+parser = argparse.ArgumentParser(description="End-to-end benchmark of the log parsing scripts on synthetic logs (see generate_synthetic_logs.py).", formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                 epilog="Each script is run in a fresh process, timing it from start to exit and recording its peak memory use (where the OS reports it). Run the benchmark with the same arguments against different versions of the scripts (--scripts) and compare the JSON results with --compare.")
+parser.add_argument('-s', '--scales', type=str, default="small,medium", help=f"Comma separated scales to run: {', '.join(f'{name} ({craft} craft, {rounds} rounds, {vessels} per heat)' for name, (craft, rounds, vessels) in SCALES.items())}, or 'craft:rounds:vessels-per-heat'.")
+parser.add_argument('-r', '--repeats', type=int, default=3, help="The number of runs of each script at each scale.")
+parser.add_argument('-n', '--noise', type=float, default=1, help="The number of KSP noise lines per competition line in the logs.")
+parser.add_argument('-a', '--awkward-names', action='store_true', help="Include craft names that have caused parsing problems.")
+parser.add_argument('--seed', type=int, default=0, help="The random seed for the logs.")
+parser.add_argument('--scripts', type=Path, default=Path(__file__).parent, help="The folder of the scripts to benchmark.")
+parser.add_argument('--work-dir', type=Path, help="Generate the logs in this folder and keep them (default is a temporary folder that is removed afterwards).")
+parser.add_argument('-o', '--output', type=Path, default=Path("benchmark.json"), help="The file to write the results to.")
+parser.add_argument('--compare', type=Path, help="Results of a previous benchmark (with the same scales) to compare against.")
+parser.add_argument("--version", action='store_true', help="Show the script version, then exit.")
+args = parser.parse_args()
+
+if args.version:
+    print(f"Version: {VERSION}")
+    sys.exit()
+
+scales = {}
+for scale in args.scales.split(','):
+    scale = scale.strip()
+    if scale in SCALES:
+        scales[scale] = SCALES[scale]
+    else:
+        try:
+            craft, rounds, vessels = (int(value) for value in scale.split(':'))
+        except ValueError:
+            raise ValueError(f"Invalid scale '{scale}': expected one of {', '.join(SCALES)} or 'craft:rounds:vessels-per-heat'")
+        scales[scale] = (craft, rounds, vessels)
+
+comparison = None
+if args.compare is not None:
+    with open(args.compare, 'r') as f:
+        comparison = json.load(f)
+
+
+def scriptVersion(script: str) -> Optional[str]:
+    """ The version reported by a script's --version flag (None if it fails, e.g., because of a missing dependency). """
+    try:
+        output = subprocess.run([sys.executable, str(args.scripts / script), '--version'], capture_output=True, text=True, timeout=60).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return output.split("Version:", 1)[1].strip() if "Version:" in output else None
+
+
+def runScript(command: List[str], cwd: Path) -> dict:
+    """ Run a script in a new process.
+
+    Returns:
+        dict: The wall time (s), CPU time (s), peak memory (MB) and return code of the run (and the end of stderr if it failed). The CPU time and peak memory are None if the OS doesn't report them.
+    """
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable] + command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=stderr)
+        if hasattr(os, 'wait4'):  # Unix: the resource usage of just this process.
+            _, status, usage = os.wait4(process.pid, 0)
+            wallTime = time.perf_counter() - start
+            process.returncode = os.waitstatus_to_exitcode(status)
+            cpuTime = usage.ru_utime + usage.ru_stime
+            peakMemory = usage.ru_maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)  # Bytes on macOS, kB elsewhere.
+        else:
+            process.wait()
+            wallTime = time.perf_counter() - start
+            cpuTime, peakMemory = None, None
+        run = {'wall time': wallTime, 'cpu time': cpuTime, 'peak memory': peakMemory, 'return code': process.returncode}
+        if process.returncode != 0:
+            stderr.seek(0)
+            run['error'] = stderr.read().decode(errors='replace').strip().splitlines()[-1:]
+    return run
+
+
+def summariseRuns(runs: List[dict]) -> dict:
+    """ The best and median times, the peak memory and the individual runs. """
+    summary = {'runs': runs}
+    completed = [run for run in runs if run['return code'] == 0]
+    if len(completed) == 0:
+        summary['error'] = runs[-1].get('error') if len(runs) > 0 else None
+        return summary
+    summary['best'] = min(run['wall time'] for run in completed)
+    summary['median'] = statistics.median(run['wall time'] for run in completed)
+    if all(run['cpu time'] is not None for run in completed):
+        summary['cpu median'] = statistics.median(run['cpu time'] for run in completed)
+        summary['peak memory'] = max(run['peak memory'] for run in completed)
+    return summary
+
+
+def folderSize(folder: Path, pattern: str) -> float:
+    """ The total size (MB) of the files matching the pattern in the folder. """
+    return sum(path.stat().st_size for path in folder.glob(pattern)) / (1 << 20)
+
+
+tournamentScript = "parse_tournament_log_files.py"
+csScript = "parse_CS_log_files.py"
+pvpScript = "parse_pvp_scores.py"
+nChooseKScript = "parse_n-choose-k_results.py"
+results = {
+    'benchmark version': VERSION,
+    'date': datetime.now().isoformat(timespec='seconds'),
+    'python': sys.version.split()[0],
+    'platform': platform.platform(),
+    'cpus': os.cpu_count(),
+    'repeats': args.repeats,
+    'noise': args.noise,
+    'awkward names': args.awkward_names,
+    'seed': args.seed,
+    'script versions': {script: scriptVersion(script) for script in (tournamentScript, csScript, pvpScript, nChooseKScript)},
+    'scales': {},
+}
+
+workDir = Path(tempfile.mkdtemp(prefix="bda_benchmark_")) if args.work_dir is None else args.work_dir
+try:
+    for scale, (craftCount, rounds, vesselsPerHeat) in scales.items():
+        scaleDir = workDir / scale.replace(':', '-')
+        if scaleDir.exists():
+            shutil.rmtree(scaleDir)
+        craft = craft_names(craftCount, args.awkward_names)
+        tournamentDir = write_tournament(scaleDir, 1, craft, rounds, vesselsPerHeat, noise=args.noise, seed=args.seed)
+        ctsLog = write_cts_log(scaleDir, craft, deaths=rounds, noise=args.noise, seed=args.seed)
+        benchmarks = {  # Label: (command, files to remove before each run)
+            tournamentScript: ([str(args.scripts / tournamentScript), str(tournamentDir), '-q'], ['heat_cache.json']),
+            f"{tournamentScript} (cached)": ([str(args.scripts / tournamentScript), str(tournamentDir), '-q'], []),
+            csScript: ([str(args.scripts / csScript), str(ctsLog), '-n'], []),
+            pvpScript: ([str(args.scripts / pvpScript), str(tournamentDir), '--csv'], []),
+            nChooseKScript: ([str(args.scripts / nChooseKScript), str(tournamentDir / 'results.json'), '-o', str(scaleDir / 'n-choose-k.csv')], []),
+        }
+        scaleResults = {
+            'craft': craftCount,
+            'rounds': rounds,
+            'vessels per heat': vesselsPerHeat,
+            'heat logs': sum(1 for _ in tournamentDir.glob("Round */*.log")),
+            'heat log size': folderSize(tournamentDir, "Round */*.log"),
+            'cts log size': ctsLog.stat().st_size / (1 << 20),
+            'scripts': {},
+        }
+        print(f"Scale {scale}: {craftCount} craft, {rounds} rounds, {scaleResults['heat logs']} heat logs ({scaleResults['heat log size']:.1f}MB), CTS log {scaleResults['cts log size']:.1f}MB", flush=True)
+        for label, (command, stale) in benchmarks.items():
+            runs = []
+            for _ in range(args.repeats):
+                for name in stale:
+                    (tournamentDir / name).unlink(missing_ok=True)
+                runs.append(runScript(command, scaleDir))
+                if runs[-1]['return code'] != 0:
+                    break  # Failures (e.g., missing dependencies) won't go away by trying again.
+            scaleResults['scripts'][label] = summariseRuns(runs)
+        results['scales'][scale] = scaleResults
+
+        # Write results to console
+        previous = comparison['scales'].get(scale, {}).get('scripts', {}) if comparison is not None else {}
+        labelWidth = max(len(label) for label in benchmarks) + 2
+        print(f"{'Script':{labelWidth}s}{'Best':>9s}{'Median':>9s}{'CPU':>9s}{'Peak MB':>9s}" + (f"{'vs old':>9s}" if comparison is not None else ""))
+        for label, summary in scaleResults['scripts'].items():
+            if 'median' not in summary:
+                print(f"{label:{labelWidth}s}  failed: {' '.join(summary['error'] or [])}")
+                continue
+            strings = [f"{label:{labelWidth}s}{summary['best']:9.3f}{summary['median']:9.3f}"]
+            strings.append(f"{summary['cpu median']:9.3f}{summary['peak memory']:9.1f}" if 'cpu median' in summary else f"{'-':>9s}{'-':>9s}")
+            if comparison is not None:
+                strings.append(f"{summary['median'] / previous[label]['median']:8.2f}x" if 'median' in previous.get(label, {}) else f"{'-':>9s}")
+            print(''.join(strings))
+        print("", flush=True)
+finally:
+    if args.work_dir is None:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+with open(args.output, 'w') as f:
+    json.dump(results, f, indent=2)
+print(f"Results written to {args.output}")
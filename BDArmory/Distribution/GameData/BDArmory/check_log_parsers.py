@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+# Local imports
+from bda_logs.cts import CtsTail, parse_cts_log
+from bda_logs.state import TournamentState
+from bda_logs.synthetic import craft_names, tournament_state, write_cts_log, write_tournament
+
+VERSION = "1.0.0"
+
+CRAFT, ROUNDS, VESSELS_PER_HEAT, PLAYED = 12, 3, 6, 2  # The tournament (and tournament state) to check the parsers on.
+CTS_DEATHS = 5
+
+parser = argparse.ArgumentParser(description="Regression checks of the log parsing scripts on seeded synthetic logs (see generate_synthetic_logs.py).", formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                 epilog="The outputs of the scripts are compared against the golden files in the regression folder, and the cached, parallel and tail modes against the plain ones. "
+                                 "After a change that is meant to change the outputs, check the differences and then re-run with --update to replace the golden files.")
+parser.add_argument('--golden', type=Path, default=Path(__file__).parent / "regression", help="The folder of the golden files.")
+parser.add_argument('--update', action='store_true', help="Write the outputs to the golden files instead of comparing them (the other checks are still made).")
+parser.add_argument('--scripts', type=Path, default=Path(__file__).parent, help="The folder of the scripts to check.")
+parser.add_argument('--work-dir', type=Path, help="Generate the logs in this folder and keep them (default is a temporary folder that is removed afterwards).")
+parser.add_argument("--version", action='store_true', help="Show the script version, then exit.")
+args = parser.parse_args()
+
+if args.version:
+    print(f"Version: {VERSION}")
+    sys.exit()
+
+failures: List[str] = []
+
+
+def check(name: str, passed: bool, details: str = ""):
+    print(f"{'ok  ' if passed else 'FAIL'} {name}" + (f": {details}" if details and not passed else ""), flush=True)
+    if not passed:
+        failures.append(name)
+
+
+def runScript(script: str, *arguments: str, cwd: Path, seed: str = "0") -> bool:
+    """ Run a script in a new process (with the hash seed fixed, unless seed is 'random'). Returns whether it succeeded. """
+    process = subprocess.run([sys.executable, str(args.scripts / script), *arguments], cwd=cwd, capture_output=True, text=True, env=os.environ | {'PYTHONHASHSEED': seed})
+    check(f"{script} {' '.join(arguments)}", process.returncode == 0, (process.stderr.strip().splitlines() or [''])[-1])
+    return process.returncode == 0
+
+
+def readOutputs(folder: Path, names: List[str]) -> Dict[str, bytes]:
+    return {name: (folder / name).read_bytes() if (folder / name).exists() else b'' for name in names}
+
+
+def checkGolden(outputs: Dict[str, bytes], prefix: str = ""):
+    """ Compare the outputs against the golden files (or replace the golden files with --update). """
+    for name, contents in outputs.items():
+        golden = args.golden / (prefix + name)
+        if args.update:
+            args.golden.mkdir(parents=True, exist_ok=True)
+            golden.write_bytes(contents)
+        else:
+            check(f"{prefix + name} matches the golden file", golden.exists() and golden.read_bytes() == contents, "missing golden file" if not golden.exists() else "differs")
+
+
+def checkSame(name: str, outputs: Dict[str, bytes], expected: Dict[str, bytes]):
+    different = [output for output in expected if outputs.get(output) != expected[output]]
+    check(name, len(different) == 0, f"{', '.join(different)} differ")
+
+
+def closeVectors(a: dict, b: dict) -> bool:
+    """ Whether two sets of stat vectors are the same (up to rounding in the order of adding up the floats). """
+    return a.keys() == b.keys() and all(len(a[craft]) == len(b[craft]) and all(x == y or (isinstance(x, float) and math.isclose(x, y, rel_tol=1e-9, abs_tol=1e-9)) for x, y in zip(a[craft], b[craft])) for craft in a)
+
+
+workDir = Path(tempfile.mkdtemp(prefix="bda_check_")) if args.work_dir is None else args.work_dir
+try:
+    if workDir.exists():
+        shutil.rmtree(workDir)
+    workDir.mkdir(parents=True)
+    craft = craft_names(CRAFT, awkward=True)
+
+    # Tournament parser: golden outputs, then the cached and parallel runs give the same outputs.
+    tournamentDir = write_tournament(workDir, 1, craft, ROUNDS, VESSELS_PER_HEAT, noise=0.5, seed=0)
+    tournamentOutputs = ["results.json", "summary.json", "summary.csv"]
+    if runScript("parse_tournament_log_files.py", str(tournamentDir), "-q", cwd=workDir):
+        expected = readOutputs(tournamentDir, tournamentOutputs)
+        checkGolden(expected)
+        check("heat_cache.json written", (tournamentDir / "heat_cache.json").exists())
+        if runScript("parse_tournament_log_files.py", str(tournamentDir), "-q", cwd=workDir):
+            checkSame("cached re-run gives the same outputs", readOutputs(tournamentDir, tournamentOutputs), expected)
+        (tournamentDir / "heat_cache.json").unlink(missing_ok=True)
+        if runScript("parse_tournament_log_files.py", str(tournamentDir), "-q", "-j", "4", cwd=workDir):
+            checkSame("-j 4 gives the same outputs", readOutputs(tournamentDir, tournamentOutputs), expected)
+
+        # PvP scores (with different hash seeds, as set ordering has leaked into the outputs before) and the who-beat-who table.
+        pvpOutputs = ["pvp_scores.json", "pvp_scores.csv"]
+        if runScript("parse_pvp_scores.py", str(tournamentDir), "--csv", cwd=workDir):
+            expected = readOutputs(tournamentDir, pvpOutputs)
+            checkGolden(expected)
+            if runScript("parse_pvp_scores.py", str(tournamentDir), "--csv", cwd=workDir, seed="random"):
+                checkSame("PvP scores don't depend on the hash seed", readOutputs(tournamentDir, pvpOutputs), expected)
+        if runScript("parse_n-choose-k_results.py", str(tournamentDir), "-o", str(workDir / "n-choose-k.csv"), cwd=workDir):
+            checkGolden(readOutputs(workDir, ["n-choose-k.csv"]))
+
+    # CTS parser: golden outputs and the cached re-run.
+    ctsDir = workDir / "cts"
+    ctsLog = write_cts_log(ctsDir, craft, deaths=CTS_DEATHS, noise=0.5, seed=0)
+    if runScript("parse_CS_log_files.py", str(ctsLog), cwd=ctsDir):
+        expected = readOutputs(ctsDir, ["results.csv"])
+        checkGolden(expected, "cts_")
+        if runScript("parse_CS_log_files.py", str(ctsLog), cwd=ctsDir):
+            checkSame("cached CTS re-run gives the same outputs", readOutputs(ctsDir, ["results.csv"]), expected)
+
+    # CTS tail mode: the stats after each partial append (cut anywhere, including part way through a line) and after the log is rewritten in place
+    # or replaced are those of parsing the finished lines of the log.
+    rng = random.Random(0)
+    tailDir = workDir / "tail"
+    tailDir.mkdir()
+    tailLog, finishedLog = tailDir / "cts.log", tailDir / "finished.log"
+    tail = CtsTail(tailLog)
+
+    def checkTail(name: str, contents: bytes):
+        tail.poll()
+        finishedLog.write_bytes(contents[:contents.rfind(b'\n') + 1])
+        check(name, closeVectors(tail.vectors(), parse_cts_log(finishedLog)))
+
+    contents = ctsLog.read_bytes()
+    cuts = sorted(rng.sample(range(1, len(contents)), 8)) + [len(contents)]
+    tailLog.write_bytes(b'')
+    with open(tailLog, 'ab') as f:
+        start = 0
+        for cut in cuts:
+            f.write(contents[start:cut])
+            f.flush()
+            start = cut
+            checkTail(f"CTS tail after appending up to byte {cut}", contents[:cut])
+    rewritten = write_cts_log(tailDir / "rewritten", craft, deaths=CTS_DEATHS, seed=1).read_bytes()
+    with open(tailLog, 'r+b') as f:  # In place (same file, shorter).
+        f.write(rewritten[:len(rewritten) // 2])
+        f.truncate()
+    checkTail("CTS tail after the log is rewritten in place", rewritten[:len(rewritten) // 2])
+    replacement = tailDir / "replacement.log"
+    replacement.write_bytes(contents)
+    os.replace(replacement, tailLog)
+    checkTail("CTS tail after the log is replaced", contents)
+    check("CTS tail restarted for each rewrite", tail.dumps == 3, f"{tail.dumps} dumps")
+
+    # Tournament state: decoding and re-encoding round-trips, and the lazy sections match the full decode.
+    stateDir = workDir / "state"
+    stateDir.mkdir()
+    state = tournament_state(craft, ROUNDS, VESSELS_PER_HEAT, PLAYED, seed=0)
+    decoded = json.dumps(state, indent=2)
+    (stateDir / "tournament.json").write_text(decoded)
+    stateFile = stateDir / "tournament.state"
+    if runScript("parse_tournament_state.py", str(stateFile), "-r", cwd=stateDir):
+        encoded = stateFile.read_bytes()
+        if runScript("parse_tournament_state.py", str(stateFile), cwd=stateDir):
+            check("tournament.state decodes to the JSON it was encoded from", (stateDir / "tournament.json").read_text() == decoded)
+        if runScript("parse_tournament_state.py", str(stateFile), "-r", cwd=stateDir):
+            check("tournament.state re-encodes to the same file", stateFile.read_bytes() == encoded)
+        lazy = TournamentState.load(stateFile)
+        player = craft[0]
+        check("lazy player scores", lazy.player_scores(player) == state["scores"]["scores"][player])
+        check("lazy heats of a round", lazy.heats(1) == {name: heat for name, heat in state["heats"].items() if heat["round"] == 1})
+        check("lazy full decode", lazy.decoded() == state)
+finally:
+    if args.work_dir is None:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+if args.update:
+    print(f"Golden files written to {args.golden}")
+print(f"{len(failures)} check{'s' if len(failures) != 1 else ''} failed." if len(failures) > 0 else "All checks passed.")
+sys.exit(1 if len(failures) > 0 else 0)
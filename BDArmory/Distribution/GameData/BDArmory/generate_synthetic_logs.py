@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import argparse
+import sys
+from pathlib import Path
+
+# Local imports
+from bda_logs.synthetic import craft_names, write_cts_log, write_tournament
+
+VERSION = "1.0.0"
+
+parser = argparse.ArgumentParser(description="Synthetic tournament and continuous spawning log generator, for testing and benchmarking the log parsers.", formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                 epilog="The same arguments always generate the same logs.")
+parser.add_argument('folder', type=Path, help="The folder to write the logs in (like the Logs folder: 'Tournament N/Round M/<heat>.log' and 'cts-<ID>.log').")
+parser.add_argument('-c', '--craft', type=int, default=32, help="The number of craft.")
+parser.add_argument('-t', '--tournaments', type=int, default=1, help="The number of tournaments.")
+parser.add_argument('-r', '--rounds', type=int, default=10, help="The number of rounds per tournament.")
+parser.add_argument('-v', '--vessels-per-heat', type=int, default=8, help="The number of craft in each heat.")
+parser.add_argument('--heats', type=int, help="The number of heats per round, each with a random selection of the craft. Default is enough heats for each craft to fly once per round.")
+parser.add_argument('--team-size', type=int, default=0, help="Split the craft into teams of this size that fly together (0 for free-for-all).")
+parser.add_argument('--waypoints', action='store_true', help="Include waypoint results.")
+parser.add_argument('--cts', type=int, default=0, help="The number of continuous spawning logs.")
+parser.add_argument('--cts-deaths', type=float, default=10, help="The mean number of deaths per craft in the continuous spawning logs.")
+parser.add_argument('-n', '--noise', type=float, default=0, help="The number of KSP noise lines per competition line.")
+parser.add_argument('-a', '--awkward-names', action='store_true', help="Include craft names that have caused parsing problems (duplicates, ':', '\"', unicode, etc.).")
+parser.add_argument('-s', '--seed', type=int, default=0, help="The random seed.")
+parser.add_argument("--version", action='store_true', help="Show the script version, then exit.")
+args = parser.parse_args()
+
+if args.version:
+    print(f"Version: {VERSION}")
+    sys.exit()
+
+craft = craft_names(args.craft, args.awkward_names)
+for tournament in range(args.tournaments):
+    tournamentDir = write_tournament(args.folder, tournament + 1, craft, args.rounds, args.vessels_per_heat, args.heats, args.team_size, args.waypoints, args.noise, seed=args.seed + tournament)
+    print(f"Wrote {sum(1 for _ in tournamentDir.glob('Round */*.log'))} heat logs to {tournamentDir}")
+for log in range(args.cts):
+    print(f"Wrote {write_cts_log(args.folder, craft, args.cts_deaths, args.noise, seed=args.seed + args.tournaments + log)}")
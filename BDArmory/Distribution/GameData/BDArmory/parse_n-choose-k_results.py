@@ -4,16 +4,23 @@
 import argparse
 import json
 import sys
-from collections import Counter
 from pathlib import Path
-from typing import Union
+from typing import List, Union
 
-VERSION = "1.2"
+# Local imports
+from bda_logs.wins import WinCounts, heat_outcomes, store_heat_outcomes
+try:
+    from bda_logs.store import STORE_FILENAME, ResultsStore
+except ImportError:  # Results stores need numpy, without it just read results.json.
+    STORE_FILENAME = None
+
+VERSION = "2.1"
 
 parser = argparse.ArgumentParser(description="Parse results.json of a N-choose-K style tournament producing a table of who-beat-who.", formatter_class=argparse.ArgumentDefaultsHelpFormatter, epilog="Note: this also works on FFA style tournaments, but may not be meaningful.")
-parser.add_argument('results', type=str, nargs='?', help="results.json file to parse.")
+parser.add_argument('results', type=str, nargs='*', help="results.json files to parse, tournament folders, or season folders (all the Tournament* folders in them). The results of all of them are merged. Defaults to the latest tournament.")
 parser.add_argument('-o', '--output', default="n-choose-k.csv", help="File to output CSV to.")
 parser.add_argument('--tsv', action='store_true', help="Output to a TSV (tab-separated values) file instead of a CSV file.")
+parser.add_argument('--sparse', action='store_true', help="Output the non-zero counts as (winner, loser, wins) triples instead of the full table, for seasons with too many teams for the table.")
 parser.add_argument("--version", action='store_true', help="Show the script version, then exit.")
 args = parser.parse_args()
 
@@ -29,37 +36,46 @@ def naturalSortKey(key: Union[str, Path]):
     except:
         return key  # Otherwise, just use the key.
 
-if args.results is None:
+def resultsFiles(path: Path) -> List[Path]:
+    """ The results.json files of a results file, a tournament folder or a season folder. """
+    if not path.is_dir():
+        return [path]
+    if (path / "results.json").exists():
+        return [path / "results.json"]
+    return [tournamentDir / "results.json" for tournamentDir in sorted((dir for dir in path.glob("Tournament*") if dir.is_dir()), key=naturalSortKey) if (tournamentDir / "results.json").exists()]
+
+if len(args.results) == 0:
     logsDir = Path(__file__).parent / "Logs"
     if logsDir.exists():
         tournamentFolders = list(logsDir.resolve().glob("Tournament*"))
         if len(tournamentFolders) > 0:
             tournamentFolders = sorted(list(dir for dir in tournamentFolders if dir.is_dir()), key=naturalSortKey)
         if len(tournamentFolders) > 0:
-            args.results = tournamentFolders[-1] / "results.json"  # Results in latest tournament dir
+            args.results = [tournamentFolders[-1] / "results.json"]  # Results in latest tournament dir
 
-if args.results is not None:
-    results_file = Path(args.results)
+counts = WinCounts()
+parsed = 0
+for results_file in dict.fromkeys(results_file.resolve() for path in args.results for results_file in resultsFiles(Path(path))):  # Each file only once, even if the inputs overlap.
     if not results_file.exists():
         print(f"File not found: {results_file}")
+        continue
+    source = str(results_file.parent)  # The heats of each tournament are only counted once.
+    store_file = results_file.with_name(STORE_FILENAME) if STORE_FILENAME is not None else None
+    if store_file is not None and store_file.exists() and store_file.stat().st_mtime >= results_file.stat().st_mtime:  # Use the results store (parse_tournament_log_files.py --results-store) if it's up to date.
+        with ResultsStore(store_file) as store:
+            counts.add_all(store_heat_outcomes(store, source))
     else:
         with open(results_file, 'r') as f:
-            data = json.load(f)
-        counts = Counter([(next(iter(heat['result']['teams'].keys())), next(iter(heat['result']['dead teams'].keys()))) for Round in data.values() for heat in Round.values() if heat['result']['result'] == 'Win'])
-        A = set(k[0] for k in counts.keys())
-        B = set(k[1] for k in counts.keys())
-        names = sorted(A.union(B))
-        name_map = {n: c for c, n in enumerate(names)}
-        t = [[0] * len(names) for i in range(len(names))]
-        for k, c in counts.items():
-            t[name_map[k[0]]][name_map[k[1]]] = c
-        output_file = Path(args.output)
-        if args.tsv:
-            output_file = output_file.with_suffix(".tsv")
-        with open(output_file, 'w') as f:
-            separator = "," if not args.tsv else "\t"
-            f.write("vs" + separator + separator.join(names) + separator * 2 + "sum(wins)\n")
-            for i, name in enumerate(names):
-                f.write(name + separator + separator.join([str(c) for c in t[i]]) + separator * 2 + str(sum(t[i])) + "\n")
-            f.write(separator * (len(names) + 2))
-            f.write("\nsum(losses)" + separator + separator.join([str(sum(t[i][j] for i in range(len(names)))) for j in range(len(names))]) + separator * 2 + "\n")
+            counts.add_all(heat_outcomes(json.load(f), source))
+    parsed += 1
+
+if parsed > 0:
+    output_file = Path(args.output)
+    if args.tsv:
+        output_file = output_file.with_suffix(".tsv")
+    with open(output_file, 'w') as f:
+        separator = "," if not args.tsv else "\t"
+        if args.sparse:
+            counts.write_triples(f, separator)
+        else:
+            counts.write_table(f, separator)
@@ -3,15 +3,25 @@
 # Standard library imports
 import argparse
 import json
-import re
+import signal
 import sys
-from base64 import b64decode, b64encode
-from collections import Counter
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple, Union
+from typing import Dict, Iterator, List, Tuple
 
-VERSION = "1.23.4"
+# Local imports
+from bda_logs import profiling
+from bda_logs.cache import HeatCache
+from bda_logs.facts import TournamentFacts
+from bda_logs.files import write_atomically
+from bda_logs.pool import make_process_pool
+from bda_logs.scoring import DEFAULT_WEIGHTS, SCORE_FIELDS, WAYPOINT_WEIGHTS
+from bda_logs.store import STORE_FILENAME, write_results_store
+from bda_logs.sweep import WeightSweep, parse_weight_vectors, sweep_report, weight_grid
+from bda_logs.tournament import Tournament, collect_heats, find_heat_logs, load_heat_logs, natural_sort_key
+
+VERSION = "1.36.0"
 
 parser = argparse.ArgumentParser(description="Tournament log parser", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 parser.add_argument('tournament', type=str, nargs='*', help="Tournament folder to parse.")
@@ -19,7 +29,7 @@ parser.add_argument('-q', '--quiet', action='store_true', help="Don't print resu
 parser.add_argument('-n', '--no-files', action='store_true', help="Don't create summary files.")
 parser.add_argument('-s', '--score', action='store_false', help="Compute scores.")
 parser.add_argument('-so', '--scores-only', action='store_true', help="Only display the scores in the summary on the console.")
-parser.add_argument('-w', '--weights', type=str, default="1,0,0,-1,1,2e-3,3,1.5,4e-3,0,1e-4,4e-5,0.035,0,6e-4,0,1.5e-4,5e-5,0.15,0,0.002,0,3e-5,1.5e-5,0.075,0,0,0,0,0,0,10,-1,-1",
+parser.add_argument('-w', '--weights', type=str, default=DEFAULT_WEIGHTS,
                     help="Score weights (in order of main columns from 'Wins' to 'Ram', plus others). Use --show-weights to see them.")
 parser.add_argument('-c', '--current-dir', action='store_true', help="Parse the logs in the current directory as if it was a tournament without the folder structure.")
 parser.add_argument('-nc', '--no-cumulative', action='store_true', help="Don't display cumulative scores at the end.")
@@ -28,25 +38,29 @@ parser.add_argument('-N', type=int, help="Only the first N logs in the folder (i
 parser.add_argument('-z', '--zero-lowest-score', action='store_true', help="Shift the scores so that the lowest is 0.")
 parser.add_argument('-sw', '--show-weights', action='store_true', help="Display the score weights.")
 parser.add_argument('-wp', '--waypoint-scores', action='store_true', help="Use the default waypoint scores.")
-parser.add_argument('--average-duplicates', action='store_true', help="Average the values of duplicates in the summary.")
+sweep_group = parser.add_mutually_exclusive_group()
+sweep_group.add_argument('--sweep', type=str, help="Re-score the tournament for each of the weight vectors in this file (one per line, as for --weights) and report the rank stability and rank correlation against the --weights scores (written to sweep.json).")
+sweep_group.add_argument('--sweep-grid', type=str, help="As for --sweep, but for a grid of weight vectors around the --weights, e.g., 'wins=0:2:5,cleanKills=1:4:7' varies the wins weight over 5 values from 0 to 2 and the cleanKills weight over 7 values from 1 to 4.")
+duplicates_group = parser.add_mutually_exclusive_group()
+duplicates_group.add_argument('--average-duplicates', action='store_true', help="Average the values of duplicates (Craft, Craft_1, Craft_2, ...) in the summary.")
+duplicates_group.add_argument('--merge-duplicates', action='store_true', help="Merge duplicates (Craft, Craft_1, Craft_2, ...) into a single craft when parsing, so that the per-round values and scores are for the merged craft (their values are totals, not averages).")
+parser.add_argument('--no-cache', action='store_true', help="Don't use the per-heat parse cache (heat_cache.json in the tournament folder).")
+parser.add_argument('--results-store', action='store_true', help=f"Also write the results as typed arrays ({STORE_FILENAME}) for quick loading by other tools.")
+parser.add_argument('-j', '--jobs', type=int, default=1, help="Parse the heat logs in a pool of this many processes.")
+parser.add_argument('--follow', action='store_true', help="Keep watching the tournament folder and update the summary as heats finish (Ctrl-C to stop).")
+parser.add_argument('--follow-interval', type=float, default=2, help="Seconds between checks for new heat logs in --follow mode.")
+parser.add_argument('--profile', action='store_true', help="Show the wall time, CPU time, event counts and peak memory of each phase of parsing each tournament (on stderr). The heat parsing phases aren't broken down with --jobs, as they run in the workers.")
+parser.add_argument('--profile-trace', type=str, help="Also write the profile to this JSON file (implies --profile).")
 parser.add_argument("--version", action='store_true', help="Show the script version, then exit.")
 args = parser.parse_args()
 args.score = args.score or args.scores_only
+args.profile = args.profile or args.profile_trace is not None
 
 if args.version:
     print(f"Version: {VERSION}")
     sys.exit()
 
 
-def naturalSortKey(key: Union[str, Path]):
-    if isinstance(key, Path):
-        key = key.name
-    try:
-        return int(key.rsplit(' ')[1])  # If the key ends in an integer, split that off and use that as the sort key.
-    except:
-        return key  # Otherwise, just use the key.
-
-
 if args.current_dir and len(args.tournament) == 0:
     tournamentDirs = [Path('')]
 else:
@@ -56,7 +70,7 @@ else:
         if logsDir.exists():
             tournamentFolders = list(logsDir.resolve().glob("Tournament*"))
             if len(tournamentFolders) > 0:
-                tournamentFolders = sorted(list(dir for dir in tournamentFolders if dir.is_dir()), key=naturalSortKey)
+                tournamentFolders = sorted(list(dir for dir in tournamentFolders if dir.is_dir()), key=natural_sort_key)
             if len(tournamentFolders) > 0:
                 tournamentDirs = [tournamentFolders[-1]]  # Latest tournament dir
         if tournamentDirs is None:  # Didn't find a tournament dir, revert to current-dir
@@ -66,449 +80,159 @@ else:
         tournamentDirs = [Path(tournamentDir) for tournamentDir in args.tournament]  # Specified tournament dir
 
 if args.waypoint_scores:
-    args.weights = "0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1,-0.02,-0.003"
+    args.weights = WAYPOINT_WEIGHTS
 
-score_fields = ('wins', 'survivedCount', 'miaCount', 'deathCount', 'deathOrder', 'deathTime', 'cleanKills', 'assists', 'hits', 'hitsTaken', 'bulletDamage', 'bulletDamageTaken', 'rocketHits', 'rocketHitsTaken', 'rocketPartsHit', 'rocketPartsHitTaken', 'rocketDamage', 'rocketDamageTaken',
-                'missileHits', 'missileHitsTaken', 'missilePartsHit', 'missilePartsHitTaken', 'missileDamage', 'missileDamageTaken', 'ramScore', 'ramScoreTaken', 'battleDamage', 'partsLostToAsteroids', 'HPremaining', 'accuracy', 'rocket_accuracy', 'waypointCount', 'waypointTime', 'waypointDeviation')
 try:
     weights = list(float(w) for w in args.weights.split(','))
 except:
     weights = []
 
+sweepWeights = None
+if args.sweep is not None:
+    try:
+        with open(args.sweep, 'r') as f:
+            sweepWeights = parse_weight_vectors(f)
+    except (OSError, ValueError) as e:
+        print(f"Invalid --sweep file {args.sweep}: {e}")
+        sys.exit(1)
+elif args.sweep_grid is not None:
+    try:
+        sweepWeights = weight_grid(weights, args.sweep_grid)
+    except ValueError as e:
+        print(f"Invalid --sweep-grid '{args.sweep_grid}': {e}")
+        sys.exit(1)
+
 if args.show_weights:
-    field_width = max(len(f) for f in score_fields)
-    for w, f in zip(weights, score_fields):
+    field_width = max(len(f) for f in SCORE_FIELDS)
+    for w, f in zip(weights, SCORE_FIELDS):
         print(f"{f}:{' ' * (field_width - len(f))} {w}")
     sys.exit()
 
 
-def CalculateAccuracy(hits, shots): return 100 * hits / shots if shots > 0 else 0
-
-
-def CalculateAvgHP(hp, heats): return hp / heats if heats > 0 else 0
-
-
-def cumsum(l):
-    v = 0
-    for i in l:
-        v += i
-        yield v
+def heatLogSnapshot(tournamentDir: Path) -> Dict[Path, Tuple[int, int]]:
+    """ The size and modification time of the heat logs in the tournament folder. """
+    snapshot = {}
+    for heat in tournamentDir.glob("[0-9]*.log" if args.current_dir else "Round*/[0-9]*.log"):
+        try:
+            stat = heat.stat()
+        except OSError:  # Removed since the glob.
+            continue
+        snapshot[heat] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
 
 
-def encode_names(log_lines: List[str]) -> Tuple[Dict[str, str], List[str]]:
-    """ Encode the craft names in base64 to avoid issues with naming.
+def isFinishedHeatLog(heat: Path) -> bool:
+    """ Whether the heat log has been fully written: it starts with the 'Dumping Results' line and ends with a line break. """
+    try:
+        with open(heat, 'rb') as f:
+            header = f.readline()
+            f.seek(0, 2)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, 2)
+            return b'Dumping Results' in header and f.read(1) == b'\n'
+    except OSError:
+        return False
+
+
+def tournamentUpdates(tournamentDirs: List[Path]) -> Iterator[Path]:
+    """ Yield each of the tournament folders, then in --follow mode, yield them again whenever their heat logs change. """
+    yield from tournamentDirs
+    if not args.follow:
+        return
+    snapshots = {tournamentDir: heatLogSnapshot(tournamentDir) for tournamentDir in tournamentDirs}
+    while True:
+        time.sleep(args.follow_interval)
+        for tournamentDir in tournamentDirs:
+            snapshot = heatLogSnapshot(tournamentDir)
+            if snapshot != snapshots[tournamentDir]:
+                snapshots[tournamentDir] = snapshot
+                yield tournamentDir
+
+
+def loadHeatLogs(tournamentDir: Path) -> Tuple[List[Tuple[str, Path]], Iterator[Tuple[dict, List[Tuple[float, datetime]]]]]:
+    """ Find the heat logs of a tournament and start loading them (in the process pool with --jobs).
 
     Args:
-        log_lines (List[str]): The log lines.
+        tournamentDir (Path): The tournament folder.
 
     Returns:
-        Tuple[Dict[str, str], List[str]]: The dictionary of encoded names to actual names and the modified log lines.
+        Tuple[List[Tuple[str, Path]], Iterator[Tuple[dict, List[Tuple[float, datetime]]]]]: The (round name, log file) of each heat and an iterator over their heat records and durations.
     """
-    craft_names = set()
-    for line in log_lines:
-        if 'BDArmory.BDACompetitionMode' not in line:
-            continue
-        _, line = line.split(' ', 1)
-        field, entry = line.split(':', 1)
-        if field not in ('DEAD', 'MIA', 'ALIVE'):
-            continue
-        if field == 'DEAD':
-            order, time, craft = entry.split(':', 2)
-            craft_names.add(craft)
-        if field == 'MIA':
-            craft_names.add(entry)
-        if field == 'ALIVE':
-            craft_names.add(entry)
-    craft_names.update({json.dumps(name, ensure_ascii=False)[1:-1] for name in craft_names})  # Handle manually encoded DEADTEAMS.
-    craft_names = {cn: b64encode(cn.encode()) for cn in craft_names}
-    sorted_craft_names = list(sorted(craft_names, key=lambda k: len(k), reverse=True))  # Sort the craft names from longest to shortest to avoid accidentally replacing substrings.
-    for i in range(1, len(log_lines)):  # The first line doesn't contain craft names
-        for name in sorted_craft_names:
-            log_lines[i] = log_lines[i].replace(name, craft_names[name].decode())
-    encoded_craft_names = {v.decode(): k for k, v in craft_names.items()}
-    return encoded_craft_names, log_lines
-
-
-for tournamentNumber, tournamentDir in enumerate(tournamentDirs):
-    if tournamentNumber > 0 and not args.quiet:
+    if not args.no_cache and tournamentDir not in caches:
+        caches[tournamentDir] = HeatCache(tournamentDir)
+    cache = caches.get(tournamentDir)
+    isCurrent = (lambda heat: (cache is not None and cache.is_current(heat)) or isFinishedHeatLog(heat)) if args.follow else None  # Skip heat logs that are still being written, they'll be picked up on a later update.
+    heatLogs = find_heat_logs(tournamentDir, args.current_dir, args.N, isCurrent)
+    return heatLogs, load_heat_logs(heatLogs, cache, executor)
+
+
+profiler = profiling.enable() if args.profile else profiling.current()
+if args.follow:
+    signal.signal(signal.SIGINT, lambda *_: sys.exit())  # Files are written atomically, so stopping at any point is fine.
+caches: Dict[Path, HeatCache] = {}  # The caches and fact tables of each tournament are kept between updates in --follow mode so that only new heats are processed.
+heatFacts: Dict[Path, dict] = {}
+executor = make_process_pool(args.jobs)
+with profiler.phase("queue heat logs"):
+    pendingHeatLogs = {tournamentDir: loadHeatLogs(tournamentDir) for tournamentDir in tournamentDirs} if executor is not None else {}  # Queue all the tournaments' heats at once to keep the workers busy.
+for tournamentNumber, tournamentDir in enumerate(tournamentUpdates(tournamentDirs)):
+    profiler.start(str(tournamentDir))
+    profiler.section("find heat logs")
+    if args.follow and len(tournamentDirs) == 1 and sys.stdout.isatty() and not args.quiet:
+        print("\033[H\033[2J", end='')  # Clear the screen.
+    elif tournamentNumber > 0 and not args.quiet:
         print("")
-    tournamentData = {}
-    tournamentMetadata = {}
-    m = re.search('Tournament (\\d+)', str(tournamentDir))
-    if m is not None and len(m.groups()) > 0:
-        tournamentMetadata['ID'] = m.groups()[0]
-    tournamentMetadata['rounds'] = len([roundDir for roundDir in tournamentDir.iterdir() if roundDir.is_dir() and roundDir.name.startswith('Round')])
-    for round in sorted((roundDir for roundDir in tournamentDir.iterdir() if roundDir.is_dir()), key=naturalSortKey) if not args.current_dir else (tournamentDir,):
-        if not args.current_dir and len(round.name) == 0:
-            continue
-        tournamentData[round.name] = {}
-        logFiles = sorted(round.glob("[0-9]*.log"))
-        if len(logFiles) == 0:
-            del tournamentData[round.name]
-            continue
-        for heat in logFiles if args.N == None else logFiles[:args.N]:
-            with open(heat, "r", encoding="utf-8") as logFile:
-                log_lines = [line.strip() for line in logFile]
-            tournamentData[round.name][heat.name] = {'result': None, 'duration': 0, 'craft': {}}
-            encoded_craft_names, log_lines = encode_names(log_lines)
-            for line in log_lines:
-                if 'BDArmory.BDACompetitionMode' not in line:
-                    continue  # Ignore irrelevant lines
-                _, field = line.split(' ', 1)
-                if field.startswith('Dumping Results'):
-                    duration = float(field[field.find('(') + 4:field.find(')') - 1])
-                    timestamp = datetime.fromisoformat(field[field.find(' at ') + 4:])
-                    tournamentData[round.name][heat.name]['duration'] = duration
-                    tournamentMetadata['duration'] = (min(tournamentMetadata['duration'][0], timestamp), max(tournamentMetadata['duration'][1], timestamp + timedelta(seconds=duration))
-                                                      ) if 'duration' in tournamentMetadata else (timestamp, timestamp + timedelta(seconds=duration))
-                elif field.startswith('ALIVE:'):
-                    state, craft = field.split(':', 1)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]] = {'state': state}
-                elif field.startswith('DEAD:'):
-                    state, order, time, craft = field.split(':', 3)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]] = {'state': state, 'deathOrder': int(order), 'deathTime': float(time)}
-                elif field.startswith('MIA:'):
-                    state, craft = field.split(':', 1)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]] = {'state': state}
-                elif field.startswith('WHOSHOTWHOWITHGUNS:'):
-                    _, craft, shooters = field.split(':', 2)
-                    data = shooters.split(':')
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'hitsBy': {encoded_craft_names[player]: int(hits) for player, hits in zip(data[1::2], data[::2])}})
-                elif field.startswith('WHODAMAGEDWHOWITHGUNS:'):
-                    _, craft, shooters = field.split(':', 2)
-                    data = shooters.split(':')
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'bulletDamageBy': {encoded_craft_names[player]: float(damage) for player, damage in zip(data[1::2], data[::2])}})
-                elif field.startswith('WHOHITWHOWITHMISSILES:'):
-                    _, craft, shooters = field.split(':', 2)
-                    data = shooters.split(':')
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'missileHitsBy': {encoded_craft_names[player]: int(hits) for player, hits in zip(data[1::2], data[::2])}})
-                elif field.startswith('WHOPARTSHITWHOWITHMISSILES:'):
-                    _, craft, shooters = field.split(':', 2)
-                    data = shooters.split(':')
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'missilePartsHitBy': {encoded_craft_names[player]: int(hits) for player, hits in zip(data[1::2], data[::2])}})
-                elif field.startswith('WHODAMAGEDWHOWITHMISSILES:'):
-                    _, craft, shooters = field.split(':', 2)
-                    data = shooters.split(':')
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'missileDamageBy': {encoded_craft_names[player]: float(damage) for player, damage in zip(data[1::2], data[::2])}})
-                elif field.startswith('WHOHITWHOWITHROCKETS:'):
-                    _, craft, shooters = field.split(':', 2)
-                    data = shooters.split(':')
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'rocketHitsBy': {encoded_craft_names[player]: int(hits) for player, hits in zip(data[1::2], data[::2])}})
-                elif field.startswith('WHOPARTSHITWHOWITHROCKETS:'):
-                    _, craft, shooters = field.split(':', 2)
-                    data = shooters.split(':')
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'rocketPartsHitBy': {encoded_craft_names[player]: int(hits) for player, hits in zip(data[1::2], data[::2])}})
-                elif field.startswith('WHODAMAGEDWHOWITHROCKETS:'):
-                    _, craft, shooters = field.split(':', 2)
-                    data = shooters.split(':')
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'rocketDamageBy': {encoded_craft_names[player]: float(damage) for player, damage in zip(data[1::2], data[::2])}})
-                elif field.startswith('WHORAMMEDWHO:'):
-                    _, craft, rammers = field.split(':', 2)
-                    data = rammers.split(':')
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'rammedPartsLostBy': {encoded_craft_names[player]: int(partsLost) for player, partsLost in zip(data[1::2], data[::2])}})
-                elif field.startswith('WHODAMAGEDWHOWITHBATTLEDAMAGE'):
-                    _, craft, rammers = field.split(':', 2)
-                    data = rammers.split(':')
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'battleDamageBy': {encoded_craft_names[player]: float(damage) for player, damage in zip(data[1::2], data[::2])}})
-                elif field.startswith('CLEANKILLGUNS:'):
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanKillBy': encoded_craft_names[killer]})
-                elif field.startswith('CLEANKILLROCKETS:'):
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanRocketKillBy': encoded_craft_names[killer]})
-                elif field.startswith('CLEANKILLMISSILES:'):
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanMissileKillBy': encoded_craft_names[killer]})
-                elif field.startswith('CLEANKILLRAMMING:'):
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanRamKillBy': encoded_craft_names[killer]})
-                elif field.startswith('HEADSHOTGUNS:'):  # FIXME make head-shots separate from clean-kills
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanKillBy': encoded_craft_names[killer]})
-                elif field.startswith('HEADSHOTROCKETS:'):
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanRocketKillBy': encoded_craft_names[killer]})
-                elif field.startswith('HEADSHOTMISSILES:'):
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanMissileKillBy': encoded_craft_names[killer]})
-                elif field.startswith('HEADSHOTRAMMING:'):
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanRamKillBy': encoded_craft_names[killer]})
-                elif field.startswith('KILLSTEALGUNS:'):  # FIXME make kill-steals separate from clean-kills
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanKillBy': encoded_craft_names[killer]})
-                elif field.startswith('KILLSTEALROCKETS:'):
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanRocketKillBy': encoded_craft_names[killer]})
-                elif field.startswith('KILLSTEALMISSILES:'):
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanMissileKillBy': encoded_craft_names[killer]})
-                elif field.startswith('KILLSTEALRAMMING:'):
-                    _, craft, killer = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'cleanRamKillBy': encoded_craft_names[killer]})
-                elif field.startswith('GMKILL'):
-                    _, craft, reason = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'GMKillReason': reason})
-                elif field.startswith('PARTSLOSTTOASTEROIDS:'):
-                    _, craft, partsLost = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'partsLostToAsteroids': int(partsLost)})
-                elif field.startswith('HPLEFT:'):
-                    _, craft, hp = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'HPremaining': float(hp)})
-                elif field.startswith('ACCURACY:'):
-                    _, craft, accuracy, rocket_accuracy = field.split(':', 3)
-                    hits, shots = accuracy.split('/')
-                    rocket_strikes, rockets_fired = rocket_accuracy.split('/')
-                    accuracy = CalculateAccuracy(int(hits), int(shots))
-                    rocket_accuracy = CalculateAccuracy(int(rocket_strikes), int(rockets_fired))
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'accuracy': accuracy, 'hits': int(hits), 'shots': int(
-                        shots), 'rocket_accuracy': rocket_accuracy, 'rocket_strikes': int(rocket_strikes), 'rockets_fired': int(rockets_fired)})
-                elif field.startswith('RESULT:'):
-                    heat_result = field.split(':', 2)
-                    result_type = heat_result[1]
-                    if (len(heat_result) > 2):
-                        teams = json.loads(heat_result[2])
-                        if isinstance(teams, dict):  # Win, single team
-                            tournamentData[round.name][heat.name]['result'] = {'result': result_type, 'teams': {encoded_craft_names.get(teams['team'], teams['team']): ', '.join((encoded_craft_names[craft] for craft in teams['members']))}}
-                        elif isinstance(teams, list):  # Draw, multiple teams
-                            tournamentData[round.name][heat.name]['result'] = {'result': result_type, 'teams': {encoded_craft_names.get(team['team'], team['team']): ', '.join((encoded_craft_names[craft] for craft in team['members'])) for team in teams}}
-                    else:  # Mutual Annihilation
-                        tournamentData[round.name][heat.name]['result'] = {'result': result_type}
-                elif field.startswith('DEADTEAMS:'):
-                    dead_teams = json.loads(field.split(':', 1)[1])
-                    if len(dead_teams) > 0:
-                        tournamentData[round.name][heat.name]['result'].update({'dead teams': {encoded_craft_names.get(team['team'], team['team']): ', '.join((encoded_craft_names[craft] for craft in team['members'])) for team in dead_teams}})
-                # Ignore Tag mode for now.
-                elif field.startswith('WAYPOINTS:'):
-                    _, craft, waypoints_str = field.split(':', 2)
-                    tournamentData[round.name][heat.name]['craft'][encoded_craft_names[craft]].update({'waypoints': [waypoint.split(':') for waypoint in waypoints_str.split(';')]})  # List[Tuple[int, float, float]] = [(index, deviation, timestamp),]
+    heatLogs, loadedHeats = pendingHeatLogs.pop(tournamentDir) if tournamentDir in pendingHeatLogs else loadHeatLogs(tournamentDir)
+    cache = caches.get(tournamentDir)
+    profiler.section("parse heats")
+    cacheStats = (cache.hits, cache.misses) if cache is not None else None
+    tournamentData, tournamentMetadata = collect_heats(tournamentDir, heatLogs, loadedHeats)
+    profiler.count('heats', len(heatLogs))
+    if cacheStats is not None:
+        profiler.count('cached', cache.hits - cacheStats[0])
+        profiler.count('parsed', cache.misses - cacheStats[1])
+    if cache is not None and not args.no_files:
+        profiler.section("save cache")
+        cache.save()
 
     if not args.no_files and len(tournamentData) > 0:
-        with open(tournamentDir / 'results.json', 'w', encoding="utf-8") as outFile:
-            json.dump(tournamentData, outFile, indent=2, ensure_ascii=False)
-
-    craftNames = sorted(list(set(craft for round in tournamentData.values() for heat in round.values() for craft in heat['craft'].keys())))
-    teamWins = Counter([team for round in tournamentData.values() for heat in round.values() if heat['result']['result'] == "Win" for team in heat['result']['teams']])
-    teamDraws = Counter([team for round in tournamentData.values() for heat in round.values() if heat['result']['result'] == "Draw" for team in heat['result']['teams']])
-    teamDeaths = Counter([team for round in tournamentData.values() for heat in round.values() if 'dead teams' in heat['result'] for team in heat['result']['dead teams']])
-    teams = {team: members for round in tournamentData.values() for heat in round.values() if 'teams' in heat['result'] for team, members in heat['result']['teams'].items()}
-    teams.update({team: members for round in tournamentData.values() for heat in round.values() if 'dead teams' in heat['result'] for team, members in heat['result']['dead teams'].items()})
-    summary = {
-        'meta': {
-            'ID': tournamentMetadata.get('ID', 'unknown'),
-            'duration': [ts.isoformat() for ts in tournamentMetadata.get('duration', (datetime.now(), datetime.now()))],
-            'rounds': tournamentMetadata.get('rounds', -1),
-            'score weights': {f: w for f, w in zip(score_fields, weights)},
-        },
-        'craft': {
-            craft: {
-                'wins': len([1 for round in tournamentData.values() for heat in round.values() if heat['result']['result'] == "Win" and craft in next(iter(heat['result']['teams'].values())).split(", ")]),
-                'survivedCount': len([1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'ALIVE']),
-                'miaCount': len([1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'MIA']),
-                'deathCount': (
-                    len([1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD']),  # Total
-                    len([1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and 'cleanKillBy' in heat['craft'][craft]]),  # Bullets
-                    len([1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and 'cleanRocketKillBy' in heat['craft'][craft]]),  # Rockets
-                    len([1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and 'cleanMissileKillBy' in heat['craft'][craft]]),  # Missiles
-                    len([1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and 'cleanRamKillBy' in heat['craft'][craft]]),  # Rams
-                    len([1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and not any(field in heat['craft'][craft]
-                        # Dirty kill
-                        for field in ('cleanKillBy', 'cleanRocketKillBy', 'cleanMissileKillBy', 'cleanRamKillBy')) and any(field in heat['craft'][craft] for field in ('hitsBy', 'rocketPartsHitBy', 'missilePartsHitBy', 'rammedPartsLostBy'))]),
-                    len([1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and not any(field in heat['craft'][craft] for field in ('hitsBy', 'rocketPartsHitBy',
-                        'missilePartsHitBy', 'rammedPartsLostBy')) and not any('rammedPartsLostBy' in data and craft in data['rammedPartsLostBy'] for data in heat['craft'].values())]),  # Suicide (died without being hit or ramming anyone).
-                ),
-                'deathOrder': sum([heat['craft'][craft]['deathOrder'] / len(heat['craft']) if 'deathOrder' in heat['craft'][craft] else 1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft']]),
-                'deathTime': sum([heat['craft'][craft]['deathTime'] if 'deathTime' in heat['craft'][craft] else heat['duration'] for round in tournamentData.values() for heat in round.values() if craft in heat['craft']]),
-                'cleanKills': (
-                    len([1 for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() if any((field in data and data[field] == craft)
-                        for field in ('cleanKillBy', 'cleanRocketKillBy', 'cleanMissileKillBy', 'cleanRamKillBy'))]),  # Total
-                    len([1 for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() if 'cleanKillBy' in data and data['cleanKillBy'] == craft]),  # Bullets
-                    len([1 for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() if 'cleanRocketKillBy' in data and data['cleanRocketKillBy'] == craft]),  # Rockets
-                    len([1 for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() if 'cleanMissileKillBy' in data and data['cleanMissileKillBy'] == craft]),  # Missiles
-                    len([1 for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() if 'cleanRamKillBy' in data and data['cleanRamKillBy'] == craft]),  # Rams
-                ),
-                'assists': len([1 for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() if data['state'] == 'DEAD' and any(field in data and craft in data[field] for field in ('hitsBy', 'rocketPartsHitBy', 'missilePartsHitBy', 'rammedPartsLostBy')) and not any((field in data) for field in ('cleanKillBy', 'cleanRocketKillBy', 'cleanMissileKillBy', 'cleanRamKillBy'))]),
-                'hits': sum([heat['craft'][craft]['hits'] for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'hits' in heat['craft'][craft]]),
-                'hitsTaken': sum([sum(heat['craft'][craft]['hitsBy'].values()) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'hitsBy' in heat['craft'][craft]]),
-                'bulletDamage': sum([data[field][craft] for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() for field in ('bulletDamageBy',) if field in data and craft in data[field]]),
-                'bulletDamageTaken': sum([sum(heat['craft'][craft]['bulletDamageBy'].values()) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'bulletDamageBy' in heat['craft'][craft]]),
-                'rocketHits': sum([data[field][craft] for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() for field in ('rocketHitsBy',) if field in data and craft in data[field]]),
-                'rocketHitsTaken': sum([sum(heat['craft'][craft]['rocketHitsBy'].values()) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'rocketHitsBy' in heat['craft'][craft]]),
-                'rocketPartsHit': sum([data[field][craft] for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() for field in ('rocketPartsHitBy',) if field in data and craft in data[field]]),
-                'rocketPartsHitTaken': sum([sum(heat['craft'][craft]['rocketPartsHitBy'].values()) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'rocketPartsHitBy' in heat['craft'][craft]]),
-                'rocketDamage': sum([data[field][craft] for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() for field in ('rocketDamageBy',) if field in data and craft in data[field]]),
-                'rocketDamageTaken': sum([sum(heat['craft'][craft]['rocketDamageBy'].values()) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'rocketDamageBy' in heat['craft'][craft]]),
-                'missileHits': sum([data[field][craft] for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() for field in ('missileHitsBy',) if field in data and craft in data[field]]),
-                'missileHitsTaken': sum([sum(heat['craft'][craft]['missileHitsBy'].values()) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'missileHitsBy' in heat['craft'][craft]]),
-                'missilePartsHit': sum([data[field][craft] for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() for field in ('missilePartsHitBy',) if field in data and craft in data[field]]),
-                'missilePartsHitTaken': sum([sum(heat['craft'][craft]['missilePartsHitBy'].values()) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'missilePartsHitBy' in heat['craft'][craft]]),
-                'missileDamage': sum([data[field][craft] for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() for field in ('missileDamageBy',) if field in data and craft in data[field]]),
-                'missileDamageTaken': sum([sum(heat['craft'][craft]['missileDamageBy'].values()) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'missileDamageBy' in heat['craft'][craft]]),
-                'ramScore': sum([data[field][craft] for round in tournamentData.values() for heat in round.values() for data in heat['craft'].values() for field in ('rammedPartsLostBy',) if field in data and craft in data[field]]),
-                'ramScoreTaken': sum([sum(heat['craft'][craft]['rammedPartsLostBy'].values()) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'rammedPartsLostBy' in heat['craft'][craft]]),
-                'battleDamage': sum([data[field][craft] for round in tournamentData.values() for heat in round.values() for player, data in heat['craft'].items() if player != craft for field in ('battleDamageBy',) if field in data and craft in data[field]]),
-                'battleDamageTaken': sum([sum(heat['craft'][craft]['battleDamageBy'].values()) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'battleDamageBy' in heat['craft'][craft]]),
-                'partsLostToAsteroids': sum([heat['craft'][craft]['partsLostToAsteroids'] for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'partsLostToAsteroids' in heat['craft'][craft]]),
-                'HPremaining': CalculateAvgHP(sum([heat['craft'][craft]['HPremaining'] for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'HPremaining' in heat['craft'][craft] and heat['craft'][craft]['state'] == 'ALIVE']), len([1 for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'ALIVE'])),
-                'accuracy': CalculateAccuracy(sum([heat['craft'][craft]['hits'] for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'hits' in heat['craft'][craft]]), sum([heat['craft'][craft]['shots'] for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'shots' in heat['craft'][craft]])),
-                'rocket_accuracy': CalculateAccuracy(sum([heat['craft'][craft]['rocket_strikes'] for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'rocket_strikes' in heat['craft'][craft]]), sum([heat['craft'][craft]['rockets_fired'] for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'rockets_fired' in heat['craft'][craft]])),
-            }
-            for craft in craftNames
-        },
-        'team results': {
-            'wins': teamWins,
-            'draws': teamDraws,
-            'deaths': teamDeaths
-        },
-        'teams': teams
-    }
-    if args.average_duplicates:
-        to_remove = []
-        for craft in summary['craft']:
-            duplicates = [c for c in summary['craft'] if c.startswith(craft) and c[len(craft):].startswith('_') and c[len(craft) + 1:].isdigit()]
-            if len(duplicates) > 0:
-                duplicates.append(craft)
-                summary['craft'][craft] = {
-                    key:
-                    sum(summary['craft'][duplicate][key] for duplicate in duplicates) / len(duplicates) if not isinstance(summary['craft'][craft][key], tuple) else
-                    tuple(sum(summary['craft'][duplicate][key][i] for duplicate in duplicates) / len(duplicates) for i in range(len(summary['craft'][craft][key])))
-                    for key in summary['craft'][craft]
-                }
-            to_remove.extend([duplicate for duplicate in duplicates if duplicate != craft])
-        summary['craft'] = {craft: data for craft, data in summary['craft'].items() if craft not in to_remove}
-
-    for craft in summary['craft'].values():
-        spawns = craft['survivedCount'] + craft['deathCount'][0]
-        craft.update({
-            'damage/hit': craft['bulletDamage'] / craft['hits'] if craft['hits'] > 0 else 0,
-            'hits/spawn': craft['hits'] / spawns if spawns > 0 else 0,
-            'damage/spawn': craft['bulletDamage'] / spawns if spawns > 0 else 0,
-        })
-
-    per_round_summary = {  # Compute this here, since we need the per-round waypoint info to avoid negative scores.
-        craft: [
-            {
-                'wins': len([1 for heat in round.values() if heat['result']['result'] == "Win" and craft in next(iter(heat['result']['teams'].values())).split(", ")]),
-                'survivedCount': len([1 for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'ALIVE']),
-                'miaCount': len([1 for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'MIA']),
-                'deathCount': (
-                    len([1 for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD']),  # Total
-                    len([1 for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and 'cleanKillBy' in heat['craft'][craft]]),  # Bullets
-                    len([1 for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and 'cleanRocketKillBy' in heat['craft'][craft]]),  # Rockets
-                    len([1 for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and 'cleanMissileKillBy' in heat['craft'][craft]]),  # Missiles
-                    len([1 for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and 'cleanRamKillBy' in heat['craft'][craft]]),  # Rams
-                    len([1 for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and not any(field in heat['craft'][craft] for field in ('cleanKillBy', 'cleanRocketKillBy',
-                        'cleanMissileKillBy', 'cleanRamKillBy')) and any(field in heat['craft'][craft] for field in ('hitsBy', 'rocketPartsHitBy', 'missilePartsHitBy', 'rammedPartsLostBy'))]),  # Dirty kill
-                    len([1 for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'DEAD' and not any(field in heat['craft'][craft] for field in ('hitsBy', 'rocketPartsHitBy', 'missilePartsHitBy',
-                        'rammedPartsLostBy')) and not any('rammedPartsLostBy' in data and craft in data['rammedPartsLostBy'] for data in heat['craft'].values())]),  # Suicide (died without being hit or ramming anyone).
-                ),
-                'deathOrder': sum([heat['craft'][craft]['deathOrder'] / len(heat['craft']) if 'deathOrder' in heat['craft'][craft] else 1 for heat in round.values() if craft in heat['craft']]),
-                'deathTime': sum([heat['craft'][craft]['deathTime'] if 'deathTime' in heat['craft'][craft] else heat['duration'] for heat in round.values() if craft in heat['craft']]),
-                'cleanKills': (
-                    len([1 for heat in round.values() for data in heat['craft'].values() if any((field in data and data[field] == craft) for field in ('cleanKillBy', 'cleanRocketKillBy', 'cleanMissileKillBy', 'cleanRamKillBy'))]),  # Total
-                    len([1 for heat in round.values() for data in heat['craft'].values() if 'cleanKillBy' in data and data['cleanKillBy'] == craft]),  # Bullets
-                    len([1 for heat in round.values() for data in heat['craft'].values() if 'cleanRocketKillBy' in data and data['cleanRocketKillBy'] == craft]),  # Rockets
-                    len([1 for heat in round.values() for data in heat['craft'].values() if 'cleanMissileKillBy' in data and data['cleanMissileKillBy'] == craft]),  # Missiles
-                    len([1 for heat in round.values() for data in heat['craft'].values() if 'cleanRamKillBy' in data and data['cleanRamKillBy'] == craft]),  # Rams
-                ),
-                'assists': len([1 for heat in round.values() for data in heat['craft'].values() if data['state'] == 'DEAD' and any(field in data and craft in data[field] for field in ('hitsBy', 'rocketPartsHitBy', 'missilePartsHitBy', 'rammedPartsLostBy')) and not any((field in data) for field in ('cleanKillBy', 'cleanRocketKillBy', 'cleanMissileKillBy', 'cleanRamKillBy'))]),
-                'hits': sum([heat['craft'][craft]['hits'] for heat in round.values() if craft in heat['craft'] and 'hits' in heat['craft'][craft]]),
-                'hitsTaken': sum([sum(heat['craft'][craft]['hitsBy'].values()) for heat in round.values() if craft in heat['craft'] and 'hitsBy' in heat['craft'][craft]]),
-                'bulletDamage': sum([data[field][craft] for heat in round.values() for data in heat['craft'].values() for field in ('bulletDamageBy',) if field in data and craft in data[field]]),
-                'bulletDamageTaken': sum([sum(heat['craft'][craft]['bulletDamageBy'].values()) for heat in round.values() if craft in heat['craft'] and 'bulletDamageBy' in heat['craft'][craft]]),
-                'rocketHits': sum([data[field][craft] for heat in round.values() for data in heat['craft'].values() for field in ('rocketHitsBy',) if field in data and craft in data[field]]),
-                'rocketHitsTaken': sum([sum(heat['craft'][craft]['rocketHitsBy'].values()) for heat in round.values() if craft in heat['craft'] and 'rocketHitsBy' in heat['craft'][craft]]),
-                'rocketPartsHit': sum([data[field][craft] for heat in round.values() for data in heat['craft'].values() for field in ('rocketPartsHitBy',) if field in data and craft in data[field]]),
-                'rocketPartsHitTaken': sum([sum(heat['craft'][craft]['rocketPartsHitBy'].values()) for heat in round.values() if craft in heat['craft'] and 'rocketPartsHitBy' in heat['craft'][craft]]),
-                'rocketDamage': sum([data[field][craft] for heat in round.values() for data in heat['craft'].values() for field in ('rocketDamageBy',) if field in data and craft in data[field]]),
-                'rocketDamageTaken': sum([sum(heat['craft'][craft]['rocketDamageBy'].values()) for heat in round.values() if craft in heat['craft'] and 'rocketDamageBy' in heat['craft'][craft]]),
-                'missileHits': sum([data[field][craft] for heat in round.values() for data in heat['craft'].values() for field in ('missileHitsBy',) if field in data and craft in data[field]]),
-                'missileHitsTaken': sum([sum(heat['craft'][craft]['missileHitsBy'].values()) for heat in round.values() if craft in heat['craft'] and 'missileHitsBy' in heat['craft'][craft]]),
-                'missilePartsHit': sum([data[field][craft] for heat in round.values() for data in heat['craft'].values() for field in ('missilePartsHitBy',) if field in data and craft in data[field]]),
-                'missilePartsHitTaken': sum([sum(heat['craft'][craft]['missilePartsHitBy'].values()) for heat in round.values() if craft in heat['craft'] and 'missilePartsHitBy' in heat['craft'][craft]]),
-                'missileDamage': sum([data[field][craft] for heat in round.values() for data in heat['craft'].values() for field in ('missileDamageBy',) if field in data and craft in data[field]]),
-                'missileDamageTaken': sum([sum(heat['craft'][craft]['missileDamageBy'].values()) for heat in round.values() if craft in heat['craft'] and 'missileDamageBy' in heat['craft'][craft]]),
-                'ramScore': sum([data[field][craft] for heat in round.values() for data in heat['craft'].values() for field in ('rammedPartsLostBy',) if field in data and craft in data[field]]),
-                'ramScoreTaken': sum([sum(heat['craft'][craft]['rammedPartsLostBy'].values()) for heat in round.values() if craft in heat['craft'] and 'rammedPartsLostBy' in heat['craft'][craft]]),
-                'battleDamage': sum([data[field][craft] for heat in round.values() for player, data in heat['craft'].items() if player != craft for field in ('battleDamageBy',) if field in data and craft in data[field]]),
-                'battleDamageTaken': sum([sum(heat['craft'][craft]['battleDamageBy'].values()) for heat in round.values() if craft in heat['craft'] and 'battleDamageBy' in heat['craft'][craft]]),
-                'partsLostToAsteroids': sum([heat['craft'][craft]['partsLostToAsteroids'] for heat in round.values() if craft in heat['craft'] and 'partsLostToAsteroids' in heat['craft'][craft]]),
-                'HPremaining': CalculateAvgHP(sum([heat['craft'][craft]['HPremaining'] for heat in round.values() if craft in heat['craft'] and 'HPremaining' in heat['craft'][craft] and heat['craft'][craft]['state'] == 'ALIVE']), len([1 for heat in round.values() if craft in heat['craft'] and heat['craft'][craft]['state'] == 'ALIVE'])),
-                'accuracy': CalculateAccuracy(sum([heat['craft'][craft]['hits'] for heat in round.values() if craft in heat['craft'] and 'hits' in heat['craft'][craft]]), sum([heat['craft'][craft]['shots'] for heat in round.values() if craft in heat['craft'] and 'shots' in heat['craft'][craft]])),
-                'rocket_accuracy': CalculateAccuracy(sum([heat['craft'][craft]['rocket_strikes'] for heat in round.values() if craft in heat['craft'] and 'rocket_strikes' in heat['craft'][craft]]), sum([heat['craft'][craft]['rockets_fired'] for heat in round.values() if craft in heat['craft'] and 'rockets_fired' in heat['craft'][craft]])),
-                'waypointCount': sum(len(heat['craft'][craft]['waypoints']) for heat in round.values() if craft in heat['craft'] and 'waypoints' in heat['craft'][craft]),
-                'waypointTime': sum(float(heat['craft'][craft]['waypoints'][-1][2]) - float(heat['craft'][craft]['waypoints'][0][2]) for heat in round.values() if craft in heat['craft'] and 'waypoints' in heat['craft'][craft]),
-                'waypointDeviation': sum(float(waypoint[1]) for heat in round.values() if craft in heat['craft'] and 'waypoints' in heat['craft'][craft] for waypoint in heat['craft'][craft]['waypoints']),
-            } for round in tournamentData.values()
-        ] for craft in craftNames
-    }
-
-    hasWaypoints = False
-    if any('waypoints' in heat['craft'][craft].keys() for round in tournamentData.values() for heat in round.values() for craft in craftNames if craft in heat['craft']):
-        hasWaypoints = True
-        for craft in craftNames:
-            WPbestCount = max((len(heat['craft'][craft]['waypoints']) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'waypoints' in heat['craft'][craft]), default=0)
-            summary['craft'][craft].update({
-                'waypointCount': sum(len(heat['craft'][craft]['waypoints']) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'waypoints' in heat['craft'][craft]),
-                'waypointTime': sum((float(heat['craft'][craft]['waypoints'][-1][2]) - float(heat['craft'][craft]['waypoints'][0][2])) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'waypoints' in heat['craft'][craft]),
-                'waypointDeviation': sum(sum(float(waypoint[1]) for waypoint in heat['craft'][craft]['waypoints']) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'waypoints' in heat['craft'][craft]),
-                'waypointBestCount': WPbestCount,
-                'waypointBestTime': min(((float(heat['craft'][craft]['waypoints'][-1][2]) - float(heat['craft'][craft]['waypoints'][0][2])) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'waypoints' in heat['craft'][craft] and len(heat['craft'][craft]['waypoints']) == WPbestCount), default=0),
-                'waypointBestDeviation': min((sum(float(waypoint[1]) for waypoint in heat['craft'][craft]['waypoints']) for round in tournamentData.values() for heat in round.values() if craft in heat['craft'] and 'waypoints' in heat['craft'][craft] and len(heat['craft'][craft]['waypoints']) == WPbestCount), default=0),
-                })
+        profiler.section("write results.json")
+        write_atomically(tournamentDir / 'results.json', cache.results_json(tournamentData) if cache is not None else json.dumps(tournamentData, indent=2, ensure_ascii=False))
+
+    profiler.section("facts")
+    tournament = Tournament(tournamentDir, tournamentData, tournamentMetadata, TournamentFacts(tournamentData, heatFacts.setdefault(tournamentDir, {}), merge_variants=args.merge_duplicates))
+    facts = tournament.facts
+    profiler.count('craft', len(facts.craft))
+    if args.results_store and not args.no_files and len(tournamentData) > 0:
+        profiler.section("write results store")
+        write_results_store(tournamentDir / STORE_FILENAME, tournamentData, facts)
+    profiler.section("summary")
+    craftNames = facts.craft
+    summary = tournament.summarise(weights, args.average_duplicates)
+    hasWaypoints = tournament.has_waypoints
 
     if args.score:
-        for craftName, summary_data in summary['craft'].items():
-            # Treat waypoints separately so we can avoid non-negative scores for waypoints.
-            score = sum(w * summary_data[f][0] if isinstance(summary_data[f], tuple) else w * summary_data[f] for w, f in zip(weights, score_fields) if f in summary_data and not f.startswith('waypoint'))
-            waypoint_data = per_round_summary[craftName]
-            score += sum(max(0, sum(
-                            w * waypoint_data[round][f][0] if isinstance(waypoint_data[round][f], tuple) else w * waypoint_data[round][f] for w, f in zip(weights, score_fields) if f.startswith('waypoint')
-                        )) for round in range(len(waypoint_data)))
-            summary_data.update({'score': score})
-        if args.zero_lowest_score and len(summary['craft']) > 0:
-            offset = min(summary_data['score'] for summary_data in summary['craft'].values())
-            for summary_data in summary['craft'].values():
-                summary_data['score'] -= offset
+        profiler.section("scoring")
+        tournament.score(weights, args.zero_lowest_score)
+
+    sweepStrings = None
+    if sweepWeights is not None and len(summary['craft']) > 0:
+        profiler.section("sweep")
+        sweepStrings, sweepSummary = sweep_report(WeightSweep(summary['craft'], craftNames, facts.round_matrix(SCORE_FIELDS)).sweep(sweepWeights, weights))
+        if not args.no_files:
+            write_atomically(tournamentDir / 'sweep.json', json.dumps(sweepSummary, indent=2, ensure_ascii=False))
 
     if not args.no_files and len(summary['craft']) > 0:
-        with open(tournamentDir / 'summary.json', 'w', encoding="utf-8") as outFile:
-            json.dump(summary, outFile, indent=2, ensure_ascii=False)
+        profiler.section("write summary.json")
+        write_atomically(tournamentDir / 'summary.json', tournament.summary_json())
 
     if len(summary['craft']) > 0:
-        if not args.no_files:
-            headers = (["score", ] if args.score else []) + [k for k in next(iter(summary['craft'].values())).keys() if k not in ('score',)]
-            csv_summary = ["craft," + ",".join(
-                ",".join(('deathCount', 'dcB', 'dcR', 'dcM', 'dcR', 'dcA', 'dcS')) if k == 'deathCount' else
-                ",".join(('cleanKills', 'ckB', 'ckR', 'ckM', 'ckR')) if k == 'cleanKills' else
-                k for k in headers), ]
-            for craft, score in sorted(summary['craft'].items(), key=lambda i: i[1]['score'], reverse=True):
-                csv_summary.append(craft + "," + ",".join(
-                    ",".join(str(int(100 * sf) / 100) for sf in score[h]) if isinstance(score[h], tuple)
-                    else ",".join(str(int(100 * sf) / 100) for sf in score[h].values()) if isinstance(score[h], dict)
-                    else str(int(100 * score[h]) / 100)
-                for h in headers))
-            # Write main summary results to the summary.csv file.
-            with open(tournamentDir / 'summary.csv', 'w', encoding="utf-8") as outFile:
-                outFile.write("\n".join(csv_summary))
-
-        teamNames = sorted(list(set([team for result_type in summary['team results'].values() for team in result_type])))
+        profiler.section("csv and console output")
+        teamNames = tournament.team_names()
+        teamWins, teamDraws, teamDeaths = (summary['team results'][result_type] for result_type in ('wins', 'draws', 'deaths'))
         default_team_names = [chr(k) for k in range(ord('A'), ord('A') + len(summary['craft']))]
 
-        if args.score and not args.no_cumulative:  # Per round scores.
-            per_round_scores = {
-                craft: [
-                    sum(
-                        w * scores[round][f][0] if isinstance(scores[round][f], tuple) else w * scores[round][f] for w, f in zip(weights, score_fields) if not f.startswith('waypoint')
-                    )
-                    + max(0, sum(
-                        w * scores[round][f][0] if isinstance(scores[round][f], tuple) else w * scores[round][f] for w, f in zip(weights, score_fields) if f.startswith('waypoint')  # Compute waypoint score separately to avoid non-negative values.
-                    ))
-                    for round in range(len(scores))
-                ] for craft, scores in per_round_summary.items()
-            }
-        else:
-            per_round_scores = {}  # Silence Pylance warnings.
+        cumulativeScores = tournament.cumulative_scores() if args.score and not args.no_cumulative else {}
 
         if not args.quiet:  # Write results to console
             strings = []
@@ -516,6 +240,7 @@ for tournamentNumber, tournamentDir in enumerate(tournamentDirs):
                 strings.append(
                     f"Tournament {tournamentMetadata.get('ID', '???')} of duration {tournamentMetadata['duration'][1] - tournamentMetadata['duration'][0]} with {tournamentMetadata['rounds']} rounds starting at {tournamentMetadata['duration'][0]}"
                 )  # Python <3.12 has issues with line breaks in f-strings.
+            tableStart = len(strings)
             headers = [
                 'Name', 'Wins', 'Survive', 'MIA', 'Deaths (BRMRAS)', 'D.Order', 'D.Time',
                 'Kills (BRMR)', 'Assists', 'Hits', 'Damage', 'DmgTaken',
@@ -582,6 +307,8 @@ for tournamentNumber, tournamentDir in enumerate(tournamentDirs):
             strings.append(''.join(f"{header:{column_widths[header]}s}" for header in columns_to_show))
             for craft in sorted(summary['craft'], key=None if not args.score else lambda craft: summary['craft'][craft]['score'], reverse=False if not args.score else True):
                 strings.append(''.join(f"{summary_strings[craft][header]:{column_widths[header]}s}" for header in columns_to_show))
+            if sweepStrings is not None:  # Show the sweep report instead of the summary table.
+                strings[tableStart:] = sweepStrings
 
             # Teams summary
             if len(teamNames) > 0 and not all(name in default_team_names for name in teamNames):  # Don't do teams if they're assigned as 'A', 'B', ... as they won't be consistent between rounds.
@@ -592,27 +319,21 @@ for tournamentNumber, tournamentDir in enumerate(tournamentDirs):
 
             # Per round cumulative score
             if args.score and not args.no_cumulative:
-                name_length = max([len(name) for name in per_round_scores.keys()] + [23])
-                strings.append(f"\nName \\ Cumulative Score{' ' * (name_length - 22)}\t" + "\t".join(f"{r:>7d}" for r in range(len(next(iter(per_round_scores.values()))))))
-                strings.append('\n'.join(f"{craft}:{' ' * (name_length - len(craft))}\t" + "\t".join(f"{s:>7.2f}" for s in cumsum(per_round_scores[craft]))
-                               for craft in sorted(per_round_scores, key=lambda craft: summary['craft'][craft]['score'], reverse=True)))
+                name_length = max([len(name) for name in cumulativeScores.keys()] + [23])
+                strings.append(f"\nName \\ Cumulative Score{' ' * (name_length - 22)}\t" + "\t".join(f"{r:>7d}" for r in range(len(next(iter(cumulativeScores.values()))))))
+                strings.append('\n'.join(f"{craft}:{' ' * (name_length - len(craft))}\t" + "\t".join(f"{s:>7.2f}" for s in craftScores) for craft, craftScores in cumulativeScores.items()))
 
-            # Print stuff to the console.
-            for string in strings:
-                print(string)
+            # Print stuff to the console (in one go, so that the table is replaced at once in --follow mode).
+            print('\n'.join(strings), flush=True)
 
-        # Write teams results to the summary.csv file.
+        # Write the main summary, teams and per round cumulative score results to the summary.csv file.
         if not args.no_files:
-            with open(tournamentDir / 'summary.csv', 'a', encoding="utf-8") as f:
-                f.write('\n\nTeam,Wins,Draws,Deaths,Vessels')
-                for team in sorted(teamNames, key=lambda team: teamWins[team], reverse=True):
-                    f.write('\n' + ','.join([str(v) for v in (team, teamWins[team], teamDraws[team], teamDeaths[team], summary['teams'][team].replace(", ", ","))]))
-
-                # Write per round cumulative score results to summary.csv file.
-                if args.score and not args.no_cumulative:
-                    f.write(f"\n\nName \\ Cumulative Score Per Round," + ",".join(f"{r:>7d}" for r in range(len(next(iter(per_round_scores.values()))))))
-                    for craft in sorted(per_round_scores, key=lambda craft: summary['craft'][craft]['score'], reverse=True):
-                        f.write(f"\n{craft}," + ",".join(f"{s:.2f}" for s in cumsum(per_round_scores[craft])))
+            write_atomically(tournamentDir / 'summary.csv', tournament.summary_csv(not args.no_cumulative))
 
     else:
         print(f"No valid log files found in {tournamentDir}.")
+    profiler.stop()
+    if args.profile:
+        print('\n'.join(profiler.report(str(tournamentDir))), file=sys.stderr, flush=True)
+        if args.profile_trace is not None:
+            write_atomically(Path(args.profile_trace), json.dumps(profiler.trace(), indent=2, ensure_ascii=False))
@@ -3,9 +3,13 @@
 # Standard library imports
 import argparse
 import json
+import sys
 from pathlib import Path
 
-VERSION = "1.0.0"
+# Local imports
+from bda_logs.state import TournamentState
+
+VERSION = "1.1.0"
 
 parser = argparse.ArgumentParser(
     description="Tournament state parser",
@@ -15,70 +19,48 @@ parser = argparse.ArgumentParser(
 parser.add_argument("state", type=Path, nargs="?", help="The tournament.state file.")
 parser.add_argument("-p", "--print", action="store_true", help="Print the JSON to the console.")
 parser.add_argument("-r", "--re-encode", action="store_true", help="Re-encode the tournament.json file back to the tournament.state file.")
+selectors = parser.add_argument_group("Selectors", "Only decode the selected sections of the tournament.state and print them as JSON instead of writing tournament.json.")
+selectors.add_argument("--heats", action="store_true", help="The heat schedule (the configuration and teams of each heat).")
+selectors.add_argument("--round", type=int, action="append", help="The heats of round N (can be given multiple times).")
+selectors.add_argument("--player", type=str, action="append", help="The craft file and the scores in each heat played of player NAME (can be given multiple times).")
+parser.add_argument("--version", action="store_true", help="Show the script version, then exit.")
 args = parser.parse_args()
 
+if args.version:
+    print(f"Version: {VERSION}")
+    sys.exit()
+
 if args.state is None:
     args.state = Path(__file__).parent / "PluginData" / "tournament.state"
 state_file: Path = args.state
 json_file: Path = state_file.with_suffix(".json")
 
 if not args.re_encode:  # Decode the tournament.state to pure JSON and optionally print it.
-    with open(args.state, "r") as f:
-        state = json.load(f)
-
     # Various elements are recursively encoded in JSON strings due to Unity's limited JSONUtility functionality.
-    # We decode and organise them here.
-
-    # Heats (configurations for spawning and teams)
-    state["heats"] = {f"Heat {i}": json.loads(rnd) for i, rnd in enumerate(state["_heats"])}
-    for heat in state["heats"].values():
-        heat["teams"] = [json.loads(team)["team"] for team in heat["_teams"]]
-        del heat["_teams"]
-    del state["_heats"]
-
-    # Scores
-    _scores = json.loads(state["_scores"])
-    del state["_scores"]
-    _scores["weights"] = {k: v for k, v in zip(_scores["_weightKeys"], _scores["_weightValues"])}
-    del _scores["_weightKeys"], _scores["_weightValues"]
-    players = _scores["_players"]
-    del _scores["_players"]
-    _scores["scores"] = {p: s for p, s in zip(players, _scores["_scores"])}
-    del _scores["_scores"]
-    _scores["files"] = {p: s for p, s in zip(players, _scores["_files"])}
-    del _scores["_files"]
-    results = [json.loads(results) for results in _scores["_results"]]
-    for result in results:
-        result["survivingTeams"] = [json.loads(team) for team in result["_survivingTeams"]]
-        del result["_survivingTeams"]
-        result["deadTeams"] = [json.loads(team) for team in result["_deadTeams"]]
-        del result["_deadTeams"]
-    _scores["results"] = results
-    del _scores["_results"]
-    scores = _scores["scores"]
-    _scores["scores"] = {
-        player:
-        [
-            json.loads(score_data["scoreData"]) | {
-                field: {other_player: values for other_player, values in zip(players, score_data[field]) if other_player != player}
-                    for field in ("hitCounts", "damageFromGuns", "damageFromRockets", "rocketPartDamageCounts", "rocketStrikeCounts", "rammingPartLossCounts", "damageFromMissiles", "missilePartDamageCounts", "missileHitCounts", "battleDamageFrom")
-            } | {
-                "damageTypesTaken": score_data["damageTypesTaken"],
-                "everyoneWhoDamagedMe": score_data["everyoneWhoDamagedMe"]
-            } for score_data in [json.loads(rnd) for rnd in json.loads(scores[player])["serializedScoreData"]]
-        ] for player in players
-    }
-    state["scores"] = _scores
-
-    # Team files
-    state["teamFiles"] = [json.loads(team)["ls"] for team in state["_teamFiles"]]
-    del state["_teamFiles"]
-
-    with open(json_file, "w") as f:
-        json.dump(state, f, indent=2)
-
-    if args.print:
-        print(json.dumps(state, indent=2))
+    # These are only decoded as they're needed (see bda_logs/state.py).
+    state = TournamentState.load(state_file)
+
+    if args.heats or args.round is not None or args.player is not None:  # Only decode and print the selected sections.
+        selection = {}
+        if args.heats or args.round is not None:
+            selection["heats"] = {name: heat for rnd in (args.round if args.round is not None else [None]) for name, heat in state.heats(rnd).items()}
+        if args.player is not None:
+            files = state.files()
+            selection["scores"] = {}
+            for player in args.player:
+                try:
+                    selection["scores"][player] = {"file": files.get(player), "scores": state.player_scores(player)}
+                except KeyError:
+                    print(f"Player {player} not found in {state_file}.", file=sys.stderr)
+        print(json.dumps(selection, indent=2))
+
+    else:
+        state = state.decoded()
+        with open(json_file, "w") as f:
+            json.dump(state, f, indent=2)
+
+        if args.print:
+            print(json.dumps(state, indent=2))
 
 else:  # Re-encode the tournament.json to a tournament.state file
     with open(json_file, "r") as f:
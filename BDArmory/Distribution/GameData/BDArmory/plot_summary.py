@@ -13,7 +13,10 @@ from typing import Union
 import matplotlib.pyplot as plt
 import numpy
 
-VERSION = "1.5"
+# Local
+from bda_logs.plots import plot_cumulative_scores
+
+VERSION = "1.6"
 
 parser = argparse.ArgumentParser(description="Plot the scores of a tournament as they accumulated per round", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 parser.add_argument("tournament", nargs="?", type=str, help="The tournament to plot (optional).")
@@ -49,20 +52,7 @@ with open(tournamentDir / "summary.csv", 'r') as f:
 vessel_count = data.index([]) - 1
 names = [data[row][0] for row in range(len(data) - vessel_count, len(data))]
 scores = numpy.array([[float(v) for v in data[row][1:]] for row in range(len(data) - vessel_count, len(data))])
-plt.figure(figsize=(16, 10), dpi=200)
-plt.plot(scores.transpose(), linewidth=5)
-plt.axhline(color='black')
-if len(names) > 16:  # Roughly half the plot height, put them outside the graph
-    plt.legend(names, loc='upper left', bbox_to_anchor=(1, 1))
-else:
-    plt.legend(names, loc='upper left')
-plt.autoscale(enable=True, tight=True)
-plt.tight_layout()
-if args.cut_zero:
-    y0, y1 = plt.ylim()
-    plt.ylim(max(y0, 0), y1)
-if args.title is not None:
-    plt.title(args.title)
+plot_cumulative_scores(names, scores, args.title, args.cut_zero)
 if args.save:
     if args.save == 'tmp':
         fd, filename = tempfile.mkstemp(suffix='.png')
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Local imports
+from bda_logs import profiling
+from bda_logs.cache import HeatCache
+from bda_logs.facts import TournamentFacts
+from bda_logs.files import atomic_open, write_atomically
+from bda_logs.pool import make_process_pool
+from bda_logs.pvp import PvpScores, pvp_csv, pvp_report
+from bda_logs.scoring import DEFAULT_WEIGHTS, WAYPOINT_WEIGHTS
+from bda_logs.store import STORE_FILENAME, write_results_store
+from bda_logs.tournament import Tournament, natural_sort_key
+from bda_logs.variants import variant_aliases
+from bda_logs.wins import WinCounts, heat_outcomes
+
+VERSION = "1.1.0"
+STAGES = ('pvp', 'wins', 'plot')
+
+parser = argparse.ArgumentParser(description="Parse a tournament and run the tools that follow on from it (PvP scores, who-beat-who table and plots) in one process.", formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                 epilog="The tournament is parsed once and each stage works from the parsed tournament in memory instead of reading results.json and summary.json back in. "
+                                 "The files written are the same as from parse_tournament_log_files.py, parse_pvp_scores.py --csv, parse_n-choose-k_results.py (n-choose-k.csv) and plot_summary.py / parse_pvp_scores.py --save-plot (summary.png and pvp_scores.png).")
+parser.add_argument('tournament', type=str, nargs='*', help="Tournament folder to process.")
+parser.add_argument('-c', '--current-dir', action='store_true', help="Parse the logs in the current directory as if it was a tournament without the folder structure.")
+parser.add_argument('-w', '--weights', type=str, default=DEFAULT_WEIGHTS,
+                    help="Score weights (in order of main columns from 'Wins' to 'Ram', plus others), as for parse_tournament_log_files.py.")
+parser.add_argument('-wp', '--waypoint-scores', action='store_true', help="Use the default waypoint scores.")
+parser.add_argument('-z', '--zero-lowest-score', action='store_true', help="Shift the scores so that the lowest is 0.")
+duplicates_group = parser.add_mutually_exclusive_group()
+duplicates_group.add_argument('--average-duplicates', action='store_true', help="Average the values of duplicates (Craft, Craft_1, Craft_2, ...) in the summary.")
+duplicates_group.add_argument('--merge-duplicates', action='store_true', help="Merge duplicates (Craft, Craft_1, Craft_2, ...) into a single craft when parsing, and into a single player for the PvP scores.")
+parser.add_argument('--skip', type=str, default="", help=f"Comma separated stages to skip: {', '.join(STAGES)}.")
+parser.add_argument('--no-cache', action='store_true', help="Don't use the per-heat parse cache (heat_cache.json in the tournament folder).")
+parser.add_argument('--results-store', action='store_true', help=f"Also write the results as typed arrays ({STORE_FILENAME}) for quick loading by other tools.")
+parser.add_argument('-j', '--jobs', type=int, default=1, help="Parse the heat logs in a pool of this many processes.")
+parser.add_argument('--profile', action='store_true', help="Show the wall time, CPU time and peak memory of each stage of processing each tournament (on stderr).")
+parser.add_argument("--version", action='store_true', help="Show the script version, then exit.")
+args = parser.parse_args()
+
+if args.version:
+    print(f"Version: {VERSION}")
+    sys.exit()
+
+skip = set(stage.strip() for stage in args.skip.split(',') if stage.strip() != "")
+if not skip.issubset(STAGES):
+    parser.error(f"Unknown stages to skip: {', '.join(sorted(skip.difference(STAGES)))}")
+
+if args.current_dir and len(args.tournament) == 0:
+    tournamentDirs = [Path('')]
+else:
+    if len(args.tournament) == 0:
+        tournamentDirs = None
+        logsDir = Path(__file__).parent / "Logs"
+        if logsDir.exists():
+            tournamentFolders = list(logsDir.resolve().glob("Tournament*"))
+            if len(tournamentFolders) > 0:
+                tournamentFolders = sorted(list(dir for dir in tournamentFolders if dir.is_dir()), key=natural_sort_key)
+            if len(tournamentFolders) > 0:
+                tournamentDirs = [tournamentFolders[-1]]  # Latest tournament dir
+        if tournamentDirs is None:  # Didn't find a tournament dir, revert to current-dir
+            tournamentDirs = [Path('')]
+            args.current_dir = True
+    else:
+        tournamentDirs = [Path(tournamentDir) for tournamentDir in args.tournament]  # Specified tournament dir
+
+if args.waypoint_scores:
+    args.weights = WAYPOINT_WEIGHTS
+
+try:
+    weights = list(float(w) for w in args.weights.split(','))
+except:
+    weights = []
+
+if 'plot' not in skip:
+    try:
+        import matplotlib.pyplot as plt
+        from bda_logs.plots import plot_cumulative_scores, plot_pvp_scores
+        plt.switch_backend('Agg')  # Render off-screen.
+    except ImportError:
+        print("Plotting needs matplotlib, skipping the plots.", file=sys.stderr)
+        skip.add('plot')
+
+profiler = profiling.enable() if args.profile else profiling.current()
+executor = make_process_pool(args.jobs)
+
+for tournamentNumber, tournamentDir in enumerate(tournamentDirs):
+    profiler.start(str(tournamentDir))
+    profiler.section("parse")
+    cache = HeatCache(tournamentDir) if not args.no_cache else None
+    tournament = Tournament.load(tournamentDir, weights, args.current_dir, cache, executor, args.merge_duplicates, args.average_duplicates, zero_lowest_score=args.zero_lowest_score)
+    if len(tournament.summary['craft']) == 0:
+        print(f"No valid log files found in {tournamentDir}.")
+        profiler.stop()
+        continue
+    profiler.section("write results")
+    if cache is not None:
+        cache.save()
+    write_atomically(tournamentDir / 'results.json', tournament.results_json(cache))
+    if args.results_store:
+        write_results_store(tournamentDir / STORE_FILENAME, tournament.data, tournament.facts)
+    write_atomically(tournamentDir / 'summary.json', tournament.summary_json())
+    write_atomically(tournamentDir / 'summary.csv', tournament.summary_csv())
+    written = ['results.json', 'summary.json', 'summary.csv'] + ([STORE_FILENAME] if args.results_store else [])
+
+    pvpScore = None
+    if 'pvp' not in skip:
+        profiler.section("pvp")
+        if args.merge_duplicates:  # Merge the duplicates as players instead, as parse_pvp_scores.py --merge-duplicates does.
+            facts = TournamentFacts(tournament.data)
+            pvpScore, players = pvp_report(PvpScores(facts, tournament.score_weights(), variant_aliases(facts.craft)))
+        else:
+            pvpScore, players = pvp_report(PvpScores(tournament.facts, tournament.score_weights()))
+        write_atomically(tournamentDir / 'pvp_scores.json', json.dumps(pvpScore, indent=2))
+        write_atomically(tournamentDir / 'pvp_scores.csv', pvp_csv(pvpScore['totals'], players))
+        written.extend(['pvp_scores.json', 'pvp_scores.csv'])
+
+    if 'wins' not in skip:
+        profiler.section("who-beat-who")
+        with atomic_open(tournamentDir / 'n-choose-k.csv') as f:
+            WinCounts().add_all(heat_outcomes(tournament.data)).write_table(f)
+        written.append('n-choose-k.csv')
+
+    if 'plot' not in skip:
+        profiler.section("plot")
+        cumulativeScores = tournament.cumulative_scores()
+        fig = plot_cumulative_scores(list(cumulativeScores), list(cumulativeScores.values()), f"Tournament {tournament.summary['meta']['ID']}")
+        fig.savefig(tournamentDir / 'summary.png', dpi='figure', bbox_inches='tight')
+        plt.close(fig)
+        written.append('summary.png')
+        if pvpScore is not None:
+            fig = plot_pvp_scores(pvpScore['totals'])
+            fig.savefig(tournamentDir / 'pvp_scores.png', dpi='figure', bbox_inches='tight')
+            plt.close(fig)
+            written.append('pvp_scores.png')
+    profiler.stop()
+
+    if tournamentNumber > 0:
+        print("")
+    ranking = tournament.ranking()
+    name_length = max(len(craft) for craft in ranking)
+    print(f"Tournament {tournament.summary['meta']['ID']}: {sum(len(heats) for heats in tournament.data.values())} heats, {len(ranking)} craft. Wrote {', '.join(written)} to {tournamentDir}.")
+    print('\n'.join(f"{rank:>3d}. {craft}{' ' * (name_length - len(craft))}  {tournament.summary['craft'][craft]['score']:.3f}" for rank, craft in enumerate(ranking, 1)))
+    if args.profile:
+        print('\n'.join(profiler.report(str(tournamentDir))), file=sys.stderr, flush=True)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import argparse
+import csv
+import json
+import os
+import sys
+from pathlib import Path
+
+# Local imports
+from bda_logs.ratings import RATINGS_FILENAME, Ratings
+from bda_logs.store import STORE_FILENAME, ResultsStore
+from bda_logs.tournament import natural_sort_key
+from bda_logs.wins import heat_outcomes, store_heat_outcomes
+
+VERSION = "1.1.0"
+
+parser = argparse.ArgumentParser(description="Rate the teams of a season of tournaments from the results of their heats (Elo and Bradley-Terry ratings).", formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                 epilog="The surviving teams of each heat beat its dead teams, and the surviving teams of a draw draw with each other. "
+                                 "The ratings are saved, along with the heats that have been rated, so re-running this after new rounds (or tournaments) only adds their heats. "
+                                 "Run parse_tournament_log_files.py on the tournaments first.")
+parser.add_argument('tournaments', type=str, nargs='*', help="Tournament folders to rate, in order (default: all the tournaments in the Logs folder).")
+parser.add_argument('-r', '--ratings', type=str, help=f"The ratings file (default: {RATINGS_FILENAME} in the folder containing the tournaments).")
+parser.add_argument('--craft', action='store_true', help="Rate the craft in the teams instead of the teams (e.g., for FFA tournaments).")
+parser.add_argument('-k', type=float, help="The Elo K factor for new ratings (default: 32, or that of the ratings file).")
+parser.add_argument('--initial', type=float, help="The initial rating for new ratings (default: 1500, or that of the ratings file).")
+parser.add_argument('--prior', type=float, default=1, help="The virtual wins and losses of each team against an average team in the Bradley-Terry fit, so that unbeaten and winless teams have finite ratings.")
+parser.add_argument('--tolerance', type=float, default=1e-9, help="The convergence tolerance of the Bradley-Terry fit.")
+parser.add_argument('--reset', action='store_true', help="Ignore the existing ratings file and rate all the heats afresh.")
+parser.add_argument('--no-save', action='store_true', help="Don't save the updated ratings.")
+parser.add_argument('--csv', action='store_true', help="Also write the ratings to ratings.csv next to the ratings file.")
+parser.add_argument("--version", action='store_true', help="Show the script version, then exit.")
+args = parser.parse_args()
+
+if args.version:
+    print(f"Version: {VERSION}")
+    sys.exit()
+
+if len(args.tournaments) > 0:
+    tournamentDirs = [Path(tournamentDir) for tournamentDir in args.tournaments]
+else:
+    logsDir = Path(__file__).parent / "Logs"
+    tournamentDirs = sorted((dir for dir in logsDir.resolve().glob("Tournament*") if dir.is_dir()), key=natural_sort_key) if logsDir.exists() else []
+    if len(tournamentDirs) == 0:
+        print(f"No tournaments found in {logsDir}.")
+        sys.exit()
+ratingsFile = Path(args.ratings) if args.ratings is not None else tournamentDirs[0].resolve().parent / RATINGS_FILENAME
+
+ratings = Ratings.load(ratingsFile, args.k, args.initial, craft=args.craft) if not args.reset else Ratings(**{k: v for k, v in (('k', args.k), ('initial', args.initial)) if v is not None}, craft=args.craft)
+if ratings.craft != args.craft:
+    print(f"{ratingsFile} rates the {'craft' if ratings.craft else 'teams'}, but the {'craft were' if args.craft else 'teams were'} requested. Use {'--craft' if ratings.craft else 'it without --craft'}, a different ratings file (-r) or --reset.")
+    sys.exit(1)
+for tournamentDir in tournamentDirs:
+    source = Path(os.path.relpath(tournamentDir.resolve(), ratingsFile.resolve().parent)).as_posix()  # Tournament folder names repeat between seasons, so use the path from the ratings file.
+    store_file, results_file = tournamentDir / STORE_FILENAME, tournamentDir / "results.json"
+    if not results_file.exists():
+        print(f"No results.json in {tournamentDir}, skipping it. Have you run the tournament parser on it first?")
+        continue
+    if store_file.exists() and store_file.stat().st_mtime >= results_file.stat().st_mtime:  # Use the results store (parse_tournament_log_files.py --results-store) if it's up to date.
+        with ResultsStore(store_file) as store:
+            added = ratings.add_heats(store_heat_outcomes(store, source, args.craft))
+    else:
+        with open(results_file, 'r') as f:
+            added = ratings.add_heats(heat_outcomes(json.load(f), source, args.craft))
+    print(f"{tournamentDir}: {added} new heats rated.")
+
+if len(ratings.played) == 0:
+    print("No heats to rate.")
+    sys.exit()
+bradleyTerry = ratings.bradley_terry(args.prior, args.tolerance)
+wins = {team: 0. for team in ratings.played}
+losses = dict(wins)
+for (winner, loser), count in ratings.wins.items():
+    wins[winner] += count
+    losses[loser] += count
+
+teams = sorted(ratings.played, key=lambda team: bradleyTerry[team], reverse=True)
+name_length = max(len(team) for team in teams + ['Team'])
+strings = [f"{'Team':{name_length}s}  {'B-T':>7s}  {'Elo':>7s}  {'Heats':>5s}  {'Wins':>7s}  {'Losses':>7s}"]
+strings.extend(f"{team:{name_length}s}  {bradleyTerry[team]:7.1f}  {ratings.elo[team]:7.1f}  {ratings.played[team]:5d}  {wins[team]:7.1f}  {losses[team]:7.1f}" for team in teams)
+strings.append(f"{len(ratings.heats)} heats rated, Bradley-Terry fit in {ratings.iterations} iterations.")
+print('\n'.join(strings))
+
+if not args.no_save:
+    ratings.save(ratingsFile)
+    if args.csv:
+        with open(ratingsFile.with_name("ratings.csv"), 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['Team', 'Bradley-Terry', 'Elo', 'Heats', 'Wins', 'Losses'])
+            writer.writerows([team, f"{bradleyTerry[team]:.2f}", f"{ratings.elo[team]:.2f}", ratings.played[team], wins[team], losses[team]] for team in teams)
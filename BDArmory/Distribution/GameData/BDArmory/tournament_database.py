@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+# Standard library imports
+import argparse
+import csv
+import sys
+from pathlib import Path
+from typing import List, Union
+
+# Local imports
+from bda_logs.database import WEAPONS, connect, deaths, ingest_results, kills, sql, versus
+
+VERSION = "1.0.1"
+
+parser = argparse.ArgumentParser(description="Tournament results database", formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                 epilog="Run parse_tournament_log_files.py on the tournaments first, then ingest their results.json into the database and query it.")
+parser.add_argument('-d', '--database', type=Path, default=Path("tournaments.sqlite"), help="The database file.")
+parser.add_argument("--version", action='store_true', help="Show the script version, then exit.")
+commands = parser.add_subparsers(dest='command', metavar='command')
+ingest_parser = commands.add_parser('ingest', help="Load the results of tournaments into the database.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+ingest_parser.add_argument('tournament', type=Path, nargs='+', help="Tournament folders (or folders of tournament folders, e.g., a season) to load.")
+deaths_parser = commands.add_parser('deaths', help="The heats where a craft died and who killed it.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+deaths_parser.add_argument('craft', type=str, help="The craft.")
+deaths_parser.add_argument('-w', '--weapon', choices=list(WEAPONS), help="Only deaths to this weapon (clean kills with it, or other deaths where the craft was hit with it).")
+kills_parser = commands.add_parser('kills', help="The clean kills of a craft.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+kills_parser.add_argument('craft', type=str, help="The craft.")
+versus_parser = commands.add_parser('versus', help="The damage, hits, etc. dealt by a craft to its opponents and taken from them.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+versus_parser.add_argument('craft', type=str, help="The craft.")
+versus_parser.add_argument('opponent', type=str, nargs='?', help="Only this opponent.")
+sql_parser = commands.add_parser('sql', help="Run an SQL query.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+sql_parser.add_argument('query', type=str, help="The query.")
+for query_parser in (deaths_parser, kills_parser, versus_parser):
+    query_parser.add_argument('-t', '--tournaments', type=str, help="Only tournaments whose folder name or path matches this glob pattern, e.g., '*Season 4*'.")
+for query_parser in (deaths_parser, kills_parser, versus_parser, sql_parser):
+    query_parser.add_argument('--csv', action='store_true', help="Output CSV instead of an aligned table.")
+args = parser.parse_args()
+
+if args.version:
+    print(f"Version: {VERSION}")
+    sys.exit()
+
+if args.command is None:
+    parser.print_help()
+    sys.exit()
+
+
+def naturalSortKey(key: Union[str, Path]):
+    if isinstance(key, Path):
+        key = key.name
+    try:
+        return int(key.rsplit(' ')[1])  # If the key ends in an integer, split that off and use that as the sort key.
+    except:
+        return key  # Otherwise, just use the key.
+
+
+def printTable(columns: List[str], rows: List[tuple]):
+    strings = [[str(value) if value is not None else '' for value in row] for row in rows]
+    if args.csv:
+        csv.writer(sys.stdout, lineterminator='\n').writerows([columns] + strings)
+        return
+    widths = [max([len(column)] + [len(row[i]) for row in strings]) + 2 for i, column in enumerate(columns)]
+    print('\n'.join(''.join(f"{value:{width}s}" for value, width in zip(row, widths)).rstrip() for row in [columns] + strings))
+
+
+db = connect(args.database)
+if args.command == 'ingest':
+    tournamentDirs = []
+    for folder in args.tournament:
+        if (folder / 'results.json').exists():
+            tournamentDirs.append(folder)
+        else:  # A folder of tournaments.
+            tournamentDirs.extend(sorted((dir for dir in folder.glob("Tournament*") if (dir / 'results.json').exists()), key=naturalSortKey))
+    if len(tournamentDirs) == 0:
+        print("No results.json found. Have you run the tournament parser on the tournaments first?")
+    for tournamentDir in tournamentDirs:
+        heats = ingest_results(db, tournamentDir)
+        print(f"Loaded {heats} heats from {tournamentDir}")
+elif args.command == 'deaths':
+    printTable(*deaths(db, args.craft, args.weapon, args.tournaments))
+elif args.command == 'kills':
+    printTable(*kills(db, args.craft, args.tournaments))
+elif args.command == 'versus':
+    printTable(*versus(db, args.craft, args.opponent, args.tournaments))
+elif args.command == 'sql':
+    printTable(*sql(db, args.query))
+db.close()